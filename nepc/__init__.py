@@ -1,32 +1,87 @@
 from .nepc import connect
+from .nepc import connect_pool
 from .nepc import count_table_rows
 from .nepc import model_cs_id_list
 from .nepc import cs_e_sigma
 from .nepc import cs_e
 from .nepc import cs_sigma
 from .nepc import cs_metadata
+from .nepc import cs_metadata_list
+from .nepc import cs_e_sigma_list
+from .nepc import load_cs
+from .nepc import load_models
+from .nepc import model_rate_id_list
+from .nepc import rate_metadata_list
+from .nepc import ratedata_list
+from .nepc import load_rates
 from .nepc import table_as_df
+from .nepc import interpolate
+from .nepc import maxwellian
 from .nepc import process_attr
+from .nepc import LazyData
+from .nepc import CommonGrid
+from .nepc import RateKernel
 from .nepc import CS
 from .nepc import CustomCS
 from .nepc import Model
 from .nepc import CustomModel
+from .nepc import Rate
+from .nepc import RateModel
+from .cache import CS_CACHE
+from .cache import CSCache
+from .cache import DiskCache
+from .backend import Backend
+from .backend import Between
+from .backend import Window
+from .backend import MySQLBackend
+from .backend import PooledMySQLBackend
+from .backend import FileBackend
+from .backend import SnapshotBackend
+from .backend import export_snapshot
+from . import aio
 
 
 # if somebody does "from somepackage import *", this is what they will
 # be able to access:
 __all__ = [
         'connect',
+        'connect_pool',
         'model_cs_id_list',
         'count_table_rows',
         'cs_e_sigma',
         'cs_e',
         'cs_sigma',
         'cs_metadata',
+        'cs_metadata_list',
+        'cs_e_sigma_list',
+        'load_cs',
+        'load_models',
+        'model_rate_id_list',
+        'rate_metadata_list',
+        'ratedata_list',
+        'load_rates',
         'table_as_df',
+        'interpolate',
+        'maxwellian',
         'process_attr',
+        'LazyData',
+        'CommonGrid',
+        'RateKernel',
         'CS',
         'CustomCS',
         'Model',
-        'CustomModel'
+        'CustomModel',
+        'Rate',
+        'RateModel',
+        'CS_CACHE',
+        'CSCache',
+        'DiskCache',
+        'Backend',
+        'Between',
+        'Window',
+        'MySQLBackend',
+        'PooledMySQLBackend',
+        'FileBackend',
+        'SnapshotBackend',
+        'export_snapshot'
         ]
@@ -0,0 +1,185 @@
+"""asyncio interface to a NEPC database.
+
+The queries of :mod:`nepc.nepc` block, so this module runs them on the
+bounded thread pool of a :class:`Session`, one query per worker, and awaits
+them without blocking the event loop. Every lookup takes a :class:`Session`,
+so the lookups on one backend share its thread pool. With a pooled session,
+up to ``max_workers`` queries are in flight at once; further lookups wait in
+the queue of the thread pool. Cancelling a lookup that has not started removes
+it from the queue; a query that is already running completes, but its
+result is discarded.
+
+Examples
+--------
+    >>> async def main():
+    ...     async with await nepc.aio.connect_pool(local=True, test=True) as session:
+    ...         fict = await nepc.aio.Model.load(session, "fict")
+    ...         cs_list = await asyncio.gather(*[nepc.aio.CS.load(session, cs_id)
+    ...                                           for cs_id in range(1, 31)])
+    >>> asyncio.run(main())
+
+A :class:`.FileBackend` can stand in for the MySQL server:
+
+    >>> session = nepc.aio.Session(nepc.FileBackend(os.environ['NEPC_HOME'] + "/tests/data"))
+
+"""
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from nepc import nepc
+from nepc.backend import CS_BATCH_SIZE, PooledMySQLBackend, as_backend
+
+
+class Session:
+    """Runs the queries of a backend on a bounded thread pool.
+
+    Parameters
+    ----------
+    backend : :class:`.PooledMySQLBackend`, :class:`.Backend`, or cursor.MySQLCursor
+        Only a pooled session is queried from several threads; other
+        backends and cursors run one query at a time.
+    max_workers : int, optional
+        Maximum number of queries in flight; by default, the number of
+        connections in the pool.
+    close_backend : bool, optional
+        Close a pooled backend when the session is closed (default False).
+
+    """
+    def __init__(self, backend, max_workers=None, close_backend=False):
+        self.backend = as_backend(backend)
+        self.close_backend = close_backend
+        if not isinstance(self.backend, PooledMySQLBackend):
+            max_workers = 1
+        elif max_workers is None:
+            max_workers = self.backend.pool_size
+        self.max_workers = max_workers
+        self.executor = ThreadPoolExecutor(max_workers=max_workers,
+                                           thread_name_prefix="nepc-aio")
+
+    async def run(self, func, *args, **kwargs):
+        """Run ``func(*args, **kwargs)`` on the thread pool and return its result."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor,
+                                          functools.partial(func, *args, **kwargs))
+
+    def close(self):
+        """Stop the thread pool once the queries in flight complete, and close
+        the backend if ``close_backend``."""
+        self.executor.shutdown(wait=False)
+        if self.close_backend and isinstance(self.backend, PooledMySQLBackend):
+            self.backend.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.close()
+
+
+async def connect_pool(local=False, DBUG=False, test=False, github=False, pool_size=5,
+                       timeout=None, max_workers=None):
+    """Open a :class:`Session` on a pool of connections without blocking the
+    event loop.
+
+    Parameters
+    ----------
+    local, DBUG, test, github, pool_size, timeout
+        See :func:`.connect_pool`.
+    max_workers : int, optional
+        See :class:`Session`.
+
+    Returns
+    -------
+    :class:`Session`
+        Closing the session closes the pool.
+
+    """
+    loop = asyncio.get_running_loop()
+    backend = await loop.run_in_executor(
+        None, functools.partial(nepc.connect_pool, local, DBUG, test, github,
+                                pool_size=pool_size, timeout=timeout))
+    return Session(backend, max_workers, close_backend=True)
+
+
+def as_session(session):
+    """Return ``session`` if it is a :class:`Session`.
+
+    Raises
+    ------
+    TypeError
+        For a backend or cursor: a session per lookup would query a backend
+        that is not thread-safe from several threads at once. Wrap it in one
+        :class:`Session` and pass that to every lookup instead.
+
+    """
+    if not isinstance(session, Session):
+        raise TypeError(f'expected a nepc.aio.Session, not {type(session).__name__}; '
+                        'wrap the backend or cursor in one Session')
+    return session
+
+
+async def cs_metadata(session, cs_id):
+    """See :func:`.nepc.cs_metadata`."""
+    session = as_session(session)
+    return await session.run(session.backend.cs_metadata, cs_id)
+
+
+async def cs_e_sigma(session, cs_id, window=None):
+    """See :func:`.nepc.cs_e_sigma`."""
+    session = as_session(session)
+    return await session.run(session.backend.cs_e_sigma, cs_id, window)
+
+
+async def load_cs(session, cs_id_list, batch_size=CS_BATCH_SIZE, window=None):
+    """See :func:`.nepc.load_cs`."""
+    session = as_session(session)
+    return await session.run(nepc.load_cs, session.backend, cs_id_list, batch_size,
+                             window=window)
+
+
+class CS(nepc.CS):
+    """A :class:`.nepc.CS` loaded with :meth:`load`."""
+    @classmethod
+    async def load(cls, session, cs_id, window=None):
+        """Load the cross section ``cs_id``.
+
+        Parameters
+        ----------
+        session : :class:`Session`
+        cs_id : int
+        window : :class:`.Window`, optional
+            See :func:`.nepc.load_cs`.
+
+        Returns
+        -------
+        :class:`CS`
+
+        """
+        cs = (await load_cs(session, [cs_id], window=window))[0]
+        return cls.from_query(list(cs.metadata.values()), cs.data['e'], cs.data['sigma'])
+
+
+class Model(nepc.Model):
+    """A :class:`.nepc.Model` loaded with :meth:`load`."""
+    @classmethod
+    async def load(cls, session, model_name, metadata=None, window=None):
+        """Load the model ``model_name``.
+
+        Parameters
+        ----------
+        session : :class:`Session`
+        model_name : str
+        metadata : dict, optional
+            Only load the cross sections meeting this filter (see
+            :func:`.nepc.model_cs_id_list`).
+        window : :class:`.Window`, optional
+            See :func:`.nepc.load_cs`.
+
+        Returns
+        -------
+        :class:`Model`
+
+        """
+        session = as_session(session)
+        cs_id_list = await session.run(session.backend.model_cs_id_list, model_name, metadata)
+        return cls.from_cs(await load_cs(session, cs_id_list, window=window))
@@ -0,0 +1,40 @@
+"""Backends that answer the read queries of :mod:`nepc.nepc`.
+
+Every function and class in :mod:`nepc.nepc` that takes a ``cursor`` also
+accepts a :class:`.Backend`. A MySQL cursor is wrapped in a
+:class:`.MySQLBackend`. :class:`.FileBackend` and :class:`.SnapshotBackend`
+read a NEPC database without a MySQL server, and :class:`.PooledMySQLBackend`
+reuses a pool of MySQL connections across queries. :mod:`.filters` selects
+cross sections by their metadata.
+"""
+from .base import Backend
+from .base import CS_BATCH_SIZE
+from .base import Window
+from .filters import Between
+from .mysql import MySQLBackend
+from .pool import PooledMySQLBackend
+from .files import FileBackend
+from .snapshot import SnapshotBackend
+from .snapshot import export_snapshot
+
+
+def as_backend(cursor):
+    """Return ``cursor`` if it is a :class:`.Backend`; otherwise wrap the MySQL
+    cursor in a :class:`.MySQLBackend`."""
+    if isinstance(cursor, Backend):
+        return cursor
+    return MySQLBackend(cursor)
+
+
+__all__ = [
+        'Backend',
+        'CS_BATCH_SIZE',
+        'Window',
+        'Between',
+        'MySQLBackend',
+        'PooledMySQLBackend',
+        'FileBackend',
+        'SnapshotBackend',
+        'export_snapshot',
+        'as_backend'
+        ]
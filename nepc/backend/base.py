@@ -0,0 +1,256 @@
+"""Interface shared by all NEPC database backends.
+
+A backend answers the read queries that :mod:`nepc.nepc` needs to build
+:class:`.CS` and :class:`.Model` objects. :class:`.MySQLBackend` runs them
+against a NEPC MySQL database; :class:`.FileBackend` answers them from the
+data files used to build a NEPC database.
+"""
+import re
+from abc import ABC, abstractmethod
+import numpy as np
+
+CS_BATCH_SIZE = 1000
+"""Maximum number of ``cs_id``'s in a single bulk query."""
+
+CS_METADATA_COLUMNS = ["cs_id", "process", "units_e", "units_sigma", "ref",
+                       "lhsA", "lhsB", "rhsA", "rhsB",
+                       "threshold", "wavelength", "lhs_v", "rhs_v",
+                       "lhs_j", "rhs_j",
+                       "background", "lpu", "upu",
+                       "lhsA_long", "lhsB_long", "rhsA_long", "rhsB_long",
+                       "e_on_lhs", "e_on_rhs", "hv_on_lhs", "hv_on_rhs",
+                       "v_on_lhs", "v_on_rhs", "j_on_lhs", "j_on_rhs"]
+"""Order of the items in a metadata row (see :attr:`.CS.metadata`)."""
+
+RATE_METADATA_COLUMNS = ["rate_id", "process", "ref",
+                         "lhsA", "lhsB", "rhsA", "rhsB",
+                         "threshold", "wavelength", "lhs_v", "rhs_v",
+                         "lhs_j", "rhs_j",
+                         "background", "form"]
+"""Order of the items in a rate metadata row (see :attr:`.Rate.metadata`)."""
+
+
+def batches(cs_id_list, batch_size):
+    """Yield unique ``cs_id``'s from ``cs_id_list`` in chunks of ``batch_size``."""
+    unique_cs_ids = list(dict.fromkeys(cs_id_list))
+    for i in range(0, len(unique_cs_ids), batch_size):
+        yield unique_cs_ids[i:i + batch_size]
+
+
+def df_chunks(df, chunksize):
+    """Yield consecutive DataFrames of at most ``chunksize`` rows of ``df``."""
+    for start in range(0, len(df), chunksize):
+        yield df.iloc[start:start + chunksize].reset_index(drop=True)
+
+
+def check_missing(cs_id_list, found, key="cs_id"):
+    """Raise a ValueError naming every ``cs_id`` (or other ``key``) in
+    ``cs_id_list`` that is not in ``found``."""
+    missing = [cs_id for cs_id in dict.fromkeys(cs_id_list) if cs_id not in found]
+    if missing:
+        raise ValueError(f'{key}(s) {missing} not found in the NEPC database')
+
+
+def like(pattern, name):
+    """Return True if ``name`` matches the SQL ``LIKE`` ``pattern`` (case insensitive)."""
+    regex = "".join(".*" if char == "%" else "." if char == "_" else re.escape(char)
+                    for char in pattern)
+    return re.fullmatch(regex, name, flags=re.IGNORECASE) is not None
+
+
+def ratedata_arrays(rate_id_list, rows):
+    """Group ``(rate_id, num, constant, lau, uau)`` rows, ordered by ``rate_id``
+    and ``num``, into a tuple of arrays ``(num, constant, lau, uau)`` per
+    ``rate_id``; a rate without rows gets empty arrays."""
+    ratedata = {rate_id: (np.empty(0, dtype=np.int64),) + (np.empty(0),)*3
+                for rate_id in rate_id_list}
+    rows = list(rows)
+    if not rows:
+        return ratedata
+    rate_ids = np.array([row[0] for row in rows], dtype=np.int64)
+    columns = np.array([row[1:] for row in rows], dtype=np.float64)
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(rate_ids)) + 1))
+    for start, stop in zip(starts, np.append(starts[1:], len(rows))):
+        block = columns[start:stop]
+        ratedata[int(rate_ids[start])] = (block[:, 0].astype(np.int64), block[:, 1].copy(),
+                                          block[:, 2].copy(), block[:, 3].copy())
+    return ratedata
+
+
+class Window:
+    """Part of the tabulation of a cross section to fetch.
+
+    :class:`.MySQLBackend` evaluates the window in the query, so only the
+    selected points are transferred.
+
+    Parameters
+    ----------
+    lower, upper : float, optional
+        Only keep points with ``lower <= e <= upper``; None leaves that side of
+        the window open.
+    max_points : int, optional
+        Decimate the points in the window to at most ``max_points``; None
+        keeps every point.
+    method : {'stride', 'minmax'}, optional
+        How to decimate. ``'stride'`` (default) keeps every k-th point,
+        starting with the first, for the smallest k that keeps at most
+        ``max_points``. ``'minmax'`` splits the points into ``max_points // 2``
+        runs of equal length and keeps the points with the smallest and
+        largest ``sigma`` in each run, so peaks survive decimation.
+
+    Examples
+    --------
+    >>> e_energy, sigma = nepc.cs_e_sigma(cursor, 1, window=nepc.Window(0.0, 50.0))
+    >>> fict = nepc.Model(cursor, "fict", window=nepc.Window(max_points=200, method='minmax'))
+
+    """
+    def __init__(self, lower=None, upper=None, max_points=None, method='stride'):
+        if method not in ('stride', 'minmax'):
+            raise ValueError(f"method must be 'stride' or 'minmax', not {method!r}")
+        if max_points is not None and max_points < (2 if method == 'minmax' else 1):
+            raise ValueError(f'max_points={max_points} is too small for {method!r}')
+        self.lower = lower
+        self.upper = upper
+        self.max_points = max_points
+        self.method = method
+
+    def __repr__(self):
+        return (f"Window({self.lower!r}, {self.upper!r}, "
+                f"max_points={self.max_points!r}, method={self.method!r})")
+
+    def apply(self, e_energy, sigma):
+        """Return contiguous copies of the points of ``(e_energy, sigma)`` in
+        the window, for backends that evaluate it in Python."""
+        keep = np.ones(len(e_energy), dtype=bool)
+        if self.lower is not None:
+            keep &= e_energy >= self.lower
+        if self.upper is not None:
+            keep &= e_energy <= self.upper
+        e_energy = e_energy[keep]
+        sigma = sigma[keep]
+        n = len(e_energy)
+        if self.max_points is None or n <= self.max_points:
+            return e_energy, sigma
+        if self.method == 'stride':
+            keep = np.arange(0, n, (n - 1) // self.max_points + 1)
+        else:
+            run = (n - 1) // (self.max_points // 2) + 1
+            padding = -n % run
+            starts = np.arange(0, n, run)
+            lowest = np.append(sigma, np.full(padding, np.inf)).reshape(-1, run).argmin(axis=1)
+            highest = np.append(sigma, np.full(padding, -np.inf)).reshape(-1, run).argmax(axis=1)
+            keep = np.union1d(starts + lowest, starts + highest)
+        return e_energy[keep], sigma[keep]
+
+
+class Backend(ABC):
+    """Read access to a NEPC database.
+
+    Subclasses implement the bulk queries; the single ``cs_id`` queries are
+    answered with a batch of one.
+    """
+
+    @abstractmethod
+    def count_table_rows(self, table: str):
+        """Return the number of rows in ``table`` (see :func:`.count_table_rows`)."""
+
+    @abstractmethod
+    def model_cs_id_list(self, model_name, metadata=None):
+        """Return the ``cs_id``'s for a model, ordered by ``cs_id``, optionally
+        only those meeting the :mod:`metadata filter <.filters>` ``metadata``
+        (see :func:`.model_cs_id_list`)."""
+
+    @abstractmethod
+    def cs_metadata_list(self, cs_id_list, batch_size=CS_BATCH_SIZE):
+        """Return a dict mapping each ``cs_id`` to its metadata row
+        (see :func:`.cs_metadata_list`)."""
+
+    @abstractmethod
+    def cs_e_sigma_list(self, cs_id_list, batch_size=CS_BATCH_SIZE, window=None):
+        """Return a dict mapping each ``cs_id`` to a tuple of float64 arrays
+        ``(e_energy, sigma)``, optionally only the points in the
+        :class:`.Window` ``window`` (see :func:`.cs_e_sigma_list`)."""
+
+    @abstractmethod
+    def table_as_df(self, table, columns="*", chunksize=None):
+        """Return ``table`` as a pandas DataFrame, or an iterator of DataFrames
+        of at most ``chunksize`` rows (see :func:`.table_as_df`)."""
+
+    def database_key(self):
+        """Return a string identifying the database in :data:`.CS_CACHE`, or
+        None if cross sections from this backend are not cached."""
+        return None
+
+    def fingerprint(self):
+        """Return a string that changes whenever the cross sections in the
+        database change, used to invalidate :class:`.DiskCache`, or None if
+        models from this backend are not cached on disk."""
+        return None
+
+    def cs_metadata(self, cs_id):
+        """Return the metadata row for ``cs_id`` (see :func:`.cs_metadata`)."""
+        return self.cs_metadata_list([cs_id])[cs_id]
+
+    def cs_e_sigma(self, cs_id, window=None):
+        """Return float64 arrays ``(e_energy, sigma)`` for ``cs_id``
+        (see :func:`.cs_e_sigma`)."""
+        return self.cs_e_sigma_list([cs_id], window=window)[cs_id]
+
+    def cs_e(self, cs_id, window=None):
+        """Return the electron energies for ``cs_id`` (see :func:`.cs_e`)."""
+        return self.cs_e_sigma(cs_id, window)[0]
+
+    def cs_sigma(self, cs_id, window=None):
+        """Return the cross sections for ``cs_id`` (see :func:`.cs_sigma`)."""
+        return self.cs_e_sigma(cs_id, window)[1]
+
+    def model_rate_id_list(self, model_name):
+        """Return the ``rate_id``'s for a model, ordered by ``rate_id`` (see
+        :func:`.model_rate_id_list`).
+
+        Read from the ``models`` and ``models2rate`` tables; backends on a
+        server override this with a query."""
+        models = self.table_as_df("models", ["model_id", "name"])
+        model_ids = {model_id for model_id, name in zip(models["model_id"], models["name"])
+                     if like(model_name, name)}
+        models2rate = self.table_as_df("models2rate")
+        return sorted({int(rate_id) for rate_id, model_id
+                       in zip(models2rate["rate_id"], models2rate["model_id"])
+                       if model_id in model_ids})
+
+    def rate_metadata_list(self, rate_id_list, batch_size=CS_BATCH_SIZE):
+        """Return a dict mapping each ``rate_id`` to its metadata row, in the
+        order of :data:`RATE_METADATA_COLUMNS` (see :func:`.rate_metadata_list`).
+
+        Read from the ``rate``, ``processes``, and ``states`` tables; backends
+        on a server override this with a query."""
+        processes = self.table_as_df("processes", ["id", "name"])
+        process_names = dict(zip(processes["id"], processes["name"]))
+        states = self.table_as_df("states", ["id", "name"])
+        state_names = dict(zip(states["id"], states["name"]))
+        wanted = set(rate_id_list)
+        metadata = {}
+        for row in self.table_as_df("rate").to_dict("records"):
+            rate_id = int(row["rate_id"])
+            if rate_id not in wanted:
+                continue
+            metadata[rate_id] = ([rate_id, process_names.get(row["process_id"]), row["ref"]] +
+                                 [state_names.get(row[key]) for key
+                                  in ["lhsA_id", "lhsB_id", "rhsA_id", "rhsB_id"]] +
+                                 [row[key] for key in RATE_METADATA_COLUMNS[7:]])
+        check_missing(rate_id_list, metadata, "rate_id")
+        return metadata
+
+    def ratedata_list(self, rate_id_list, batch_size=CS_BATCH_SIZE):
+        """Return a dict mapping each ``rate_id`` to a tuple of arrays ``(num,
+        constant, lau, uau)`` of its ``ratedata`` rows, ordered by ``num`` (see
+        :func:`.ratedata_list`).
+
+        Read from the ``ratedata`` table; backends on a server override this
+        with a query."""
+        ratedata = self.table_as_df("ratedata")
+        ratedata = ratedata[ratedata["rate_id"].isin(list(rate_id_list))]
+        return ratedata_arrays(rate_id_list,
+                               ratedata.sort_values(["rate_id", "num", "id"])
+                               [["rate_id", "num", "constant", "lau", "uau"]]
+                               .itertuples(index=False, name=None))
@@ -0,0 +1,270 @@
+"""Backend that reads a NEPC database directly from its data files.
+
+The data directory has the layout consumed by ``nepc/mysql/build.py``:
+``processes.tsv``, ``states.tsv``, ``species.tsv`` and ``models.tsv`` plus
+directories of ``.met``/``.dat``/``.mod`` triples, one triple per cross section.
+No MySQL server is needed.
+"""
+import csv
+import os
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+from nepc.backend.base import Backend, CS_BATCH_SIZE, check_missing, df_chunks, like
+from nepc.backend.filters import filter_cs_id_list
+
+UNDEFINED = "\\N"
+
+TABLE_COLUMNS = {
+    "species": ["id", "name", "long_name"],
+    "processes": ["id", "name", "long_name", "lhs", "rhs",
+                  "lhs_e", "rhs_e", "lhs_hv", "rhs_hv",
+                  "lhs_v", "rhs_v", "lhs_j", "rhs_j"],
+    "states": ["id", "species_id", "name", "long_name"],
+    "models": ["model_id", "name", "long_name", "ref"],
+    "cs": ["cs_id", "process_id", "units_e", "units_sigma", "ref",
+           "lhsA_id", "lhsB_id", "rhsA_id", "rhsB_id",
+           "threshold", "wavelength", "lhs_v", "rhs_v", "lhs_j", "rhs_j",
+           "background", "lpu", "upu"],
+    "csdata": ["id", "cs_id", "e", "sigma"],
+    "rate": ["rate_id", "process_id", "ref",
+             "lhsA_id", "lhsB_id", "rhsA_id", "rhsB_id",
+             "threshold", "wavelength", "lhs_v", "rhs_v", "lhs_j", "rhs_j",
+             "background", "form"],
+    "ratedata": ["id", "rate_id", "num", "constant", "lau", "uau"],
+    "models2cs": ["cs_id", "model_id"],
+    "models2rate": ["rate_id", "model_id"]}
+"""Columns of each table in a NEPC database, in schema order."""
+
+MET_FLOAT = ["units_e", "units_sigma", "threshold", "wavelength", "lpu", "upu"]
+MET_INT = ["cs_id", "lhs_v", "rhs_v", "lhs_j", "rhs_j"]
+
+
+def read_met(met_file):
+    """Return the metadata in a ``.met`` file as a dict of typed values."""
+    with open(met_file, 'r', newline='') as f:
+        reader = csv.reader(f, delimiter='\t')
+        header = next(reader)
+        values = next(reader)
+    met = dict(zip(header, values))
+    for key in MET_FLOAT:
+        met[key] = float(met[key])
+    for key in MET_INT:
+        met[key] = int(met[key])
+    return met
+
+
+def read_mod(mod_file):
+    """Return the model names in a ``.mod`` file."""
+    if not os.path.exists(mod_file):
+        return []
+    with open(mod_file, 'r', newline='') as f:
+        reader = csv.reader(f, delimiter='\t')
+        next(reader)
+        return [row[0] for row in reader if row]
+
+
+def read_met_mod(filename_wo_ext):
+    """Return the metadata (see :func:`read_met`) and model names (see
+    :func:`read_mod`) in the ``.met`` and ``.mod`` files of a cross section."""
+    return read_met(filename_wo_ext + ".met"), read_mod(filename_wo_ext + ".mod")
+
+
+def read_dat(dat_file):
+    """Return the ``csdata`` ids, electron energies, and cross sections in a
+    ``.dat`` file as contiguous arrays."""
+    dat = pd.read_csv(dat_file, sep='\t')
+    return (np.ascontiguousarray(dat.iloc[:, 0].to_numpy(dtype=np.int64)),
+            np.ascontiguousarray(dat.iloc[:, 1].to_numpy(dtype=np.float64)),
+            np.ascontiguousarray(dat.iloc[:, 2].to_numpy(dtype=np.float64)))
+
+
+def find_dir_names(nepc_data):
+    """Return every directory below ``nepc_data`` that contains ``.met`` files."""
+    dir_names = []
+    for dirpath, dirnames, filenames in os.walk(nepc_data):
+        dirnames.sort()
+        if any(filename.endswith(".met") for filename in filenames):
+            dir_names.append(os.path.relpath(dirpath, nepc_data) + "/")
+    return dir_names
+
+
+class FileBackend(Backend):
+    """A read-only NEPC database in the data files used to build it.
+
+    Files are read on first use: the ``.met`` and ``.mod`` files when metadata
+    is first requested and each ``.dat`` file when its cross section is first
+    requested.
+
+    Parameters
+    ----------
+    nepc_data : str
+        Directory containing ``processes.tsv``, ``states.tsv``, ``species.tsv``,
+        and ``models.tsv`` (e.g. ``$NEPC_HOME/tests/data``).
+    dir_names : list of str, optional
+        Directories of ``.met``/``.dat``/``.mod`` files relative to
+        ``nepc_data``. (Default is every directory below ``nepc_data`` that
+        contains ``.met`` files.)
+
+    """
+    def __init__(self, nepc_data, dir_names=None):
+        self.nepc_data = os.path.join(nepc_data, "")
+        self.dir_names = dir_names
+        self._tables = {}
+        self._files = None
+
+    def _table_tsv(self, table):
+        if table not in self._tables:
+            self._tables[table] = pd.read_csv(self.nepc_data + table + ".tsv",
+                                              sep='\t', keep_default_na=False)
+        return self._tables[table]
+
+    def _index(self):
+        """Read every ``.met`` and ``.mod`` file and resolve the metadata rows."""
+        if self._files is not None:
+            return self._files
+
+        dir_names = self.dir_names
+        if dir_names is None:
+            dir_names = find_dir_names(self.nepc_data)
+
+        processes = self._table_tsv("processes")
+        self._processes = {row["name"]: row for row in processes.to_dict("records")}
+        states = self._table_tsv("states")
+        self._states = {row["name"]: row for row in states.to_dict("records")}
+        models = self._table_tsv("models")
+        self._model_ids = dict(zip(models["name"], models["model_id"]))
+
+        files = {}
+        self._met = {}
+        self._metadata = {}
+        self._models = {}
+        for directoryname in dir_names:
+            directory = self.nepc_data + directoryname.strip("/") + "/"
+            for filename in sorted(os.listdir(directory)):
+                if not filename.endswith(".dat"):
+                    continue
+                filename_wo_ext = directory + filename.rsplit(".", 1)[0]
+                met = read_met(filename_wo_ext + ".met")
+                cs_id = met["cs_id"]
+                files[cs_id] = filename_wo_ext
+                self._met[cs_id] = met
+                self._metadata[cs_id] = self._metadata_row(met)
+                for model_name in read_mod(filename_wo_ext + ".mod"):
+                    self._models.setdefault(model_name, []).append(cs_id)
+
+        self._files = files
+        return self._files
+
+    def _state(self, name):
+        if name == UNDEFINED:
+            return None
+        return self._states.get(name)
+
+    def _metadata_row(self, met):
+        """Resolve a ``.met`` dict into a metadata row like a ``cs_metadata`` query."""
+        process = self._processes.get(met["process"])
+        states = [self._state(met[key]) for key in ["lhs_a", "lhs_b", "rhs_a", "rhs_b"]]
+        row = [met["cs_id"],
+               None if process is None else process["name"],
+               met["units_e"], met["units_sigma"], met["ref"]]
+        row += [None if state is None else state["name"] for state in states]
+        row += [met[key] for key in ["threshold", "wavelength", "lhs_v", "rhs_v",
+                                     "lhs_j", "rhs_j", "background", "lpu", "upu"]]
+        row += [None if state is None else state["long_name"] for state in states]
+        row += [None if process is None else int(process[key])
+                for key in ["lhs_e", "rhs_e", "lhs_hv", "rhs_hv",
+                            "lhs_v", "rhs_v", "lhs_j", "rhs_j"]]
+        return row
+
+    def count_table_rows(self, table: str):
+        return len(self.table_as_df(table))
+
+    def model_cs_id_list(self, model_name, metadata=None):
+        self._index()
+        cs_id_list = set()
+        for name, cs_ids in self._models.items():
+            if name in self._model_ids and like(model_name, name):
+                cs_id_list.update(cs_ids)
+        if metadata:
+            return filter_cs_id_list(self, sorted(cs_id_list), metadata)
+        return sorted(cs_id_list)
+
+    def cs_metadata_list(self, cs_id_list, batch_size=CS_BATCH_SIZE):
+        self._index()
+        check_missing(cs_id_list, self._metadata)
+        return {cs_id: list(self._metadata[cs_id]) for cs_id in cs_id_list}
+
+    def cs_e_sigma_list(self, cs_id_list, batch_size=CS_BATCH_SIZE, window=None):
+        files = self._index()
+        check_missing(cs_id_list, files)
+        e_sigma = {}
+        for cs_id in cs_id_list:
+            if cs_id not in e_sigma:
+                _, e_energy, sigma = read_dat(files[cs_id] + ".dat")
+                e_sigma[cs_id] = ((e_energy, sigma) if window is None
+                                  else window.apply(e_energy, sigma))
+        return e_sigma
+
+    def table_as_df(self, table, columns="*", chunksize=None):
+        if table not in TABLE_COLUMNS:
+            raise ValueError(f'table {table} is not in a NEPC database')
+
+        if table in ["species", "processes", "models"]:
+            df = self._table_tsv(table).copy()
+        elif table == "states":
+            species = self._table_tsv("species")
+            species_ids = dict(zip(species["name"], species["id"]))
+            df = self._table_tsv("states").copy()
+            df["species_id"] = df["species"].map(species_ids)
+        elif table == "cs":
+            df = self._cs_df()
+        elif table == "csdata":
+            df = self._csdata_df()
+        elif table == "models2cs":
+            self._index()
+            df = DataFrame([(cs_id, self._model_ids[name])
+                            for name, cs_ids in self._models.items()
+                            if name in self._model_ids
+                            for cs_id in cs_ids],
+                           columns=TABLE_COLUMNS[table])
+        else:
+            df = DataFrame(columns=TABLE_COLUMNS[table])
+
+        column_names = TABLE_COLUMNS[table] if columns == "*" else list(columns)
+        df = df[column_names].reset_index(drop=True)
+        if chunksize is not None:
+            return df_chunks(df, chunksize)
+        return df
+
+    def _cs_df(self):
+        self._index()
+        process_ids = {name: row["id"] for name, row in self._processes.items()}
+
+        def state_id(name):
+            state = self._state(name)
+            return None if state is None else state["id"]
+
+        rows = []
+        for cs_id, met in self._met.items():
+            rows.append([cs_id, process_ids.get(met["process"]),
+                         met["units_e"], met["units_sigma"], met["ref"],
+                         state_id(met["lhs_a"]), state_id(met["lhs_b"]),
+                         state_id(met["rhs_a"]), state_id(met["rhs_b"]),
+                         met["threshold"], met["wavelength"],
+                         met["lhs_v"], met["rhs_v"], met["lhs_j"], met["rhs_j"],
+                         met["background"], met["lpu"], met["upu"]])
+        return DataFrame(rows, columns=TABLE_COLUMNS["cs"])
+
+    def _csdata_df(self):
+        files = self._index()
+        frames = []
+        for cs_id, filename_wo_ext in files.items():
+            csdata_id, e_energy, sigma = read_dat(filename_wo_ext + ".dat")
+            frames.append(DataFrame({"id": csdata_id,
+                                     "cs_id": cs_id,
+                                     "e": e_energy,
+                                     "sigma": sigma}))
+        if not frames:
+            return DataFrame(columns=TABLE_COLUMNS["csdata"])
+        return pd.concat(frames, ignore_index=True)
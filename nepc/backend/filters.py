@@ -0,0 +1,80 @@
+"""Metadata filters for selecting cross sections.
+
+A filter is a dict mapping keys of :attr:`.CS.metadata` to conditions:
+
+ - a value: the metadata equals the value (None matches a NULL)
+ - a set, list, or tuple: the metadata is one of the values
+ - a :class:`.Between`: the metadata is in a closed range
+
+All conditions must hold. Strings match exactly: case and trailing spaces
+matter. :class:`.MySQLBackend` compiles a filter into a parameterized
+``WHERE`` clause that compares strings as bytes rather than under the
+case-insensitive collation of the tables, so only matching cross sections
+are transferred; other backends and :meth:`.Model.subset` evaluate it with
+:func:`.metadata_matches`.
+
+Examples
+--------
+    >>> nepc.CustomModel(cursor, model_name="fict",
+    ...                  metadata={'process': {'excitation', 'ionization'},
+    ...                            'threshold': nepc.Between(5.0, 10.0),
+    ...                            'lhsA': 'N2(X1Sigmag+)'})
+"""
+from nepc.backend.base import CS_METADATA_COLUMNS
+
+
+class Between:
+    """Condition that a value is in the closed range ``[lower, upper]``.
+
+    Parameters
+    ----------
+    lower, upper : float or None
+        Bounds; None leaves that side of the range open.
+
+    """
+    def __init__(self, lower=None, upper=None):
+        self.lower = lower
+        self.upper = upper
+
+    def __repr__(self):
+        return f"Between({self.lower!r}, {self.upper!r})"
+
+    def __contains__(self, value):
+        if value is None:
+            return False
+        return ((self.lower is None or value >= self.lower) and
+                (self.upper is None or value <= self.upper))
+
+
+def check_filter(metadata):
+    """Raise a ValueError naming every key of ``metadata`` that is not a key of
+    :attr:`.CS.metadata`."""
+    unknown = [key for key in metadata if key not in CS_METADATA_COLUMNS]
+    if unknown:
+        raise ValueError(f'unknown metadata key(s) {unknown}; '
+                         f'must be one of {CS_METADATA_COLUMNS}')
+
+
+def condition_matches(value, condition):
+    """Return True if the metadata ``value`` meets ``condition``."""
+    if isinstance(condition, Between):
+        return value in condition
+    if isinstance(condition, (set, frozenset, list, tuple)):
+        return value in condition
+    return value == condition
+
+
+def metadata_matches(metadata, metadata_filter):
+    """Return True if the :attr:`.CS.metadata` dict ``metadata`` meets every
+    condition in ``metadata_filter``."""
+    return all(condition_matches(metadata[key], condition)
+               for key, condition in metadata_filter.items())
+
+
+def filter_cs_id_list(backend, cs_id_list, metadata_filter):
+    """Return the ``cs_id``'s in ``cs_id_list`` whose metadata in ``backend``
+    meets ``metadata_filter``, evaluated in Python."""
+    check_filter(metadata_filter)
+    rows = backend.cs_metadata_list(cs_id_list)
+    return [cs_id for cs_id in cs_id_list
+            if metadata_matches(dict(zip(CS_METADATA_COLUMNS, rows[cs_id])), metadata_filter)]
@@ -0,0 +1,571 @@
+"""Backend for a NEPC database on a MySQL server.
+
+Queries are run as prepared statements with bound parameters. The prepared
+statements are kept per cursor (see :func:`statement_cache`), so every
+backend on a cursor reuses them and MySQL parses each statement once per
+session. :class:`.PooledMySQLBackend` keeps them per pooled connection
+instead, since each checkout queries on a fresh cursor.
+"""
+import re
+import threading
+import weakref
+from collections import OrderedDict
+import numpy as np
+from mysql.connector import FieldType
+from pandas import DataFrame
+from nepc.backend.base import (Backend, CS_BATCH_SIZE, CS_METADATA_COLUMNS, batches,
+                               check_missing, ratedata_arrays)
+from nepc.backend.filters import Between, check_filter
+
+METADATA_JOINS = ("LEFT JOIN `processes` AS C "
+                  "ON C.`id` = A.`process_id` "
+                  "LEFT JOIN `states` AS D "
+                  "ON D.`id` = A.`lhsA_id` "
+                  "LEFT JOIN `states` AS E "
+                  "ON E.`id` = A.`lhsB_id` "
+                  "LEFT JOIN `states` AS F "
+                  "ON F.`id` = A.`rhsA_id` "
+                  "LEFT JOIN `states` AS G "
+                  "ON G.`id` = A.`rhsB_id` ")
+"""Joins of the ``cs`` table ``A`` with the tables holding its metadata."""
+
+CS_METADATA_QUERY = ("SELECT A.`cs_id` , "
+                     "C.`name` , "
+                     "A.`units_e`, A.`units_sigma`, A.`ref`, "
+                     "D.`name`, E.`name`, "
+                     "F.`name`, G.`name`, "
+                     "A.`threshold`, A.`wavelength`, A.`lhs_v`, A.`rhs_v`, "
+                     "A.`lhs_j`, A.`rhs_j`, "
+                     "A.`background`, A.`lpu`, A.`upu`, "
+                     "D.`long_name`, E.`long_name`, "
+                     "F.`long_name`, G.`long_name`, "
+                     "C.`lhs_e`, C.`rhs_e`, "
+                     "C.`lhs_hv`, C.`rhs_hv`, "
+                     "C.`lhs_v`, C.`rhs_v`, "
+                     "C.`lhs_j`, C.`rhs_j` "
+                     "FROM `cs` AS A " + METADATA_JOINS)
+"""Query for the items of :attr:`.CS.metadata` (without a WHERE clause)."""
+
+METADATA_SQL = dict(zip(CS_METADATA_COLUMNS,
+                        ["A.`cs_id`", "C.`name`",
+                         "A.`units_e`", "A.`units_sigma`", "A.`ref`",
+                         "D.`name`", "E.`name`", "F.`name`", "G.`name`",
+                         "A.`threshold`", "A.`wavelength`", "A.`lhs_v`", "A.`rhs_v`",
+                         "A.`lhs_j`", "A.`rhs_j`",
+                         "A.`background`", "A.`lpu`", "A.`upu`",
+                         "D.`long_name`", "E.`long_name`", "F.`long_name`", "G.`long_name`",
+                         "C.`lhs_e`", "C.`rhs_e`", "C.`lhs_hv`", "C.`rhs_hv`",
+                         "C.`lhs_v`", "C.`rhs_v`", "C.`lhs_j`", "C.`rhs_j`"]))
+"""Column of :data:`METADATA_JOINS` holding each item of :attr:`.CS.metadata`."""
+
+STRING_METADATA = {"process", "ref", "lhsA", "lhsB", "rhsA", "rhsB", "background",
+                   "lhsA_long", "lhsB_long", "rhsA_long", "rhsB_long"}
+"""Items of :attr:`.CS.metadata` that :func:`where_clause` compares as bytes,
+so that matching is exact as in :func:`.metadata_matches`, instead of
+following the case-insensitive collation of the tables."""
+
+MODEL_CS_ID_QUERY = ("SELECT A.`cs_id` "
+                     "FROM `cs` AS A "
+                     "JOIN `models2cs` AS m2cs ON m2cs.`cs_id` = A.`cs_id` "
+                     "JOIN `models` AS m ON m.`model_id` = m2cs.`model_id` ")
+"""Query for the ``cs_id``'s of the models ``m`` (without a WHERE clause);
+add :data:`METADATA_JOINS` to filter with :func:`where_clause`."""
+
+RATE_METADATA_QUERY = ("SELECT A.`rate_id`, "
+                       "C.`name`, A.`ref`, "
+                       "D.`name`, E.`name`, "
+                       "F.`name`, G.`name`, "
+                       "A.`threshold`, A.`wavelength`, A.`lhs_v`, A.`rhs_v`, "
+                       "A.`lhs_j`, A.`rhs_j`, "
+                       "A.`background`, A.`form` "
+                       "FROM `rate` AS A " + METADATA_JOINS)
+"""Query for the items of :attr:`.Rate.metadata` (without a WHERE clause)."""
+
+MODEL_RATE_ID_QUERY = ("SELECT DISTINCT m2rate.`rate_id` "
+                       "FROM `models2rate` AS m2rate "
+                       "JOIN `models` AS m ON m.`model_id` = m2rate.`model_id` "
+                       "WHERE m.`name` LIKE %s "
+                       "ORDER BY m2rate.`rate_id`")
+"""Query for the ``rate_id``'s of the models named like a pattern."""
+
+FINGERPRINT_QUERY = ("SELECT (SELECT COUNT(*) FROM `cs`), (SELECT MAX(`cs_id`) FROM `cs`), "
+                     "(SELECT MAX(`id`) FROM `csdata`), "
+                     "(SELECT COUNT(*) FROM `models2cs`), "
+                     "(SELECT COUNT(*) FROM `models`), (SELECT MAX(`model_id`) FROM `models`), "
+                     "(SELECT COUNT(*) FROM `processes`), (SELECT COUNT(*) FROM `states`), "
+                     "(SELECT COUNT(*) FROM information_schema.tables "
+                     "WHERE table_schema = DATABASE() AND table_name = 'build_manifest')")
+"""Query for the row counts and maximum ids that make up :meth:`.MySQLBackend.fingerprint`."""
+
+MANIFEST_FINGERPRINT_QUERY = ("SELECT COUNT(*), "
+                              "BIT_XOR(CAST(CONV(LEFT(SHA2(CONCAT(`filename`, `sha256`, "
+                              "IFNULL(`cs_id`, '')), 256), 16), 16, 10) AS UNSIGNED)) "
+                              "FROM `build_manifest`")
+"""Query for an order independent digest of ``build_manifest``, which changes
+when an incremental build replaces a cross section in place."""
+
+
+TABLE_CHUNKSIZE = 100000
+"""Number of rows read at a time by :meth:`.MySQLBackend.table_as_df`."""
+
+FLOAT_TYPES = {FieldType.FLOAT, FieldType.DOUBLE}
+INT_TYPES = {FieldType.TINY, FieldType.SHORT, FieldType.INT24, FieldType.LONG,
+             FieldType.LONGLONG}
+
+STATEMENT_CACHE_SIZE = 64
+"""Maximum number of prepared statements kept per cursor."""
+
+_STATEMENT_CACHES = weakref.WeakKeyDictionary()
+_STATEMENT_CACHES_LOCK = threading.Lock()
+
+_DATABASE_KEYS = weakref.WeakKeyDictionary()
+_DATABASE_KEYS_LOCK = threading.Lock()
+
+
+def cursor_connection(cursor):
+    """Return the connection of a mysql.connector cursor, or None.
+
+    mysql.connector keeps it in ``_connection`` (pure Python) or ``_cnx``
+    (C extension).
+    """
+    return getattr(cursor, '_connection', None) or getattr(cursor, '_cnx', None)
+
+
+class StatementCache:
+    """Prepared statements on the connection of a MySQL cursor.
+
+    Each statement gets its own prepared cursor, so it is prepared once and
+    then only executed. The least recently used statements are closed
+    beyond ``max_size``.
+
+    Parameters
+    ----------
+    cursor : cursor.MySQLCursor or None
+        A cursor on the connection; with None, no statement is prepared.
+    max_size : int, optional
+        Default :data:`STATEMENT_CACHE_SIZE`.
+
+    """
+    def __init__(self, cursor, max_size=STATEMENT_CACHE_SIZE):
+        self.max_size = max_size
+        # the cache must not refer to the cursor itself, which is its key in
+        # _STATEMENT_CACHES
+        self.connection = cursor_connection(cursor)
+        self._statements = OrderedDict()
+
+    def __len__(self):
+        return len(self._statements)
+
+    def get(self, operation):
+        """Return the prepared cursor for ``operation``, or None if the
+        connection cannot prepare statements."""
+        prepared = self._statements.get(operation)
+        if prepared is not None:
+            self._statements.move_to_end(operation)
+            return prepared
+        if self.connection is None:
+            return None
+        try:
+            prepared = self.connection.cursor(prepared=True)
+        except (AttributeError, TypeError, NotImplementedError):
+            self.connection = None
+            return None
+        self._statements[operation] = prepared
+        while len(self._statements) > self.max_size:
+            self._statements.popitem(last=False)[1].close()
+        return prepared
+
+    def close(self):
+        """Close every prepared statement."""
+        for prepared in self._statements.values():
+            prepared.close()
+        self._statements.clear()
+
+
+def statement_cache(cursor):
+    """Return the :class:`StatementCache` of ``cursor``, creating it on first use."""
+    with _STATEMENT_CACHES_LOCK:
+        try:
+            cache = _STATEMENT_CACHES.get(cursor)
+            if cache is None:
+                cache = _STATEMENT_CACHES[cursor] = StatementCache(cursor)
+        except TypeError:
+            # the cursor cannot be weakly referenced; its statements are not shared
+            cache = StatementCache(cursor)
+        return cache
+
+
+def cursor_database_key(cursor):
+    """Return the :meth:`.Backend.database_key` of the database of ``cursor``,
+    querying the server only the first time for each cursor."""
+    with _DATABASE_KEYS_LOCK:
+        try:
+            key = _DATABASE_KEYS.get(cursor)
+        except TypeError:
+            key = None
+    if key is not None:
+        return key
+    cursor.execute("SELECT @@hostname, @@port, DATABASE()")
+    hostname, port, database = cursor.fetchall()[0]
+    key = f"{hostname}:{port}/{database}"
+    with _DATABASE_KEYS_LOCK:
+        try:
+            _DATABASE_KEYS[cursor] = key
+        except TypeError:
+            # the cursor cannot be weakly referenced; its key is not remembered
+            pass
+    return key
+
+
+def column(rows, index):
+    """Return column ``index`` of query result ``rows`` as a contiguous float64 array."""
+    return np.fromiter((row[index] for row in rows), dtype=np.float64, count=len(rows))
+
+
+def column_dtypes(description):
+    """Return the dtype to read each column of a cursor ``description`` into:
+    float64 or int64 for numeric columns that are NOT NULL, and None for
+    other columns, which are left to pandas."""
+    dtypes = []
+    for column_info in description:
+        type_code, null_ok = column_info[1], column_info[6]
+        if not null_ok and type_code in FLOAT_TYPES:
+            dtypes.append(np.float64)
+        elif not null_ok and type_code in INT_TYPES:
+            dtypes.append(np.int64)
+        else:
+            dtypes.append(None)
+    return dtypes
+
+
+def read_columns(rows, dtypes):
+    """Return the columns of query result ``rows``: an array for each column
+    with a dtype (see :func:`column_dtypes`), otherwise a list."""
+    return [[row[i] for row in rows] if dtype is None
+            else np.fromiter((row[i] for row in rows), dtype=dtype, count=len(rows))
+            for i, dtype in enumerate(dtypes)]
+
+
+def quoted(name, kind="table"):
+    """Return the identifier ``name`` quoted with backticks.
+
+    Raises
+    ------
+    ValueError
+        If ``name`` is not made of letters, digits, and underscores.
+
+    """
+    if not isinstance(name, str) or not re.fullmatch(r"\w+", name):
+        raise ValueError(f'invalid {kind} name {name!r}')
+    return "`" + name + "`"
+
+
+def in_clause(batch):
+    """Return the placeholder list for ``IN (...)`` with one ``%s`` per item."""
+    return "(" + ", ".join(["%s"]*len(batch)) + ")"
+
+
+def padded(batch):
+    """Return ``batch`` padded to a power of two by repeating its last item, so
+    that batches of similar length share one prepared ``IN (...)`` statement."""
+    size = 1 << (len(batch) - 1).bit_length()
+    return list(batch) + [batch[-1]]*(size - len(batch))
+
+
+def decoded(row):
+    """Return ``row`` with bytes decoded to str; older versions of
+    mysql.connector return text columns of prepared statements as bytearray."""
+    return [value.decode() if isinstance(value, (bytes, bytearray)) else value
+            for value in row]
+
+
+def where_clause(metadata_filter):
+    """Compile a :mod:`metadata filter <.filters>` into conditions on
+    :data:`METADATA_JOINS`.
+
+    Returns
+    -------
+    conditions : list of str
+        Conditions to combine with ``AND``, with ``%s`` placeholders.
+    params : list
+        Values of the placeholders, in order.
+
+    """
+    check_filter(metadata_filter)
+    conditions = []
+    params = []
+    for key, condition in metadata_filter.items():
+        sql = METADATA_SQL[key]
+        value_sql = "%s"
+        if key in STRING_METADATA:
+            sql = "CAST(" + sql + " AS BINARY)"
+            value_sql = "CAST(%s AS BINARY)"
+        if isinstance(condition, Between):
+            if condition.lower is None and condition.upper is None:
+                conditions.append(sql + " IS NOT NULL")
+            if condition.lower is not None:
+                conditions.append(sql + " >= " + value_sql)
+                params.append(condition.lower)
+            if condition.upper is not None:
+                conditions.append(sql + " <= " + value_sql)
+                params.append(condition.upper)
+        elif isinstance(condition, (set, frozenset, list, tuple)):
+            values = [value for value in condition if value is not None]
+            alternatives = []
+            if values:
+                alternatives.append(sql + " IN (" + ", ".join([value_sql]*len(values)) + ")")
+                params.extend(values)
+            if len(values) < len(condition):
+                alternatives.append(sql + " IS NULL")
+            conditions.append("(" + " OR ".join(alternatives) + ")" if alternatives
+                              else "FALSE")
+        elif condition is None:
+            conditions.append(sql + " IS NULL")
+        else:
+            conditions.append(sql + " = " + value_sql)
+            params.append(condition)
+    return conditions, params
+
+
+def csdata_query(columns, batch, window=None):
+    """Return a query for ``columns`` of the ``csdata`` rows of the ``cs_id``'s
+    in ``batch``, ordered by ``cs_id`` and ``id``, and its parameters.
+
+    With a :class:`.Window`, the energy range is a condition of the query and
+    decimation numbers the rows of each cross section with window functions
+    (MySQL 8.0), so only the points that are kept are transferred. The
+    decimation is the same as :meth:`.Window.apply`.
+
+    """
+    conditions = ["cs_id IN " + in_clause(batch)]
+    params = list(batch)
+    if window is not None and window.lower is not None:
+        conditions.append("e >= %s")
+        params.append(window.lower)
+    if window is not None and window.upper is not None:
+        conditions.append("e <= %s")
+        params.append(window.upper)
+    where = " AND ".join(conditions)
+    if window is None or window.max_points is None:
+        return ("SELECT " + columns + " FROM csdata WHERE " + where + " ORDER BY cs_id, id",
+                tuple(params))
+
+    # number the rows of each cross section in the window: k = 0, ..., n - 1
+    numbered = ("SELECT cs_id, id, e, sigma, "
+                "ROW_NUMBER() OVER (PARTITION BY cs_id ORDER BY id) - 1 AS k, "
+                "COUNT(*) OVER (PARTITION BY cs_id) AS n "
+                "FROM csdata WHERE " + where)
+    if window.method == 'stride':
+        return ("SELECT " + columns + " FROM (" + numbered + ") AS W "
+                "WHERE n <= %s OR MOD(k, FLOOR((n - 1) / %s) + 1) = 0 "
+                "ORDER BY cs_id, id",
+                tuple(params + [window.max_points, window.max_points]))
+
+    runs = window.max_points // 2
+    in_runs = ("SELECT cs_id, id, e, sigma, n, "
+               "FLOOR(k / (FLOOR((n - 1) / %s) + 1)) AS run "
+               "FROM (" + numbered + ") AS K")
+    ranked = ("SELECT cs_id, id, e, sigma, n, "
+              "ROW_NUMBER() OVER (PARTITION BY cs_id, run ORDER BY sigma, id) AS lowest, "
+              "ROW_NUMBER() OVER (PARTITION BY cs_id, run ORDER BY sigma DESC, id) AS highest "
+              "FROM (" + in_runs + ") AS R")
+    return ("SELECT " + columns + " FROM (" + ranked + ") AS W "
+            "WHERE n <= %s OR lowest = 1 OR highest = 1 "
+            "ORDER BY cs_id, id",
+            tuple([runs] + params + [window.max_points]))
+
+
+class MySQLBackend(Backend):
+    """A NEPC database on a MySQL server.
+
+    Parameters
+    ----------
+    cursor : cursor.MySQLCursor
+        A MySQLCursor object. See return value ``cursor`` of :func:`.connect`.
+    statements : :class:`StatementCache`, optional
+        Prepared statements to run the queries with; by default, those of
+        ``cursor`` (see :func:`statement_cache`).
+
+    """
+    def __init__(self, cursor, statements=None):
+        self.cursor = cursor
+        self.statements = statement_cache(cursor) if statements is None else statements
+
+    def execute(self, operation, params=()):
+        """Execute ``operation`` as a prepared statement with ``params`` bound to
+        its ``%s`` placeholders and return the rows.
+
+        Falls back to executing it on :attr:`cursor` (still with bound
+        parameters) if the connection cannot prepare statements.
+        """
+        cursor = self.statements.get(operation) or self.cursor
+        cursor.execute(operation, tuple(params))
+        return cursor.fetchall()
+
+    def close(self):
+        """Close the prepared statements of the cursor."""
+        self.statements.close()
+
+    def database_key(self):
+        return cursor_database_key(self.cursor)
+
+    def fingerprint(self):
+        self.cursor.execute(FINGERPRINT_QUERY)
+        values = list(self.cursor.fetchall()[0])
+        if values.pop():
+            self.cursor.execute(MANIFEST_FINGERPRINT_QUERY)
+            values.extend(self.cursor.fetchall()[0])
+        return "-".join(str(value) for value in values)
+
+    def count_table_rows(self, table: str):
+        table_rows = self.execute("SELECT COUNT(*) FROM " + quoted(table))
+        return table_rows[0][0]
+
+    def model_cs_id_list(self, model_name, metadata=None):
+        query = MODEL_CS_ID_QUERY
+        conditions, params = ["m.`name` LIKE %s"], [model_name]
+        if metadata:
+            query += METADATA_JOINS
+            metadata_conditions, metadata_params = where_clause(metadata)
+            conditions += metadata_conditions
+            params += metadata_params
+        cs_id_list = self.execute(query + "WHERE " + " AND ".join(conditions) + " "
+                                  "ORDER BY A.`cs_id`", params)
+        return [cs_id[0] for cs_id in cs_id_list]
+
+    def cs_metadata(self, cs_id):
+        rows = self.execute(CS_METADATA_QUERY + "WHERE A.`cs_id` = %s", (cs_id,))
+        if not rows:
+            check_missing([cs_id], {})
+        return decoded(rows[0])
+
+    def cs_metadata_list(self, cs_id_list, batch_size=CS_BATCH_SIZE):
+        metadata = {}
+        for batch in batches(cs_id_list, batch_size):
+            batch = padded(batch)
+            for row in self.execute(CS_METADATA_QUERY +
+                                    "WHERE A.`cs_id` IN " + in_clause(batch), batch):
+                metadata[row[0]] = decoded(row)
+
+        check_missing(cs_id_list, metadata)
+        return metadata
+
+    def cs_e_sigma(self, cs_id, window=None):
+        cross_section = self.execute(*csdata_query("e, sigma", [cs_id], window))
+        return column(cross_section, 0), column(cross_section, 1)
+
+    def cs_e(self, cs_id, window=None):
+        return column(self.execute(*csdata_query("e", [cs_id], window)), 0)
+
+    def cs_sigma(self, cs_id, window=None):
+        return column(self.execute(*csdata_query("sigma", [cs_id], window)), 0)
+
+    def cs_e_sigma_list(self, cs_id_list, batch_size=CS_BATCH_SIZE, window=None):
+        empty = np.empty(0, dtype=np.float64)
+        e_sigma = {cs_id: (empty, empty) for cs_id in cs_id_list}
+        for batch in batches(cs_id_list, batch_size):
+            rows = self.execute(*csdata_query("cs_id, e, sigma", padded(batch),
+                                              window))
+            if not rows:
+                continue
+            cs_ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+            e_energy = column(rows, 1)
+            sigma = column(rows, 2)
+            # rows are ordered by cs_id, so each cross section is a contiguous
+            # slice (a view) of the batch arrays
+            starts = np.concatenate(([0], np.flatnonzero(np.diff(cs_ids)) + 1))
+            stops = np.append(starts[1:], len(rows))
+            for start, stop in zip(starts, stops):
+                e_sigma[int(cs_ids[start])] = (e_energy[start:stop], sigma[start:stop])
+        return e_sigma
+
+    def model_rate_id_list(self, model_name):
+        return [row[0] for row in self.execute(MODEL_RATE_ID_QUERY, (model_name,))]
+
+    def rate_metadata_list(self, rate_id_list, batch_size=CS_BATCH_SIZE):
+        metadata = {}
+        for batch in batches(rate_id_list, batch_size):
+            batch = padded(batch)
+            for row in self.execute(RATE_METADATA_QUERY +
+                                    "WHERE A.`rate_id` IN " + in_clause(batch), batch):
+                metadata[row[0]] = decoded(row)
+
+        check_missing(rate_id_list, metadata, "rate_id")
+        return metadata
+
+    def ratedata_list(self, rate_id_list, batch_size=CS_BATCH_SIZE):
+        rows = []
+        for batch in batches(rate_id_list, batch_size):
+            batch = padded(batch)
+            rows += self.execute("SELECT `rate_id`, `num`, `constant`, `lau`, `uau` "
+                                 "FROM `ratedata` "
+                                 "WHERE `rate_id` IN " + in_clause(batch) + " "
+                                 "ORDER BY `rate_id`, `num`, `id`", batch)
+        return ratedata_arrays(rate_id_list, rows)
+
+    def table_as_df(self, table, columns="*", chunksize=None):
+        table_sql = quoted(table)
+        if columns == "*":
+            self.cursor.execute("SHOW COLUMNS FROM " + table_sql)
+            mysql_column_info = self.cursor.fetchall()
+            column_names = []
+            for col in mysql_column_info:
+                column_names.append(decoded(col)[0])
+        else:
+            column_names = list(columns)
+
+        query = ("SELECT " + ", ".join(quoted(name, "column") for name in column_names) +
+                 " FROM " + table_sql)
+        if chunksize is not None:
+            return (DataFrame(dict(zip(column_names, chunk)), columns=column_names)
+                    for chunk in self._read_chunks(query, chunksize))
+
+        # numeric columns are written into arrays of the size of the table,
+        # so only one chunk of rows is held as Python objects at a time
+        n_rows = self.count_table_rows(table)
+        data = None
+        start = 0
+        for chunk in self._read_chunks(query, TABLE_CHUNKSIZE):
+            if data is None:
+                data = [[] if isinstance(values, list) else np.empty(n_rows, dtype=values.dtype)
+                        for values in chunk]
+            stop = start + len(chunk[0])
+            for i, values in enumerate(chunk):
+                if isinstance(values, list):
+                    data[i].extend(values)
+                elif stop <= len(data[i]):
+                    data[i][start:stop] = values
+                else:
+                    # rows were added after the table was counted
+                    data[i] = np.concatenate((data[i][:start], values))
+            start = stop
+        if data is None:
+            return DataFrame(columns=column_names)
+        return DataFrame(dict(zip(column_names, [values[:start] for values in data])),
+                         columns=column_names)
+
+    def _read_chunks(self, query, chunksize):
+        """Execute ``query`` on an unbuffered cursor and yield the columns of its
+        rows (see :func:`read_columns`), ``chunksize`` rows at a time.
+
+        Rows are streamed from the server; the connection cannot run other
+        queries until the iterator is exhausted or closed.
+        """
+        connection = cursor_connection(self.cursor)
+        cursor = self.cursor if connection is None else connection.cursor(buffered=False)
+        executed = False
+        try:
+            cursor.execute(query)
+            executed = True
+            dtypes = column_dtypes(cursor.description)
+            rows = cursor.fetchmany(chunksize)
+            while rows:
+                yield read_columns(rows, dtypes)
+                rows = cursor.fetchmany(chunksize)
+        finally:
+            # a consumer that stops early leaves rows unread, which would
+            # block the next query on the connection
+            while executed and cursor.fetchmany(chunksize):
+                pass
+            if cursor is not self.cursor:
+                cursor.close()
@@ -0,0 +1,228 @@
+"""Backend for a NEPC database on a MySQL server, reached through a pool of
+connections that are opened once and reused.
+"""
+import itertools
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+import mysql.connector
+from mysql.connector import pooling
+from nepc.backend.base import Backend, CS_BATCH_SIZE
+from nepc.backend.mysql import MySQLBackend, StatementCache
+
+_POOL_NAMES = itertools.count()
+
+
+class PooledMySQLBackend(Backend):
+    """A NEPC database on a MySQL server, queried over a pool of connections.
+
+    A session for services that answer many short requests: the connections
+    are opened when the pool is created, so a query only pays for checking
+    out a connection, not for the TCP and authentication handshake. Each
+    query checks out a connection, runs on a fresh cursor, and returns the
+    connection to the pool, so one session can be shared between threads.
+    Prepared statements are kept per connection, so each statement is
+    prepared once per connection rather than once per checkout. The pool
+    checks that a connection is alive when it is checked out and reconnects
+    it if the server dropped it.
+
+    Parameters
+    ----------
+    pool_size : int, optional
+        Number of connections (at most 32).
+    timeout : float, optional
+        Seconds to wait for a free connection before raising
+        ``mysql.connector.errors.PoolError``; None waits forever.
+    reset_session : bool, optional
+        Reset session variables and temporary tables when a connection is
+        returned to the pool (default False). A reset also drops the
+        prepared statements of the connection, so queries are then run
+        without preparing them.
+    **config
+        Arguments of ``mysql.connector.connect`` (``host``, ``user``,
+        ``database``, ...).
+
+    Examples
+    --------
+    >>> session = nepc.connect_pool(local=True, test=True)
+    >>> fict = nepc.Model(session, "fict")
+    >>> with session.connection() as cnx:
+    ...     cursor = cnx.cursor()
+    ...     cursor.execute("SELECT COUNT(*) FROM cs")
+    ...     cursor.fetchall()
+    >>> session.close()
+
+    """
+    def __init__(self, pool_size=5, timeout=None, reset_session=False, **config):
+        self.pool = pooling.MySQLConnectionPool(pool_size=pool_size,
+                                                pool_name="nepc_" + str(next(_POOL_NAMES)),
+                                                pool_reset_session=reset_session,
+                                                **config)
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.reset_session = reset_session
+        self.closed = False
+        self._database_key = None
+        self._free = threading.BoundedSemaphore(pool_size)
+        # StatementCache of each connection, by its connection_id on the server
+        self._statements = OrderedDict()
+        self._statements_lock = threading.Lock()
+
+    @contextmanager
+    def connection(self):
+        """Check out a connection, returning it to the pool on exit.
+
+        Yields
+        ------
+        pooling.PooledMySQLConnection
+
+        """
+        if self.closed:
+            raise mysql.connector.errors.PoolError('session is closed')
+        if not self._free.acquire(timeout=-1 if self.timeout is None else self.timeout):
+            raise mysql.connector.errors.PoolError(
+                f'no free connection after {self.timeout} s')
+        try:
+            cnx = self.pool.get_connection()
+            try:
+                yield cnx
+            finally:
+                cnx.close()
+                if self.closed:
+                    self._disconnect_idle()
+        finally:
+            self._free.release()
+
+    @contextmanager
+    def backend(self):
+        """Check out a connection and yield a :class:`.MySQLBackend` on a
+        cursor of it, so several queries can share one checkout."""
+        with self.connection() as cnx:
+            cursor = cnx.cursor()
+            try:
+                yield MySQLBackend(cursor, self._statement_cache(cnx, cursor))
+            finally:
+                cursor.close()
+
+    def _statement_cache(self, cnx, cursor):
+        """Return the prepared statements of the checked out connection
+        ``cnx``, creating them on first use.
+
+        Only the thread that checked out ``cnx`` uses them until it is
+        returned. With ``reset_session``, nothing would survive the checkout,
+        so an empty cache that prepares nothing is returned.
+        """
+        if self.reset_session:
+            return StatementCache(None)
+        # a reconnected connection gets a new connection_id, and so new statements
+        key = cnx.connection_id
+        with self._statements_lock:
+            statements = self._statements.get(key)
+            if statements is None:
+                statements = self._statements[key] = StatementCache(cursor)
+                # drop the statements of connections that were replaced
+                while len(self._statements) > self.pool_size:
+                    self._statements.popitem(last=False)
+            self._statements.move_to_end(key)
+            return statements
+
+    def is_healthy(self):
+        """Return True if a connection can be checked out and answers a query."""
+        try:
+            with self.backend() as backend:
+                backend.cursor.execute("SELECT 1")
+                return backend.cursor.fetchall() == [(1,)]
+        except mysql.connector.Error:
+            return False
+
+    def close(self):
+        """Close every idle connection; checked out connections close when
+        they are returned."""
+        self.closed = True
+        with self._statements_lock:
+            self._statements.clear()
+        self._disconnect_idle()
+
+    def _disconnect_idle(self):
+        """Check out every idle connection and disconnect it instead of
+        returning it, using only the public API of the pool."""
+        for _ in range(self.pool_size):
+            try:
+                cnx = self.pool.get_connection()
+            except mysql.connector.errors.PoolError:
+                return
+            except mysql.connector.Error:
+                # dropped by the server and could not reconnect: already closed
+                continue
+            cnx.disconnect()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def database_key(self):
+        if self._database_key is None:
+            with self.backend() as backend:
+                self._database_key = backend.database_key()
+        return self._database_key
+
+    def fingerprint(self):
+        with self.backend() as backend:
+            return backend.fingerprint()
+
+    def count_table_rows(self, table: str):
+        with self.backend() as backend:
+            return backend.count_table_rows(table)
+
+    def model_cs_id_list(self, model_name, metadata=None):
+        with self.backend() as backend:
+            return backend.model_cs_id_list(model_name, metadata)
+
+    def cs_metadata(self, cs_id):
+        with self.backend() as backend:
+            return backend.cs_metadata(cs_id)
+
+    def cs_metadata_list(self, cs_id_list, batch_size=CS_BATCH_SIZE):
+        with self.backend() as backend:
+            return backend.cs_metadata_list(cs_id_list, batch_size)
+
+    def cs_e_sigma(self, cs_id, window=None):
+        with self.backend() as backend:
+            return backend.cs_e_sigma(cs_id, window)
+
+    def cs_e(self, cs_id, window=None):
+        with self.backend() as backend:
+            return backend.cs_e(cs_id, window)
+
+    def cs_sigma(self, cs_id, window=None):
+        with self.backend() as backend:
+            return backend.cs_sigma(cs_id, window)
+
+    def cs_e_sigma_list(self, cs_id_list, batch_size=CS_BATCH_SIZE, window=None):
+        with self.backend() as backend:
+            return backend.cs_e_sigma_list(cs_id_list, batch_size, window)
+
+    def model_rate_id_list(self, model_name):
+        with self.backend() as backend:
+            return backend.model_rate_id_list(model_name)
+
+    def rate_metadata_list(self, rate_id_list, batch_size=CS_BATCH_SIZE):
+        with self.backend() as backend:
+            return backend.rate_metadata_list(rate_id_list, batch_size)
+
+    def ratedata_list(self, rate_id_list, batch_size=CS_BATCH_SIZE):
+        with self.backend() as backend:
+            return backend.ratedata_list(rate_id_list, batch_size)
+
+    def table_as_df(self, table, columns="*", chunksize=None):
+        if chunksize is not None:
+            return self._table_chunks(table, columns, chunksize)
+        with self.backend() as backend:
+            return backend.table_as_df(table, columns)
+
+    def _table_chunks(self, table, columns, chunksize):
+        # the connection stays checked out until the chunks are read
+        with self.backend() as backend:
+            yield from backend.table_as_df(table, columns, chunksize)
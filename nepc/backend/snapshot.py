@@ -0,0 +1,236 @@
+"""Compact, memory-mapped snapshot of a whole NEPC database.
+
+A snapshot is a directory containing:
+
+ - ``manifest.json``: format version and number of rows in each table
+ - ``metadata.json``: the metadata row (see :func:`.cs_metadata`) of every cross section
+ - ``tables/<table>.json``: every table except ``csdata``
+ - ``csdata_e.npy``, ``csdata_sigma.npy``, ``csdata_id.npy``: the ``e``, ``sigma``,
+   and ``id`` columns of ``csdata`` concatenated in ``cs_id``, ``id`` order
+ - ``csdata_index.npy``: ``cs_id``, ``offset``, and ``length`` of each cross
+   section in the concatenated arrays
+
+:class:`.SnapshotBackend` memory-maps the arrays, so :attr:`.CS.data` is a
+zero-copy, read-only slice and processes on the same node share pages.
+
+Snapshots are written with :func:`.export_snapshot` or ``nepc/mysql/snapshot.py``.
+"""
+import json
+import os
+import time
+import numpy as np
+import pandas as pd
+from nepc.backend.base import Backend, CS_BATCH_SIZE, check_missing, df_chunks, like
+from nepc.backend.files import TABLE_COLUMNS
+from nepc.backend.filters import filter_cs_id_list
+
+SNAPSHOT_VERSION = 1
+
+INDEX_DTYPE = np.dtype([("cs_id", np.int64),
+                        ("offset", np.int64),
+                        ("length", np.int64)])
+
+
+def _json_default(obj):
+    """Convert numpy scalars for json.dump."""
+    if isinstance(obj, np.integer):
+        return int(obj)
+    if isinstance(obj, np.floating):
+        return float(obj)
+    raise TypeError(f'{type(obj)} is not JSON serializable')
+
+
+def export_snapshot(backend, path, batch_size=CS_BATCH_SIZE):
+    """Write every table of a NEPC database to a snapshot directory.
+
+    Parameters
+    ----------
+    backend : :class:`.Backend`
+        The NEPC database to export (e.g. a :class:`.MySQLBackend`).
+    path : str
+        Snapshot directory; created if it does not exist.
+    batch_size : int, optional
+        Number of cross sections fetched per query (default :data:`.CS_BATCH_SIZE`).
+
+    Returns
+    -------
+    dict
+        The manifest written to ``manifest.json``.
+
+    """
+    os.makedirs(os.path.join(path, "tables"), exist_ok=True)
+
+    rows = {}
+    for table in TABLE_COLUMNS:
+        if table == "csdata":
+            continue
+        df = backend.table_as_df(table)
+        rows[table] = len(df)
+        with open(os.path.join(path, "tables", table + ".json"), "w") as f:
+            json.dump({"columns": list(df.columns),
+                       "data": df.astype(object).where(df.notna(), None).values.tolist()},
+                      f, default=_json_default)
+
+    cs_id_list = sorted(int(cs_id) for cs_id in backend.table_as_df("cs", ["cs_id"])["cs_id"])
+    n_csdata = backend.count_table_rows("csdata")
+    rows["csdata"] = n_csdata
+
+    if n_csdata:
+        e_out = np.lib.format.open_memmap(os.path.join(path, "csdata_e.npy"), mode="w+",
+                                          dtype=np.float64, shape=(n_csdata,))
+        sigma_out = np.lib.format.open_memmap(os.path.join(path, "csdata_sigma.npy"), mode="w+",
+                                              dtype=np.float64, shape=(n_csdata,))
+    else:
+        # an empty file cannot be memory-mapped
+        e_out = np.empty(0, dtype=np.float64)
+        sigma_out = np.empty(0, dtype=np.float64)
+    index = np.zeros(len(cs_id_list), dtype=INDEX_DTYPE)
+
+    metadata = []
+    offset = 0
+    for i in range(0, len(cs_id_list), batch_size):
+        batch = cs_id_list[i:i + batch_size]
+        batch_metadata = backend.cs_metadata_list(batch, batch_size)
+        e_sigma = backend.cs_e_sigma_list(batch, batch_size)
+        for j, cs_id in enumerate(batch):
+            metadata.append(batch_metadata[cs_id])
+            e_energy, sigma = e_sigma[cs_id]
+            length = len(e_energy)
+            e_out[offset:offset + length] = e_energy
+            sigma_out[offset:offset + length] = sigma
+            index[i + j] = (cs_id, offset, length)
+            offset += length
+
+    if offset != n_csdata:
+        raise ValueError(f'csdata has {n_csdata} rows but {offset} belong to cross sections in cs')
+    if n_csdata:
+        e_out.flush()
+        sigma_out.flush()
+    else:
+        np.save(os.path.join(path, "csdata_e.npy"), e_out)
+        np.save(os.path.join(path, "csdata_sigma.npy"), sigma_out)
+    del e_out, sigma_out
+
+    csdata_id = np.empty(n_csdata, dtype=np.int64)
+    if n_csdata:
+        csdata = backend.table_as_df("csdata", ["cs_id", "id"])
+        csdata_id[:] = csdata.sort_values(["cs_id", "id"])["id"].to_numpy(dtype=np.int64)
+    np.save(os.path.join(path, "csdata_id.npy"), csdata_id)
+    np.save(os.path.join(path, "csdata_index.npy"), index)
+
+    with open(os.path.join(path, "metadata.json"), "w") as f:
+        json.dump(metadata, f, default=_json_default)
+
+    manifest = {"version": SNAPSHOT_VERSION,
+                "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "rows": rows}
+    with open(os.path.join(path, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+class SnapshotBackend(Backend):
+    """A read-only NEPC database in a snapshot directory written by
+    :func:`.export_snapshot`.
+
+    Parameters
+    ----------
+    path : str
+        Snapshot directory.
+
+    """
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "manifest.json")) as f:
+            self.manifest = json.load(f)
+        if self.manifest["version"] != SNAPSHOT_VERSION:
+            raise ValueError(f'snapshot version {self.manifest["version"]} is not supported')
+        mmap_mode = "r" if self.manifest["rows"]["csdata"] else None
+        self.e = np.asarray(np.load(os.path.join(path, "csdata_e.npy"), mmap_mode=mmap_mode))
+        self.sigma = np.asarray(np.load(os.path.join(path, "csdata_sigma.npy"),
+                                        mmap_mode=mmap_mode))
+        index = np.load(os.path.join(path, "csdata_index.npy"))
+        self._position = dict(zip(index["cs_id"].tolist(), range(len(index))))
+        self._offset = index["offset"]
+        self._length = index["length"]
+        self._tables = {}
+        self._metadata = None
+
+    def _table(self, table):
+        if table not in self._tables:
+            with open(os.path.join(self.path, "tables", table + ".json")) as f:
+                table_json = json.load(f)
+            self._tables[table] = pd.DataFrame(table_json["data"],
+                                               columns=table_json["columns"])
+        return self._tables[table]
+
+    def count_table_rows(self, table: str):
+        if table not in self.manifest["rows"]:
+            raise ValueError(f'table {table} is not in a NEPC database')
+        return self.manifest["rows"][table]
+
+    def model_cs_id_list(self, model_name, metadata=None):
+        models = self._table("models")
+        model_ids = [model_id for model_id, name in zip(models["model_id"], models["name"])
+                     if like(model_name, name)]
+        models2cs = self._table("models2cs")
+        cs_ids = models2cs.loc[models2cs["model_id"].isin(model_ids), "cs_id"]
+        cs_id_list = sorted(set(int(cs_id) for cs_id in cs_ids))
+        if metadata:
+            return filter_cs_id_list(self, cs_id_list, metadata)
+        return cs_id_list
+
+    def cs_metadata_list(self, cs_id_list, batch_size=CS_BATCH_SIZE):
+        if self._metadata is None:
+            with open(os.path.join(self.path, "metadata.json")) as f:
+                self._metadata = {row[0]: row for row in json.load(f)}
+        check_missing(cs_id_list, self._metadata)
+        return {cs_id: list(self._metadata[cs_id]) for cs_id in cs_id_list}
+
+    def cs_e_sigma_list(self, cs_id_list, batch_size=CS_BATCH_SIZE, window=None):
+        check_missing(cs_id_list, self._position)
+        e_sigma = {}
+        for cs_id in cs_id_list:
+            i = self._position[cs_id]
+            start = self._offset[i]
+            stop = start + self._length[i]
+            e_sigma[cs_id] = (self.e[start:stop], self.sigma[start:stop])
+            if window is not None:
+                e_sigma[cs_id] = window.apply(*e_sigma[cs_id])
+        return e_sigma
+
+    def table_as_df(self, table, columns="*", chunksize=None):
+        if table not in TABLE_COLUMNS:
+            raise ValueError(f'table {table} is not in a NEPC database')
+        column_names = TABLE_COLUMNS[table] if columns == "*" else list(columns)
+        if table == "csdata" and chunksize is not None:
+            return self._csdata_chunks(column_names, chunksize)
+        if table == "csdata":
+            csdata_id = np.load(os.path.join(self.path, "csdata_id.npy"))
+            cs_id = np.repeat(np.array(list(self._position.keys()), dtype=np.int64),
+                              self._length)
+            df = pd.DataFrame({"id": csdata_id, "cs_id": cs_id,
+                               "e": self.e, "sigma": self.sigma})
+        else:
+            df = self._table(table)
+        df = df[column_names].reset_index(drop=True)
+        if chunksize is not None:
+            return df_chunks(df, chunksize)
+        return df
+
+    def _csdata_chunks(self, column_names, chunksize):
+        """Yield ``csdata`` in DataFrames of at most ``chunksize`` rows, reading
+        only those rows from the memory mapped arrays."""
+        mmap_mode = "r" if len(self.e) else None
+        csdata_id = np.load(os.path.join(self.path, "csdata_id.npy"), mmap_mode=mmap_mode)
+        cs_ids = np.array(list(self._position.keys()), dtype=np.int64)
+        ends = np.cumsum(self._length)
+        for start in range(0, len(self.e), chunksize):
+            stop = min(start + chunksize, len(self.e))
+            chunk = {"id": np.array(csdata_id[start:stop]),
+                     "cs_id": cs_ids[np.searchsorted(ends, np.arange(start, stop), side="right")],
+                     "e": np.array(self.e[start:stop]),
+                     "sigma": np.array(self.sigma[start:stop])}
+            yield pd.DataFrame({name: chunk[name] for name in column_names},
+                               columns=column_names)
+
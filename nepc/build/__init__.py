@@ -0,0 +1,35 @@
+"""Build a NEPC MySQL database from its data files.
+
+:class:`.Builder` runs the build in stages (schema, reference tables, cross
+sections, rates, indexes, summary) so it can be driven from Python as well
+as from ``nepc/mysql/build.py``::
+
+    import mysql.connector
+    from nepc.build import Builder
+
+    cnx = mysql.connector.connect(host='localhost',
+                                  option_files='/home/me/.mysql/defaults')
+    Builder(cnx, 'nepc_test', '/path/to/nepc/tests/data/',
+            ['/cs/lxcat/n2/fict/', '/cs/lumped/n2/fict_total/'],
+            bulk=True, jobs=4).run()
+    cnx.close()
+
+:mod:`nepc.build.loaders` reads and validates the data files without a
+database, and :mod:`nepc.build.schema` holds the table definitions.
+"""
+from .loaders import NameResolver
+from .loaders import ReferenceTables
+from .loaders import DataFiles
+from .loaders import read_cross_sections
+from .loaders import read_rates
+from .builder import Builder
+
+
+__all__ = [
+        'NameResolver',
+        'ReferenceTables',
+        'DataFiles',
+        'read_cross_sections',
+        'read_rates',
+        'Builder'
+        ]
@@ -0,0 +1,517 @@
+"""Build a NEPC MySQL database from its data files in stages.
+"""
+import multiprocessing
+import os
+import queue
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from nepc import nepc
+from nepc.backend.base import CS_BATCH_SIZE, batches
+from nepc.backend.files import read_dat
+from nepc.backend.mysql import in_clause
+from nepc.build import loaders, schema
+from nepc.build.loaders import (CS_VARIABLE_LIST, CSDATA_VARIABLE_LIST,
+                                MANIFEST_VARIABLE_LIST, MODELS2CS_VARIABLE_LIST,
+                                MODELS2RATE_VARIABLE_LIST, MODELS_VARIABLE_LIST,
+                                PROCESSES_VARIABLE_LIST, RATE_VARIABLE_LIST,
+                                RATEDATA_VARIABLE_LIST, REFERENCE_FILES,
+                                SPECIES_VARIABLE_LIST, STATES_VARIABLE_LIST)
+
+ROW_COUNT_TABLES = ["species", "processes", "states", "cs", "models",
+                    "models2cs", "csdata", "rate", "models2rate", "ratedata"]
+
+
+def insert_command(table_name, variable_list):
+    """Return a single row INSERT statement for ``table_name``."""
+    variable_list_str = ", ".join(variable_list)
+    data_format_str = ", ".join(["%s"]*len(variable_list))
+    return ("INSERT INTO " + table_name +
+            "(" + variable_list_str + ") " +
+            "VALUES (" + data_format_str + ");")
+
+
+def insert_rows(cursor, table_name, variable_list, rows, batch_size):
+    """Insert ``rows`` with one multi-row INSERT per ``batch_size`` rows."""
+    row_format_str = "(" + ", ".join(["%s"]*len(variable_list)) + ")"
+    for i in range(0, len(rows), batch_size):
+        batch = rows[i:i + batch_size]
+        cursor.execute("INSERT INTO " + table_name +
+                       "(" + ", ".join(variable_list) + ") " +
+                       "VALUES " + ", ".join([row_format_str]*len(batch)) + ";",
+                       [value for row in batch for value in row])
+
+
+def load_data_infile(cursor, table_name, variable_list, filename):
+    """Load a tab separated file into a table with LOAD DATA LOCAL INFILE."""
+    cursor.execute("LOAD DATA LOCAL INFILE '" + filename + "' "
+                   "INTO TABLE " + table_name + " "
+                   "FIELDS TERMINATED BY '\\t' "
+                   "LINES TERMINATED BY '\\n' "
+                   "(" + ", ".join(variable_list) + ");")
+
+
+class CsdataWriter:
+    """Send ``csdata`` rows to MySQL.
+
+    Without ``bulk``, each call to :meth:`add` is one ``executemany`` and
+    commit. With ``bulk``, rows are collected across calls and sent in
+    multi-row INSERTs of ``batch_size`` rows, or written to a staging file for
+    LOAD DATA LOCAL INFILE if ``local_infile``.
+    """
+    def __init__(self, cnx, cursor, bulk=False, local_infile=False, batch_size=10000):
+        self.cnx = cnx
+        self.cursor = cursor
+        self.bulk = bulk
+        self.batch_size = batch_size
+        self.rows = []
+        self.row_count = 0
+        self.seconds = 0.0
+        self.staging_file = None
+        if local_infile:
+            self.staging_file = tempfile.NamedTemporaryFile('w', suffix='.tsv',
+                                                            delete=False)
+
+    def add(self, rows):
+        self.row_count += len(rows)
+        if not self.bulk:
+            start = time.time()
+            self.cursor.executemany(insert_command("csdata", CSDATA_VARIABLE_LIST), rows)
+            self.cnx.commit()
+            self.seconds += time.time() - start
+            return
+        if self.staging_file is not None:
+            self.staging_file.writelines("\t".join(str(value) for value in row) + "\n"
+                                         for row in rows)
+            return
+        self.rows.extend(rows)
+        if len(self.rows) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        start = time.time()
+        if self.staging_file is not None:
+            self.staging_file.close()
+            load_data_infile(self.cursor, "csdata", CSDATA_VARIABLE_LIST,
+                             self.staging_file.name)
+            os.remove(self.staging_file.name)
+            self.staging_file = None
+        elif self.rows:
+            insert_rows(self.cursor, "csdata", CSDATA_VARIABLE_LIST, self.rows,
+                        self.batch_size)
+            self.rows = []
+        self.seconds += time.time() - start
+
+    def report(self):
+        rate = self.row_count / self.seconds if self.seconds > 0 else float('inf')
+        print("loaded " + str(self.row_count) + " csdata rows in " +
+              str(round(self.seconds, 2)) + " sec (" +
+              str(round(rate)) + " rows/sec)")
+
+
+def write_csdata(writer, csdata_queue, errors):
+    """Pass the rows taken from ``csdata_queue`` to ``writer`` until it yields None.
+
+    This runs in the writer thread, the only user of the connection while
+    ``csdata`` is loaded. After an error, rows are drained without being
+    written and the error is appended to ``errors``.
+    """
+    while True:
+        rows = csdata_queue.get()
+        if rows is None:
+            return
+        if errors:
+            continue
+        try:
+            writer.add(rows)
+        except Exception as error:
+            errors.append(error)
+
+
+class Builder:
+    """Build a NEPC database on a MySQL server from its data files.
+
+    :meth:`run` reads and validates every data file, then runs the stages
+    :meth:`schema`, :meth:`reference_tables`, :meth:`cross_sections`,
+    :meth:`rates`, :meth:`indexes`, and :meth:`summary`, recording the time
+    each takes in :attr:`timings`. The stages can also be called one at a
+    time after :meth:`read`; call :meth:`close` when done.
+
+    Parameters
+    ----------
+    cnx : connection.MySQLConnection
+        Connection to the MySQL server (see :func:`.connect`); pass
+        ``allow_local_infile=True`` when connecting to use ``local_infile``.
+    database : str
+        Name of the database to build (e.g. ``nepc_test``).
+    nepc_data : str
+        Directory containing ``processes.tsv``, ``states.tsv``,
+        ``species.tsv``, and ``models.tsv``.
+    dir_names : list of str
+        Directories of cross section ``.met``/``.dat``/``.mod`` files,
+        relative to ``nepc_data``.
+    rate_dir_names : list of str, optional
+        Directories of rate files, relative to ``nepc_data``.
+    bulk : bool, optional
+        Load ``csdata`` in multi-row INSERTs of ``batch_size`` rows in a
+        single transaction instead of one commit per file.
+    local_infile : bool, optional
+        With ``bulk``, load ``csdata`` with LOAD DATA LOCAL INFILE.
+    batch_size : int, optional
+        Rows per multi-row INSERT.
+    jobs : int, optional
+        Number of processes parsing data files.
+    fast : bool, optional
+        Create tables without secondary indexes and foreign keys, load them
+        with ``foreign_key_checks`` and ``unique_checks`` off, and add the
+        indexes and foreign keys in :meth:`indexes`.
+    incremental : bool, optional
+        Let :meth:`run` update an existing database from its
+        ``build_manifest`` (see :meth:`update`).
+    max_cs, max_rate : int, optional
+        Maximum number of cross section and rate files to load.
+    cs_datfile, rate_datfile : str, optional
+        Files to which the id and file name of each cross section and rate
+        are written.
+    debug : bool, optional
+        Print progress.
+
+    """
+    def __init__(self, cnx, database, nepc_data, dir_names, rate_dir_names=None,
+                 bulk=False, local_infile=False, batch_size=10000, jobs=1,
+                 fast=False, incremental=False, max_cs=None, max_rate=None,
+                 cs_datfile=None, rate_datfile=None, debug=False):
+        if jobs < 1:
+            raise ValueError('jobs must be at least 1')
+        if local_infile and not bulk:
+            raise ValueError('local_infile requires bulk')
+        self.cnx = cnx
+        self.cursor = cnx.cursor()
+        self.database = database
+        self.nepc_data = nepc_data
+        self.dir_names = dir_names
+        self.rate_dir_names = [] if rate_dir_names is None else rate_dir_names
+        self.bulk = bulk
+        self.local_infile = local_infile
+        self.batch_size = batch_size
+        self.jobs = jobs
+        self.fast = fast
+        self.incremental = incremental
+        self.max_cs = max_cs
+        self.max_rate = max_rate
+        self.cs_datfile = cs_datfile
+        self.rate_datfile = rate_datfile
+        self.debug = debug
+        self.timings = {}
+        self.reference = None
+        self.cs_files = None
+        self.rate_files = None
+        self._pool = None
+        self._t0 = time.time()
+
+    def _log(self, stage):
+        if self.debug:
+            print("\n" + stage + ": " + str(round(time.time() - self._t0, 2)) + " sec\n"
+                  "===============================================")
+
+    def _timed(self, stage):
+        start = time.time()
+        getattr(self, stage)()
+        self.timings[stage] = time.time() - start
+
+    def pool(self):
+        """Return the process pool used to parse files, or None if ``jobs`` is 1."""
+        if self._pool is None and self.jobs > 1:
+            # spawn, not fork: the pool starts workers on demand, possibly
+            # while the thread writing csdata holds locks
+            self._pool = ProcessPoolExecutor(max_workers=self.jobs,
+                                             mp_context=multiprocessing.get_context("spawn"))
+        return self._pool
+
+    def close(self):
+        """Shut down the process pool and close the cursor."""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+        self.cursor.close()
+
+    def run(self):
+        """Build the database (or update it, if ``incremental``).
+
+        Returns
+        -------
+        dict
+            Seconds spent in each stage.
+
+        """
+        try:
+            self._timed("read")
+            if self.incremental and self._timed_update():
+                self._timed("summary")
+                return self.timings
+            try:
+                for stage in ["schema", "reference_tables", "cross_sections",
+                              "rates", "indexes"]:
+                    self._timed(stage)
+            finally:
+                # a failed stage must not leave the session with the checks off
+                if self.fast:
+                    self._set_checks(True)
+            self._timed("summary")
+            return self.timings
+        finally:
+            self.close()
+
+    def _timed_update(self):
+        start = time.time()
+        updated = self.update()
+        if updated:
+            self.timings["update"] = time.time() - start
+        return updated
+
+    def read(self):
+        """Read every data file and resolve all names to ids.
+
+        Raises
+        ------
+        ValueError
+            Listing every file that refers to an unknown name.
+
+        """
+        self._log("reading processes, models, species, and states")
+        self.reference = loaders.ReferenceTables(self.nepc_data)
+        self.cs_files = loaders.read_cross_sections(self.nepc_data, self.dir_names,
+                                                    self.reference.resolver,
+                                                    self.max_cs, self.pool(),
+                                                    4*self.jobs)
+        self.rate_files = loaders.read_rates(self.nepc_data, self.rate_dir_names,
+                                             self.reference.resolver, self.max_rate)
+        self.reference.resolver.check()
+        self._log("resolved names in " + str(len(self.cs_files.dat_files)) +
+                  " cross section files")
+
+    def schema(self):
+        """Drop the database and create it with empty tables."""
+        self.cursor.execute("DROP DATABASE IF EXISTS `" + self.database + "`;")
+        self.cursor.execute("CREATE DATABASE IF NOT EXISTS `" + self.database + "` "
+                            "CHARACTER SET utf8 "
+                            "COLLATE utf8_general_ci;")
+        self.cursor.execute("SET default_storage_engine = INNODB;")
+        self.cursor.execute("use " + self.database + ";")
+        for table_name in schema.TABLES:
+            self.cursor.execute(schema.create_table(self.database, table_name,
+                                                    indexes=not self.fast))
+        self.cnx.commit()
+        if self.fast:
+            self._set_checks(False)
+        self._log("created empty NEPC database and all tables")
+
+    def _set_checks(self, on):
+        """Turn ``foreign_key_checks`` and ``unique_checks`` on or off for
+        the session."""
+        value = "1" if on else "0"
+        self.cursor.execute("SET foreign_key_checks = " + value + ";")
+        self.cursor.execute("SET unique_checks = " + value + ";")
+
+    def reference_tables(self):
+        """Load ``processes``, ``models``, ``species``, and ``states``."""
+        for table_name, variable_list, rows in [
+                ("processes", PROCESSES_VARIABLE_LIST, self.reference.processes),
+                ("models", MODELS_VARIABLE_LIST, self.reference.models),
+                ("species", SPECIES_VARIABLE_LIST, self.reference.species),
+                ("states", STATES_VARIABLE_LIST, self.reference.states)]:
+            self.cursor.executemany(insert_command(table_name, variable_list), rows)
+            self._log("loaded data into " + table_name + " table")
+        self.cnx.commit()
+
+    def _write_datfile(self, filename, data_files, id_name):
+        if filename is None:
+            return
+        with open(filename, 'w') as f:
+            f.write("\t".join([id_name, "filename"]) + "\n")
+            for name, row in zip(data_files.filenames(), data_files.rows):
+                f.write("\t".join([str(row[0]), name]) + "\n")
+
+    def _load_csdata(self, indices, writer):
+        """Parse the ``.dat`` files of ``self.cs_files`` at ``indices`` in the
+        pool while a writer thread sends their rows to ``writer``."""
+        csdata_queue = queue.Queue(maxsize=4*self.jobs)
+        errors = []
+        thread = threading.Thread(target=write_csdata,
+                                  args=(writer, csdata_queue, errors))
+        thread.start()
+        try:
+            for i, (csdata_id, e_energy, sigma) in zip(
+                    indices,
+                    loaders.parse_files(read_dat,
+                                        [self.cs_files.dat_files[i][1] + ".dat"
+                                         for i in indices],
+                                        self.pool(), 4*self.jobs)):
+                csdata_queue.put(loaders.csdata_rows(self.cs_files.rows[i][0],
+                                                     csdata_id, e_energy, sigma))
+        finally:
+            csdata_queue.put(None)
+            thread.join()
+        if errors:
+            raise errors[0]
+        writer.flush()
+
+    def cross_sections(self):
+        """Load ``cs``, ``models2cs``, ``build_manifest``, and ``csdata``."""
+        self._log("starting to load cross section data")
+        self.cursor.executemany(insert_command("cs", CS_VARIABLE_LIST),
+                                self.cs_files.rows)
+        self.cursor.executemany(insert_command("models2cs", MODELS2CS_VARIABLE_LIST),
+                                self.cs_files.model_rows)
+        self.cursor.executemany(insert_command("build_manifest", MANIFEST_VARIABLE_LIST),
+                                loaders.manifest_rows(self.reference, self.cs_files))
+        self.cnx.commit()
+        self._write_datfile(self.cs_datfile, self.cs_files, "cs_id")
+
+        writer = CsdataWriter(self.cnx, self.cursor, self.bulk, self.local_infile,
+                              self.batch_size)
+        self._load_csdata(range(len(self.cs_files.rows)), writer)
+        self.cnx.commit()
+        if self.bulk:
+            writer.report()
+        self._log("loaded data into cs, csdata, and models2cs tables")
+
+    def rates(self):
+        """Load ``rate``, ``models2rate``, and ``ratedata``."""
+        self.cursor.executemany(insert_command("rate", RATE_VARIABLE_LIST),
+                                self.rate_files.rows)
+        self.cursor.executemany(insert_command("models2rate", MODELS2RATE_VARIABLE_LIST),
+                                self.rate_files.model_rows)
+        self.cnx.commit()
+        self._write_datfile(self.rate_datfile, self.rate_files, "rate_id")
+        for (_, filename_wo_ext), rate_row in zip(self.rate_files.dat_files,
+                                                  self.rate_files.rows):
+            self.cursor.executemany(insert_command("ratedata", RATEDATA_VARIABLE_LIST),
+                                    [(row[0], rate_row[0]) + tuple(row[1:])
+                                     for row in loaders.read_ratedata(filename_wo_ext + ".dat")])
+            self.cnx.commit()
+        self._log("loaded data into rate, ratedata, and models2rate tables")
+
+    def indexes(self):
+        """With ``fast``, add the secondary indexes and foreign keys, turn the
+        checks back on, and check referential integrity.
+
+        Raises
+        ------
+        ValueError
+            If any row refers to a row that does not exist.
+
+        """
+        if not self.fast:
+            return
+        for statement in schema.add_indexes(self.database):
+            self.cursor.execute(statement)
+        self._set_checks(True)
+        orphans = []
+        for column, query in schema.orphan_queries():
+            self.cursor.execute(query)
+            count = self.cursor.fetchall()[0][0]
+            if count:
+                orphans.append(column + ": " + str(count))
+        if orphans:
+            raise ValueError('rows refer to missing rows: ' + "; ".join(orphans))
+
+    def stored_manifest(self):
+        """Return ``build_manifest`` of the existing database as a dict mapping
+        file name to ``(sha256, cs_id)``, or None if there is none."""
+        self.cursor.execute("SELECT COUNT(*) FROM information_schema.tables "
+                            "WHERE table_schema = %s "
+                            "AND table_name = 'build_manifest';", (self.database,))
+        if self.cursor.fetchall()[0][0] == 0:
+            return None
+        self.cursor.execute("SELECT filename, sha256, cs_id "
+                            "FROM `" + self.database + "`.`build_manifest`;")
+        return {filename: (sha256, cs_id)
+                for filename, sha256, cs_id in self.cursor.fetchall()}
+
+    def update(self):
+        """Bring an existing database up to date with the data files.
+
+        The cross sections whose files were added, changed, or removed since
+        the last build are inserted, replaced, or deleted in a single
+        transaction, so readers see the previous cross sections until it
+        commits. Nothing is done if there is no ``build_manifest``, a
+        reference ``.tsv`` file changed, or ``max_cs`` left cross section
+        files unread (they would look removed); the database must then be
+        rebuilt.
+
+        Returns
+        -------
+        bool
+            True if the database was updated.
+
+        """
+        if self.cs_files.truncated:
+            print("max_cs left cross section files unread; building " + self.database +
+                  " from scratch")
+            return False
+        stored = self.stored_manifest()
+        if stored is None:
+            print("no build manifest in " + self.database + "; building it from scratch")
+            return False
+        if any(stored.get(filename, (None,))[0] != self.reference.sha256[filename]
+               for filename in REFERENCE_FILES):
+            print("reference tables changed; building " + self.database +
+                  " from scratch")
+            return False
+
+        manifest = loaders.manifest_rows(self.reference, self.cs_files)[len(REFERENCE_FILES):]
+        current = {filename: sha256 for filename, sha256, _ in manifest}
+        stale = [filename for filename, (sha256, _) in stored.items()
+                 if filename not in REFERENCE_FILES and current.get(filename) != sha256]
+        fresh = [i for i, (filename, sha256, _) in enumerate(manifest)
+                 if stored.get(filename, (None,))[0] != sha256]
+        stale_cs_ids = [stored[filename][1] for filename in stale]
+        fresh_cs_ids = set(self.cs_files.rows[i][0] for i in fresh)
+
+        self.cursor.execute("use " + self.database + ";")
+        self._write_datfile(self.cs_datfile, self.cs_files, "cs_id")
+        # end the transaction opened by the manifest query before starting ours
+        self.cnx.commit()
+        self.cnx.start_transaction()
+        try:
+            for batch in batches(stale_cs_ids, CS_BATCH_SIZE):
+                for table_name in ["models2cs", "csdata", "cs"]:
+                    self.cursor.execute("DELETE FROM " + table_name + " "
+                                        "WHERE cs_id IN " + in_clause(batch) + ";",
+                                        tuple(batch))
+            for batch in batches(stale, CS_BATCH_SIZE):
+                self.cursor.execute("DELETE FROM build_manifest "
+                                    "WHERE filename IN " + in_clause(batch) + ";",
+                                    tuple(batch))
+            self.cursor.executemany(insert_command("cs", CS_VARIABLE_LIST),
+                                    [self.cs_files.rows[i] for i in fresh])
+            self.cursor.executemany(insert_command("models2cs", MODELS2CS_VARIABLE_LIST),
+                                    [row for row in self.cs_files.model_rows
+                                     if row[0] in fresh_cs_ids])
+            self._load_csdata(fresh, CsdataWriter(self.cnx, self.cursor, bulk=True,
+                                                  batch_size=self.batch_size))
+            self.cursor.executemany(insert_command("build_manifest", MANIFEST_VARIABLE_LIST),
+                                    [manifest[i] for i in fresh])
+            self.cnx.commit()
+        except Exception:
+            self.cnx.rollback()
+            raise
+
+        n_replaced = len([filename for filename in stale if filename in current])
+        print("replaced " + str(n_replaced) + ", added " +
+              str(len(fresh) - n_replaced) + ", and deleted " +
+              str(len(stale) - n_replaced) + " cross sections")
+        return True
+
+    def summary(self):
+        """Print the time spent in each stage and the number of rows in each table."""
+        print("\nbuilt " + self.database + ": " +
+              str(round(time.time() - self._t0, 2)) + " sec\n"
+              "===============================================")
+        for stage, seconds in self.timings.items():
+            print(stage + ": " + str(round(seconds, 2)) + " sec")
+        for table in ROW_COUNT_TABLES:
+            print(table + ": " + str(nepc.count_table_rows(self.cursor, table)) +
+                  " rows")
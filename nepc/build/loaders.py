@@ -0,0 +1,435 @@
+"""Read and validate the data files of a NEPC database.
+
+Nothing here talks to a database: the loaders turn ``processes.tsv``,
+``models.tsv``, ``species.tsv``, ``states.tsv`` and the directories of
+``.met``/``.dat``/``.mod`` files into rows ready to insert, with every
+process, state, species, and model name resolved to its id.
+"""
+import hashlib
+import os
+from collections import deque
+import pandas as pd
+from nepc.backend.files import read_met_mod
+
+NA_VALUES = []
+
+REFERENCE_FILES = ["processes.tsv", "states.tsv", "species.tsv", "models.tsv"]
+"""Files of the reference tables; a change to any of them may renumber ids."""
+
+PROCESSES_VARIABLE_LIST = ["id", "name", "long_name", "lhs", "rhs",
+                           "lhs_e", "rhs_e", "lhs_hv", "rhs_hv",
+                           "lhs_v", "rhs_v", "lhs_j", "rhs_j"]
+PROCESSES_DTYPE = {"id": int,
+                   "name": str,
+                   "long_name": str,
+                   "lhs": int,
+                   "rhs": int,
+                   "lhs_e": int,
+                   "rhs_e": int,
+                   "lhs_hv": int,
+                   "rhs_hv": int,
+                   "lhs_v": int,
+                   "rhs_v": int,
+                   "lhs_j": int,
+                   "rhs_j": int}
+
+MODELS_VARIABLE_LIST = ["model_id", "name", "long_name", "ref"]
+MODELS_DTYPE = {"model_id": int,
+                "name": str,
+                "long_name": str,
+                "ref": str}
+
+SPECIES_VARIABLE_LIST = ["id", "name", "long_name"]
+SPECIES_DTYPE = {"id": int,
+                 "name": str,
+                 "long_name": str}
+
+STATES_VARIABLE_LIST = ["id", "name", "long_name", "species_id"]
+STATES_DTYPE = {"id": int,
+                "name": str,
+                "long_name": str,
+                "species": str}
+
+CS_VARIABLE_LIST = ["cs_id", "process_id",
+                    "units_e", "units_sigma",
+                    "ref",
+                    "lhsA_id", "lhsB_id", "rhsA_id", "rhsB_id",
+                    "threshold",
+                    "wavelength",
+                    "lhs_v", "rhs_v", "lhs_j", "rhs_j", "background",
+                    "lpu", "upu"]
+CSDATA_VARIABLE_LIST = ["id", "cs_id", "e", "sigma"]
+MODELS2CS_VARIABLE_LIST = ["cs_id", "model_id"]
+
+RATE_VARIABLE_LIST = ["rate_id", "process_id",
+                      "ref",
+                      "lhsA_id", "lhsB_id", "rhsA_id", "rhsB_id",
+                      "threshold",
+                      "wavelength",
+                      "lhs_v", "rhs_v", "lhs_j", "rhs_j", "background",
+                      "form"]
+RATE_DTYPE = {"rate_id": int,
+              "process": str,
+              "ref": str,
+              "lhs_a": str,
+              "lhs_b": str,
+              "rhs_a": str,
+              "rhs_b": str,
+              "threshold": float,
+              "wavelength": float,
+              "lhs_v": int,
+              "rhs_v": int,
+              "lhs_j": int,
+              "rhs_j": int,
+              "background": str,
+              "form": str
+              }
+RATEDATA_VARIABLE_LIST = ["id", "rate_id", "num", "constant", "lau", "uau"]
+RATEDATA_DTYPE = {"ratedata_id": int,
+                  "num": int,
+                  "constant": float,
+                  "lau": float,
+                  "uau": float}
+MOD_DTYPE = {"model_name": str}
+MODELS2RATE_VARIABLE_LIST = ["rate_id", "model_id"]
+
+MANIFEST_VARIABLE_LIST = ["filename", "sha256", "cs_id"]
+
+
+def read_tsv(filename, dtype):
+    """Return the rows of a tab separated file as a list of tuples."""
+    return list(pd.read_csv(filename,
+                            sep='\t',
+                            dtype=dtype,
+                            na_values=NA_VALUES).itertuples(index=False,
+                                                            name=None))
+
+
+def sha256_files(filenames):
+    """Return the sha256 hex digest of the contents of ``filenames``; missing
+    files count as empty."""
+    sha256 = hashlib.sha256()
+    for filename in filenames:
+        if os.path.exists(filename):
+            with open(filename, 'rb') as f:
+                sha256.update(f.read())
+        sha256.update(b'\0')
+    return sha256.hexdigest()
+
+
+def read_cs_files(filename_wo_ext):
+    """Return the metadata, model names, and sha256 of the ``.met``/``.dat``/``.mod``
+    files of a cross section."""
+    met, model_names = read_met_mod(filename_wo_ext)
+    return met, model_names, sha256_files([filename_wo_ext + ".met",
+                                           filename_wo_ext + ".dat",
+                                           filename_wo_ext + ".mod"])
+
+
+def read_rate_files(filename_wo_ext):
+    """Return the metadata row and model names of the ``.met``/``.mod`` files of
+    a rate."""
+    met = pd.read_csv(filename_wo_ext + ".met",
+                      sep='\t',
+                      dtype=RATE_DTYPE,
+                      na_values=NA_VALUES).iloc[0].to_dict()
+    model_names = []
+    if os.path.exists(filename_wo_ext + ".mod"):
+        model_names = list(pd.read_csv(filename_wo_ext + ".mod",
+                                       sep='\t',
+                                       dtype=MOD_DTYPE,
+                                       na_values=NA_VALUES)['model_name'])
+    return met, model_names
+
+
+def read_ratedata(dat_file):
+    """Return the ``ratedata`` rows (without ``rate_id``) in a rate ``.dat`` file."""
+    return read_tsv(dat_file, RATEDATA_DTYPE)
+
+
+def csdata_rows(cs_id, csdata_id, e_energy, sigma):
+    """Return the ``csdata`` rows of a cross section as a list of tuples."""
+    return list(zip(csdata_id.tolist(),
+                    [cs_id]*len(csdata_id),
+                    e_energy.tolist(),
+                    sigma.tolist()))
+
+
+def list_dat_files(nepc_data, dir_names, max_files=None, kind="cross section"):
+    """Return ``(directoryname, filename_wo_ext)`` for each ``.dat`` file in
+    ``dir_names``.
+
+    Parameters
+    ----------
+    nepc_data : str
+        Data directory.
+    dir_names : list of str
+        Directories relative to ``nepc_data``.
+    max_files : int, optional
+        Stop (with a warning) after this many files.
+    kind : str, optional
+        What the files hold, for the warning.
+
+    """
+    dat_files = []
+    file_number = 1
+    for directoryname in dir_names:
+        directory = os.fsencode(nepc_data + directoryname)
+        for file in os.listdir(directory):
+            if max_files is not None and file_number >= max_files:
+                print("WARNING: only processed " + str(file_number) +
+                      " " + kind + " files. There appears to be addtional "
+                      "data not processed.")
+                break
+            filename = os.fsdecode(file)
+            if filename.endswith(".met") or filename.endswith(".mod"):
+                continue
+            file_number = file_number + 1
+            filename_wo_ext = filename.rsplit(".", 1)[0]
+            dat_files.append((directoryname,
+                              os.fsdecode(directory) + filename_wo_ext))
+    return dat_files
+
+
+def parse_files(parse, filenames, pool=None, max_pending=16):
+    """Yield ``parse(filename)`` for each filename, in order.
+
+    Parameters
+    ----------
+    parse : function
+        A module-level function, so it can be sent to ``pool``.
+    filenames : list of str
+    pool : concurrent.futures.Executor, optional
+        If given, files are parsed in ``pool``.
+    max_pending : int, optional
+        Maximum number of files submitted to ``pool`` but not yet consumed.
+
+    """
+    if pool is None:
+        yield from map(parse, filenames)
+        return
+    pending = deque()
+    for filename in filenames:
+        pending.append(pool.submit(parse, filename))
+        if len(pending) >= max_pending:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+class NameResolver:
+    """Resolve process, state, species, and model names to ids.
+
+    Unknown names are collected per file so that :meth:`check` can report
+    every offending file at once.
+
+    Parameters
+    ----------
+    processes, models, species, states : list of tuple
+        Rows of the reference tables; the first two items of each row are the
+        id and the name.
+
+    """
+    def __init__(self, processes, models, species, states):
+        self.ids = {"process": {row[1]: row[0] for row in processes},
+                    "model": {row[1]: row[0] for row in models},
+                    "species": {row[1]: row[0] for row in species},
+                    "state": {row[1]: row[0] for row in states}}
+        self.unknown = {}
+
+    def resolve(self, kind, name, filename, required=False):
+        """Return the id of ``name``.
+
+        ``"\\N"`` resolves to None unless ``required``. Any other name that is
+        not known is recorded against ``filename`` and resolves to None.
+
+        Parameters
+        ----------
+        kind : str
+            ``"process"``, ``"model"``, ``"species"``, or ``"state"``
+        name : str
+        filename : str
+        required : bool, optional
+
+        """
+        if name == "\\N" and not required:
+            return None
+        if name not in self.ids[kind]:
+            self.unknown.setdefault(filename, []).append(kind + " '" + name + "'")
+            return None
+        return self.ids[kind][name]
+
+    def check(self):
+        """Raise a ValueError listing every file that refers to an unknown name."""
+        if not self.unknown:
+            return
+        raise ValueError('found unknown names in ' + str(len(self.unknown)) + ' files:\n' +
+                         "\n".join("  " + filename + ": " + ", ".join(names)
+                                   for filename, names in self.unknown.items()))
+
+
+class ReferenceTables:
+    """The rows of ``processes``, ``models``, ``species``, and ``states``.
+
+    ``states`` rows have ``species_id`` resolved; call ``resolver.check()``
+    to find unknown species.
+
+    Parameters
+    ----------
+    nepc_data : str
+        Directory containing the reference ``.tsv`` files.
+
+    """
+    def __init__(self, nepc_data):
+        self.processes = read_tsv(nepc_data + "processes.tsv", PROCESSES_DTYPE)
+        self.models = read_tsv(nepc_data + "models.tsv", MODELS_DTYPE)
+        self.species = read_tsv(nepc_data + "species.tsv", SPECIES_DTYPE)
+        states = read_tsv(nepc_data + "states.tsv", STATES_DTYPE)
+        self.resolver = NameResolver(self.processes, self.models,
+                                     self.species, states)
+        self.states = [(state_id, name, long_name,
+                        self.resolver.resolve("species", species,
+                                              nepc_data + "states.tsv",
+                                              required=True))
+                       for state_id, name, long_name, species in states]
+        self.sha256 = {filename: sha256_files([nepc_data + filename])
+                       for filename in REFERENCE_FILES}
+
+
+class DataFiles:
+    """Resolved rows for a set of ``.met``/``.dat``/``.mod`` triples.
+
+    Attributes
+    ----------
+    dat_files : list of tuple
+        ``(directoryname, filename_wo_ext)`` of each triple
+        (see :func:`list_dat_files`).
+    rows : list of tuple
+        The ``cs`` (or ``rate``) row of each triple.
+    model_rows : list of tuple
+        ``models2cs`` (or ``models2rate``) rows.
+    sha256 : list of str
+        Hash of each triple (cross sections only).
+    truncated : bool
+        True if ``max_files`` may have left some triples unread.
+
+    """
+    def __init__(self):
+        self.dat_files = []
+        self.rows = []
+        self.model_rows = []
+        self.sha256 = []
+        self.truncated = False
+
+    def filenames(self):
+        """Return each triple's name relative to the data directory."""
+        return [directoryname + os.path.basename(filename_wo_ext)
+                for directoryname, filename_wo_ext in self.dat_files]
+
+
+def read_cross_sections(nepc_data, dir_names, resolver, max_files=None,
+                        pool=None, max_pending=16):
+    """Read and resolve the ``.met``/``.mod`` files of every cross section.
+
+    Unknown names are recorded in ``resolver``; the ``.dat`` files are only
+    hashed, not parsed.
+
+    Parameters
+    ----------
+    nepc_data : str
+    dir_names : list of str
+    resolver : :class:`NameResolver`
+    max_files : int, optional
+    pool : concurrent.futures.Executor, optional
+    max_pending : int, optional
+        See :func:`parse_files`.
+
+    Returns
+    -------
+    :class:`DataFiles`
+
+    """
+    cs_files = DataFiles()
+    cs_files.dat_files = list_dat_files(nepc_data, dir_names, max_files, "cross section")
+    cs_files.truncated = max_files is not None and len(cs_files.dat_files) >= max_files - 1
+    for (_, filename_wo_ext), (met, model_names, sha256) in zip(
+            cs_files.dat_files,
+            parse_files(read_cs_files, [filename_wo_ext
+                                        for _, filename_wo_ext in cs_files.dat_files],
+                        pool, max_pending)):
+        met_file = filename_wo_ext + ".met"
+        mod_file = filename_wo_ext + ".mod"
+        cs_id = met['cs_id']
+        cs_files.rows.append(
+            (cs_id,
+             resolver.resolve("process", met['process'], met_file, required=True),
+             met['units_e'],
+             met['units_sigma'],
+             met['ref'],
+             resolver.resolve("state", met['lhs_a'], met_file),
+             resolver.resolve("state", met['lhs_b'], met_file),
+             resolver.resolve("state", met['rhs_a'], met_file),
+             resolver.resolve("state", met['rhs_b'], met_file),
+             met['threshold'],
+             met['wavelength'],
+             met['lhs_v'],
+             met['rhs_v'],
+             met['lhs_j'],
+             met['rhs_j'],
+             met['background'],
+             met['lpu'],
+             met['upu']))
+        cs_files.model_rows.extend(
+            (cs_id, resolver.resolve("model", model_name, mod_file, required=True))
+            for model_name in model_names)
+        cs_files.sha256.append(sha256)
+    return cs_files
+
+
+def read_rates(nepc_data, dir_names, resolver, max_files=None):
+    """Read and resolve the ``.met``/``.mod`` files of every rate.
+
+    Returns
+    -------
+    :class:`DataFiles`
+
+    """
+    rate_files = DataFiles()
+    rate_files.dat_files = list_dat_files(nepc_data, dir_names, max_files, "rate")
+    rate_files.truncated = max_files is not None and len(rate_files.dat_files) >= max_files - 1
+    for _, filename_wo_ext in rate_files.dat_files:
+        met_file = filename_wo_ext + ".met"
+        mod_file = filename_wo_ext + ".mod"
+        met, model_names = read_rate_files(filename_wo_ext)
+        rate_id = int(met['rate_id'])
+        rate_files.rows.append(
+            (rate_id,
+             resolver.resolve("process", met['process'], met_file, required=True),
+             met['ref'],
+             resolver.resolve("state", met['lhs_a'], met_file),
+             resolver.resolve("state", met['lhs_b'], met_file),
+             resolver.resolve("state", met['rhs_a'], met_file),
+             resolver.resolve("state", met['rhs_b'], met_file),
+             met['threshold'],
+             met['wavelength'],
+             int(met['lhs_v']),
+             int(met['rhs_v']),
+             int(met['lhs_j']),
+             int(met['rhs_j']),
+             met['background'],
+             "Null" if met['form'] == "\\N" else met['form']))
+        rate_files.model_rows.extend(
+            (rate_id, resolver.resolve("model", model_name, mod_file, required=True))
+            for model_name in model_names)
+    return rate_files
+
+
+def manifest_rows(reference, cs_files):
+    """Return the ``build_manifest`` rows ``(filename, sha256, cs_id)``: one per
+    reference file (with ``cs_id`` None) and one per cross section."""
+    rows = [(filename, reference.sha256[filename], None)
+            for filename in REFERENCE_FILES]
+    rows += [(filename, sha256, cs_row[0])
+             for filename, sha256, cs_row
+             in zip(cs_files.filenames(), cs_files.sha256, cs_files.rows)]
+    return rows
@@ -0,0 +1,166 @@
+"""Tables, indexes, and foreign keys of a NEPC MySQL database.
+"""
+
+TABLES = {
+    "species": ["`id` INT UNSIGNED NOT NULL",
+                "`name` VARCHAR(40) NOT NULL",
+                "`long_name` VARCHAR(100) NOT NULL",
+                "PRIMARY KEY(`id`)"],
+    "processes": ["`id` INT UNSIGNED NOT NULL",
+                  "`name` VARCHAR(40) NOT NULL",
+                  "`long_name` VARCHAR(240) NOT NULL",
+                  "`lhs` INT",
+                  "`rhs` INT",
+                  "`lhs_e` INT",
+                  "`rhs_e` INT",
+                  "`lhs_hv` INT",
+                  "`rhs_hv` INT",
+                  "`lhs_v` INT",
+                  "`rhs_v` INT",
+                  "`lhs_j` INT",
+                  "`rhs_j` INT",
+                  "PRIMARY KEY(`id`)"],
+    "states": ["`id` INT UNSIGNED NOT NULL",
+               "`species_id` INT UNSIGNED NOT NULL",
+               "`name` VARCHAR(100) NOT NULL",
+               "`long_name` VARCHAR(100) NOT NULL",
+               "PRIMARY KEY(`id`)"],
+    "models": ["`model_id` INT UNSIGNED NOT NULL",
+               "`name` VARCHAR(40) NOT NULL",
+               "`long_name` VARCHAR(240) NOT NULL",
+               "`ref` VARCHAR(40) NOT NULL",
+               "PRIMARY KEY(`model_id`)"],
+    "cs": ["`cs_id` INT UNSIGNED NOT NULL AUTO_INCREMENT",
+           "`process_id` INT UNSIGNED NOT NULL",
+           "`units_e` DOUBLE NOT NULL",
+           "`units_sigma` DOUBLE NOT NULL",
+           "`ref` VARCHAR(1000)",
+           "`lhsA_id` INT UNSIGNED NULL",
+           "`lhsB_id` INT UNSIGNED NULL",
+           "`rhsA_id` INT UNSIGNED NULL",
+           "`rhsB_id` INT UNSIGNED NULL",
+           "`threshold` DOUBLE NULL",
+           "`wavelength` DOUBLE NULL",
+           "`lhs_v` INT NULL",
+           "`rhs_v` INT NULL",
+           "`lhs_j` INT NULL",
+           "`rhs_j` INT NULL",
+           "`background` VARCHAR(10000)",
+           "`lpu` DOUBLE NULL",
+           "`upu` DOUBLE NULL",
+           "PRIMARY KEY(`CS_ID`)"],
+    "csdata": ["`id` INT UNSIGNED NOT NULL AUTO_INCREMENT",
+               "`cs_id` INT UNSIGNED NOT NULL",
+               "`e` DOUBLE NOT NULL",
+               "`sigma` DOUBLE NOT NULL",
+               "PRIMARY KEY(`id`)"],
+    "rate": ["`rate_id` INT UNSIGNED NOT NULL AUTO_INCREMENT",
+             "`process_id` INT UNSIGNED NOT NULL",
+             "`ref` VARCHAR(1000)",
+             "`lhsA_id` INT UNSIGNED NULL",
+             "`lhsB_id` INT UNSIGNED NULL",
+             "`rhsA_id` INT UNSIGNED NULL",
+             "`rhsB_id` INT UNSIGNED NULL",
+             "`threshold` DOUBLE NULL",
+             "`wavelength` DOUBLE NULL",
+             "`lhs_v` INT NULL",
+             "`rhs_v` INT NULL",
+             "`lhs_j` INT NULL",
+             "`rhs_j` INT NULL",
+             "`background` VARCHAR(10000)",
+             "`form` VARCHAR(100) NOT NULL",
+             "PRIMARY KEY(`RATE_ID`)"],
+    "ratedata": ["`id` INT UNSIGNED NOT NULL AUTO_INCREMENT",
+                 "`rate_id` INT UNSIGNED NOT NULL",
+                 "`num` DOUBLE NOT NULL",
+                 "`constant` DOUBLE NOT NULL",
+                 "`lau` DOUBLE NOT NULL",
+                 "`uau` DOUBLE NOT NULL",
+                 "PRIMARY KEY(`id`)"],
+    "models2cs": ["`cs_id` INT UNSIGNED NOT NULL",
+                  "`model_id` INT UNSIGNED NOT NULL",
+                  "PRIMARY KEY pk_models2cs (cs_id, model_id)"],
+    "models2rate": ["`rate_id` INT UNSIGNED NOT NULL",
+                    "`model_id` INT UNSIGNED NOT NULL",
+                    "PRIMARY KEY pk_models2rate (rate_id, model_id)"],
+    "build_manifest": ["`filename` VARCHAR(500) NOT NULL",
+                       "`sha256` CHAR(64) NOT NULL",
+                       "`cs_id` INT UNSIGNED NULL",
+                       "PRIMARY KEY(`filename`)"]}
+"""Column definitions and primary key of each table, in creation order."""
+
+SECONDARY_INDEXES = {"states": [("species_id", "species_id")],
+                     "cs": [("PROCESS_ID", "process_id")],
+                     "csdata": [("cs_id", "cs_id")],
+                     "rate": [("PROCESS_ID", "process_id")],
+                     "ratedata": [("rate_id", "rate_id")]}
+"""``(index, column)`` of each secondary index."""
+
+FOREIGN_KEYS = {"states": [("species_id_STATES", "species_id", "species", "id")],
+                "cs": [("PROCESS_ID_CS", "process_id", "processes", "id"),
+                       ("LHSA_ID_CS", "lhsA_id", "states", "id"),
+                       ("LHSB_ID_CS", "lhsB_id", "states", "id"),
+                       ("RHSA_ID_CS", "rhsA_id", "states", "id"),
+                       ("RHSB_ID_CS", "rhsB_id", "states", "id")],
+                "csdata": [("CS_ID_CSDATA", "cs_id", "cs", "cs_id")],
+                "rate": [("PROCESS_ID_RATE", "process_id", "processes", "id"),
+                         ("LHSA_ID_RATE", "lhsA_id", "states", "id"),
+                         ("LHSB_ID_RATE", "lhsB_id", "states", "id"),
+                         ("RHSA_ID_RATE", "rhsA_id", "states", "id"),
+                         ("RHSB_ID_RATE", "rhsB_id", "states", "id")],
+                "ratedata": [("RATE_ID_RATEDATA", "rate_id", "rate", "rate_id")]}
+"""``(constraint, column, referenced table, referenced column)`` of each
+foreign key."""
+
+
+def index_clauses(database, table_name):
+    """Return the secondary index and foreign key clauses of a table."""
+    clauses = ["INDEX `" + name + "`(`" + column + "` ASC)"
+               for name, column in SECONDARY_INDEXES.get(table_name, [])]
+    clauses += ["CONSTRAINT `" + name + "` FOREIGN KEY(`" + column + "`) "
+                "REFERENCES `" + database + "`.`" + ref_table + "`(`" + ref_column + "`) "
+                "ON DELETE RESTRICT ON UPDATE CASCADE"
+                for name, column, ref_table, ref_column
+                in FOREIGN_KEYS.get(table_name, [])]
+    return clauses
+
+
+def create_table(database, table_name, indexes=True):
+    """Return the CREATE TABLE statement of a table.
+
+    Parameters
+    ----------
+    database : str
+    table_name : str
+    indexes : bool, optional
+        If False, leave out the secondary indexes and foreign keys (see
+        :func:`add_indexes`).
+
+    """
+    clauses = list(TABLES[table_name])
+    if indexes:
+        clauses += index_clauses(database, table_name)
+    return ("CREATE TABLE `" + database + "`.`" + table_name + "`(" +
+            ", ".join(clauses) + ");")
+
+
+def add_indexes(database):
+    """Return one ALTER TABLE statement per table that adds its secondary
+    indexes and foreign keys."""
+    return ["ALTER TABLE `" + database + "`.`" + table_name + "` " +
+            ", ".join("ADD " + clause for clause in index_clauses(database, table_name)) +
+            ";"
+            for table_name in SECONDARY_INDEXES]
+
+
+def orphan_queries():
+    """Return ``(table.column, query)`` for each foreign key, where the query
+    counts the rows that refer to a missing row."""
+    return [(table_name + "." + column,
+             "SELECT COUNT(*) FROM `" + table_name + "` AS A "
+             "LEFT JOIN `" + ref_table + "` AS B "
+             "ON B.`" + ref_column + "` = A.`" + column + "` "
+             "WHERE A.`" + column + "` IS NOT NULL "
+             "AND B.`" + ref_column + "` IS NULL;")
+            for table_name, foreign_keys in FOREIGN_KEYS.items()
+            for _, column, ref_table, ref_column in foreign_keys]
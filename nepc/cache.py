@@ -0,0 +1,259 @@
+"""Caches of cross sections loaded from NEPC MySQL databases.
+
+:func:`.load_cs` (and so :class:`.CS`, :class:`.Model`, and
+:class:`.CustomModel`) looks each ``cs_id`` up in :data:`CS_CACHE` before
+querying the server, and only fetches the cross sections it does not find.
+Cached :class:`.CS` instances are shared by every model and every
+:func:`.load_cs` call that returns them, so they are read-only: their
+``metadata`` and ``data`` are :class:`ReadOnlyDict`'s and their data arrays
+are not writeable (build a :class:`.CustomCS` to modify one).
+
+Examples
+--------
+Load a model twice; the second time no cross section data is fetched:
+
+    >>> fict = nepc.Model(cursor, "fict")
+    >>> fict = nepc.Model(cursor, "fict")
+    >>> nepc.CS_CACHE.stats()['hits']
+    30
+
+Drop the cached cross sections after the database is rebuilt:
+
+    >>> nepc.CS_CACHE.invalidate()
+
+:class:`DiskCache` keeps whole models on disk between sessions. It is keyed
+by the database and its :meth:`.Backend.fingerprint`, so a rebuilt database
+invalidates it automatically:
+
+    >>> fict = nepc.Model(cursor, "fict", disk_cache=nepc.DiskCache())
+
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from urllib.parse import quote
+import numpy as np
+from nepc.util import config
+from nepc.util.util import get_size
+
+DEFAULT_MAX_BYTES = 256*2**20
+"""Default bound on the memory held by :data:`CS_CACHE` (256 MiB)."""
+
+
+def _frozen(array):
+    """Return a compact, read-only float64 copy of ``array``, so the cache does
+    not keep a whole query batch alive through a view."""
+    array = np.array(array, dtype=np.float64)
+    array.flags.writeable = False
+    return array
+
+
+class ReadOnlyDict(dict):
+    """A dict that raises a TypeError when modified, for the ``metadata`` and
+    ``data`` of cached cross sections; :meth:`copy` returns a plain dict."""
+    def _read_only(self, *args, **kwargs):
+        raise TypeError('the cross section is shared through CS_CACHE and read-only; '
+                        'modify a copy (e.g. a CustomCS) instead')
+
+    __setitem__ = __delitem__ = __ior__ = _read_only
+    clear = pop = popitem = setdefault = update = _read_only
+
+    def copy(self):
+        return dict(self)
+
+    def __reduce__(self):
+        return (dict, (dict(self),))
+
+
+class CSCache:
+    """A byte-bounded LRU cache of :class:`.CS` instances keyed by
+    ``(database, cs_id)``.
+
+    Parameters
+    ----------
+    max_bytes : int, optional
+        Least recently used cross sections are evicted once the cached
+        cross sections take more than ``max_bytes`` (as measured by
+        :func:`.get_size`); 0 disables the cache.
+
+    Attributes
+    ----------
+    hits, misses, evictions : int
+        Number of lookups that found a cross section, lookups that did not,
+        and cross sections evicted to stay within ``max_bytes``.
+    nbytes : int
+        Size of the cached cross sections.
+
+    """
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, database, cs_id):
+        """Return the cached :class:`.CS` for ``cs_id`` in ``database``, or None."""
+        with self._lock:
+            entry = self._entries.get((database, cs_id))
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end((database, cs_id))
+            self.hits += 1
+            return entry[0]
+
+    def put(self, database, cs):
+        """Make the metadata and data of ``cs`` read-only, cache it, and
+        return it.
+
+        A cross section larger than ``max_bytes`` is returned without being
+        cached.
+        """
+        cs.metadata = ReadOnlyDict(cs.metadata)
+        cs.data = ReadOnlyDict((key, _frozen(value)) for key, value in cs.data.items())
+        size = get_size(cs)
+        key = (database, cs.metadata['cs_id'])
+        with self._lock:
+            if size > self.max_bytes:
+                return cs
+            if key in self._entries:
+                self.nbytes -= self._entries.pop(key)[1]
+            self._entries[key] = (cs, size)
+            self.nbytes += size
+            while self.nbytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.nbytes -= evicted_size
+                self.evictions += 1
+        return cs
+
+    def invalidate(self, database=None, cs_id_list=None):
+        """Drop cached cross sections.
+
+        Parameters
+        ----------
+        database : str, optional
+            Only drop cross sections from this database (see
+            :meth:`.Backend.database_key`); by default, from every database.
+        cs_id_list : list of int, optional
+            Only drop these ``cs_id``'s; by default, every ``cs_id``.
+
+        """
+        with self._lock:
+            cs_ids = None if cs_id_list is None else set(cs_id_list)
+            for key in [key for key in self._entries
+                        if (database is None or key[0] == database) and
+                        (cs_ids is None or key[1] in cs_ids)]:
+                self.nbytes -= self._entries.pop(key)[1]
+
+    def clear(self):
+        """Drop every cached cross section and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def stats(self):
+        """Return the counters, number of cached cross sections, and sizes as a dict."""
+        with self._lock:
+            return {"hits": self.hits,
+                    "misses": self.misses,
+                    "evictions": self.evictions,
+                    "entries": len(self._entries),
+                    "nbytes": self.nbytes,
+                    "max_bytes": self.max_bytes}
+
+
+CS_CACHE = CSCache()
+"""The cache used by :func:`.load_cs`. The :class:`.CS` instances it holds
+are the ones handed to callers, shared between them, and read-only."""
+
+
+class DiskCache:
+    """Models stored on disk, one ``.npz`` file per model.
+
+    Each file holds the metadata rows of the model's cross sections as JSON
+    and their ``e`` and ``sigma`` arrays concatenated, with offsets. Files
+    live in ``<path>/<database>/<fingerprint>/``; when a model is saved for
+    a new fingerprint of a database, the directories of its other
+    fingerprints are removed.
+
+    Parameters
+    ----------
+    path : str, optional
+        Cache directory (default :func:`.config.cache_home`).
+
+    """
+    def __init__(self, path=None):
+        self.path = config.cache_home() if path is None else path
+
+    def directory(self, database, fingerprint):
+        """Return the directory for ``fingerprint`` of ``database``."""
+        return os.path.join(self.path, quote(database, safe=''),
+                            hashlib.sha256(fingerprint.encode()).hexdigest()[:16])
+
+    def prune(self, database, fingerprint):
+        """Remove the directories of every fingerprint of ``database`` other
+        than ``fingerprint``."""
+        fingerprint_dir = self.directory(database, fingerprint)
+        database_dir = os.path.dirname(fingerprint_dir)
+        if not os.path.isdir(database_dir):
+            return
+        for name in os.listdir(database_dir):
+            if name != os.path.basename(fingerprint_dir):
+                shutil.rmtree(os.path.join(database_dir, name), ignore_errors=True)
+
+    def _filename(self, database, fingerprint, model_name):
+        return os.path.join(self.directory(database, fingerprint),
+                            "model_" + quote(model_name, safe='') + ".npz")
+
+    def load(self, database, fingerprint, model_name):
+        """Return the ``(metadata, e_energy, sigma)`` of each cross section of
+        ``model_name``, or None if the model is not cached for ``fingerprint``."""
+        filename = self._filename(database, fingerprint, model_name)
+        if not os.path.exists(filename):
+            return None
+        with np.load(filename, allow_pickle=False) as npz:
+            metadata = json.loads(npz['metadata'].tobytes().decode())
+            offsets = npz['offsets']
+            e_energy = npz['e']
+            sigma = npz['sigma']
+        return [(row, e_energy[start:stop], sigma[start:stop])
+                for row, start, stop in zip(metadata, offsets[:-1], offsets[1:])]
+
+    def save(self, database, fingerprint, model_name, cs_list):
+        """Write the cross sections in ``cs_list`` as ``model_name``."""
+        self.prune(database, fingerprint)
+        filename = self._filename(database, fingerprint, model_name)
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+        lengths = [len(cs.data['e']) for cs in cs_list]
+        metadata = json.dumps([list(cs.metadata.values()) for cs in cs_list]).encode()
+        empty = np.empty(0, dtype=np.float64)
+        # write to a temporary file first, so readers never see a partial file
+        fd, tmp = tempfile.mkstemp(suffix=".npz", dir=os.path.dirname(filename))
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(f,
+                         metadata=np.frombuffer(metadata, dtype=np.uint8),
+                         offsets=np.concatenate(([0], np.cumsum(lengths, dtype=np.int64))),
+                         e=np.concatenate([cs.data['e'] for cs in cs_list] + [empty]),
+                         sigma=np.concatenate([cs.data['sigma'] for cs in cs_list] + [empty]))
+            os.replace(tmp, filename)
+        except BaseException:
+            os.remove(tmp)
+            raise
+
+    def clear(self):
+        """Remove every cached model."""
+        shutil.rmtree(self.path, ignore_errors=True)
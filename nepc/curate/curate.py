@@ -610,11 +610,13 @@ class CurateLumped(CurateCS):
         self.finalize(next_cs_id, next_csdata_id, test, debug)
 
 
-    def get_csdata(self, cs_ids) -> List[dict]:
-        cnx, cursor = nepc.connect(local=True)
-        csdata = nepc.CustomModel(cursor, cs_id_list=cs_ids).cs
-        cnx.close()
-        return csdata
+    def get_csdata(self, cs_ids, session=None) -> List[dict]:
+        """Get the cross sections to lump from ``session`` (by default, the
+        shared pooled session on the local database; see :func:`.connect_pool`).
+        """
+        if session is None:
+            session = nepc.connect_pool(local=True)
+        return nepc.CustomModel(session, cs_id_list=cs_ids).cs
 
 
     def augment_csdata(self, csdata, outdir, title, units_e, units_sigma,
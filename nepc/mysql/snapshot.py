@@ -0,0 +1,55 @@
+"""Exports a NEPC database to a snapshot directory (see nepc.backend.snapshot)
+
+Export the nepc_test database on localhost:
+
+    $ python nepc/mysql/snapshot.py --test /path/to/snapshot
+
+Export directly from the data files used to build the nepc_test database:
+
+    $ python nepc/mysql/snapshot.py --data $NEPC_HOME/tests/data /path/to/snapshot
+"""
+import argparse
+import time
+from nepc import nepc
+from nepc.backend import FileBackend, MySQLBackend, export_snapshot
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Export a NEPC database to a snapshot directory.')
+    parser.add_argument('path', help='snapshot directory')
+    parser.add_argument('--data',
+                        help='export from the data files in DATA instead of MySQL')
+    parser.add_argument('--test', action='store_true',
+                        help='export the nepc_test database on localhost')
+    parser.add_argument('--github', action='store_true',
+                        help='export the nepc_test database on GitHub runner')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    t0 = time.time()
+
+    if args.data is not None:
+        manifest = export_snapshot(FileBackend(args.data), args.path)
+    else:
+        cnx, cursor = nepc.connect(local=args.test or args.github,
+                                   test=args.test or args.github,
+                                   github=args.github)
+        try:
+            manifest = export_snapshot(MySQLBackend(cursor), args.path)
+        finally:
+            cursor.close()
+            cnx.close()
+
+    print("\nwrote snapshot to " + args.path + ": " +
+          str(round(time.time() - t0, 2)) + " sec\n"
+          "===============================================")
+    for table, rows in manifest["rows"].items():
+        print(table + ": " + str(rows) + " rows")
+    return manifest
+
+
+if __name__ == "__main__":
+    main()
@@ -22,10 +22,25 @@ running on the local machine:
 
     >>> cnx, cursor = nepc.connect(local=True, test=True)
 
+Open a pool of connections to the same database, for code that makes many
+short requests:
+
+    >>> session = nepc.connect_pool(local=True, test=True)
+
 Access the pre-defined plasma chemistry model, `fict`, in the `nepc_test` database:
 
     >>> fict = nepc.Model(cursor, "fict")
 
+Access the same model without a MySQL server, directly from the data files
+used to build the ``nepc_test`` database:
+
+    >>> backend = nepc.FileBackend(os.environ['NEPC_HOME'] + "/tests/data")
+    >>> fict = nepc.Model(backend, "fict")
+
+Load several models at once over the pooled connections:
+
+    >>> models = nepc.load_models(session, ["fict", "fict_min", "fict_min2"])
+
 Print a summary of the ``fict`` model, including a stylized Pandas dataframe:
 
     >>> fict.summary()
@@ -36,6 +51,9 @@ building data files for the ``nepc_test`` database, including parsing
 are in ``tests/data/methods``.
 
 """
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import List
 import numpy as np
 from pandas import DataFrame
@@ -43,6 +61,12 @@ import pandas as pd
 import mysql.connector
 import matplotlib.pyplot as plt
 from nepc.util import config
+from nepc.backend import as_backend
+from nepc.backend import CS_BATCH_SIZE
+from nepc.backend import PooledMySQLBackend
+from nepc.backend.base import RATE_METADATA_COLUMNS
+from nepc.backend.filters import metadata_matches
+from nepc.cache import CS_CACHE
 
 
 PRODUCTION = config.production()
@@ -58,6 +82,31 @@ def lazy_property(fn):
 
     return _lazy_property
 
+def connection_config(local=False, test=False, github=False):
+    """Return the arguments of ``mysql.connector.connect`` for a NEPC database
+    (see :func:`connect` for the parameters)."""
+    if local:
+        hostname = 'localhost'
+    else:
+        hostname = PRODUCTION
+
+    if test:
+        database = 'nepc_test'
+    else:
+        database = 'nepc'
+
+    if github:
+        return {'user': 'root',
+                'host': hostname,
+                'database': database,
+                'raise_on_warnings': True}
+    return {'user': 'nepc',
+            'password': 'nepc',
+            'host': hostname,
+            'database': database,
+            'raise_on_warnings': True}
+
+
 def connect(local=False, DBUG=False, test=False, github=False):
     """Establish a connection to a NEPC MySQL database
 
@@ -82,42 +131,63 @@ def connect(local=False, DBUG=False, test=False, github=False):
         interacts with the NEPC server using the `cnx` connection.
 
     """
-    if local:
-        hostname = 'localhost'
-    else:
-        hostname = PRODUCTION
+    config = connection_config(local, test, github)
 
     if DBUG:  # pragma: no cover
-        print("\nUsing NEPC database on " + hostname)
-
-    if test:
-        database = 'nepc_test'
-    else:
-        database = 'nepc'
-
-    if github:
-        config = {'user': 'root',
-                  'host': hostname,
-                  'database': database,
-                  'raise_on_warnings': True}
-    else:
-        config = {'user': 'nepc',
-                  'password': 'nepc',
-                  'host': hostname,
-                  'database': database,
-                  'raise_on_warnings': True}
+        print("\nUsing NEPC database on " + config['host'])
 
     cnx = mysql.connector.connect(**config)
     cursor = cnx.cursor()
     return cnx, cursor
 
 
+_SESSIONS = {}
+_SESSIONS_LOCK = threading.Lock()
+
+
+def connect_pool(local=False, DBUG=False, test=False, github=False,
+                 pool_size=5, timeout=None):
+    """Open a pooled session on a NEPC MySQL database
+
+    The session can be passed to :class:`CS`, :class:`Model`, and
+    :class:`CustomModel` (and every function taking a ``cursor``) in place of
+    a cursor. Repeated calls with the same arguments return the same session
+    until it is closed, so code that asks for a session per request reuses
+    open connections instead of connecting each time.
+
+    Parameters
+    ----------
+    local, DBUG, test, github : bool, optional
+        See :func:`connect`.
+    pool_size : int, optional
+        Number of connections in the pool (at most 32).
+    timeout : float, optional
+        Seconds to wait for a free connection; None waits forever.
+
+    Returns
+    -------
+    : :class:`.PooledMySQLBackend`
+
+    """
+    config = connection_config(local, test, github)
+    key = tuple(sorted(config.items())) + (pool_size, timeout)
+    with _SESSIONS_LOCK:
+        session = _SESSIONS.get(key)
+        if session is None or session.closed:
+            if DBUG:  # pragma: no cover
+                print("\nOpening a pool of " + str(pool_size) +
+                      " connections to the NEPC database on " + config['host'])
+            session = PooledMySQLBackend(pool_size=pool_size, timeout=timeout, **config)
+            _SESSIONS[key] = session
+        return session
+
+
 def count_table_rows(cursor, table: str):
     """Return the number of rows in a MySQL table.
 
     Parameters
     ----------
-    cursor : cursor.MySQLCursor
+    cursor : cursor.MySQLCursor or :class:`.Backend`
         A MySQLCursor object. See return value ``cursor`` of :func:`.connect`.
     table : str
         Name of a table in the NEPC database at ``cursor``.
@@ -128,110 +198,115 @@ def count_table_rows(cursor, table: str):
         Number of rows in ``table``.
 
     """
-    cursor.execute("select count(*) from " + table + ";")
-    table_rows = cursor.fetchall()
-    return table_rows[0][0]
+    return as_backend(cursor).count_table_rows(table)
 
 
-def model_cs_id_list(cursor, model_name):
+def model_cs_id_list(cursor, model_name, metadata=None):
     """Get a list of ``cs_id``'s for a model in a NEPC database.
 
     Parameters
     ----------
-    cursor : cursor.MySQLCursor
+    cursor : cursor.MySQLCursor or :class:`.Backend`
         A MySQLCursor object. See return value ``cursor`` of :func:`.connect`.
     model_name : str
         Name of a model in the NEPC MySQL database
+    metadata : dict, optional
+        Only return cross sections whose :attr:`.CS.metadata` meets this
+        filter (see :mod:`.filters`). On a MySQL server, the filter is
+        evaluated by the server.
 
     Returns
     -------
     cs_id_list : list of int
-        cs_id's corresponding to cross sections in the model
+        cs_id's corresponding to cross sections in the model, ordered by cs_id
 
     """
-    cursor.execute("SELECT cs.cs_id as cs_id " +
-                   "FROM cs " +
-                   "JOIN models2cs m2cs ON (cs.cs_id = m2cs.cs_id) " +
-                   "JOIN models m ON (m2cs.model_id = m.model_id) " +
-                   "WHERE m.name LIKE '" + model_name + "'")
-    cs_id_list = cursor.fetchall()
-    cs_id_list = [cs_id[0] for cs_id in cs_id_list]
-    return cs_id_list
+    return as_backend(cursor).model_cs_id_list(model_name, metadata)
 
 
-def cs_e_sigma(cursor, cs_id):
+def cs_e_sigma(cursor, cs_id, as_list=False, window=None):
     """Get electron energy and cross section data for a given ``cs_id`` in a NEPC database.
 
     Parameters
     ----------
-    cursor : cursor.MySQLCursor
+    cursor : cursor.MySQLCursor or :class:`.Backend`
         A MySQLCursor object. See return value ``cursor`` of :func:`.connect`.
     cs_id : int
         The ``cs_id`` for a cross section dataset in the NEPC database at ``cursor``.
+    as_list : bool, optional
+        If true, return lists of float instead of arrays (default False).
+    window : :class:`.Window`, optional
+        Only get the points in an energy window, optionally decimated. On a
+        MySQL server, the window is evaluated by the query.
 
     Returns
     -------
-    : list of float
+    : numpy.ndarray of float64
         Electron energies for the cross section dataset corresponding to ``cs_id``.
-    : list of float
+    : numpy.ndarray of float64
         Cross sections for the cross section dataset corresponding to ``cs_id``.
 
     """
-    cursor.execute("SELECT e, sigma FROM csdata WHERE cs_id = " +
-                   str(cs_id))
-    cross_section = cursor.fetchall()
-    # print(cross_section)
-    e_energy = [i[0] for i in cross_section]
-    sigma = [i[1] for i in cross_section]
+    e_energy, sigma = as_backend(cursor).cs_e_sigma(cs_id, window)
+    if as_list:
+        return e_energy.tolist(), sigma.tolist()
     return e_energy, sigma
 
 
-def cs_e(cursor, cs_id):
+def cs_e(cursor, cs_id, as_list=False, window=None):
     """Get the electron energies for a cross section dataset in a NEPC database 
     corresponding to a given ``cs_id``.
 
     Parameters
     ----------
-    cursor : cursor.MySQLCursor
+    cursor : cursor.MySQLCursor or :class:`.Backend`
         A MySQLCursor object. See return value ``cursor`` of :func:`.connect`.
     cs_id : int
         The ``cs_id`` for a cross section dataset in the NEPC database at ``cursor``.
+    as_list : bool, optional
+        If true, return a list of float instead of an array (default False).
+    window : :class:`.Window`, optional
+        Only get the points in an energy window, optionally decimated. On a
+        MySQL server, the window is evaluated by the query.
 
     Returns
     -------
-    : list of float
+    : numpy.ndarray of float64
         Electron energies for the cross section dataset corresponding to ``cs_id``.
 
     """
-    cursor.execute("SELECT e FROM csdata WHERE cs_id = " +
-                   str(cs_id))
-    cross_section = cursor.fetchall()
-    # print(cross_section)
-    return [i[0] for i in cross_section]
+    e_energy = as_backend(cursor).cs_e(cs_id, window)
+    if as_list:
+        return e_energy.tolist()
+    return e_energy
 
 
-def cs_sigma(cursor, cs_id):
+def cs_sigma(cursor, cs_id, as_list=False, window=None):
     """Get the cross sections for a cross section dataset in a NEPC database
     corresponding to a given ``cs_id``.
 
     Parameters
     ----------
-    cursor : cursor.MySQLCursor
+    cursor : cursor.MySQLCursor or :class:`.Backend`
         A MySQLCursor object. See return value ``cursor`` of :func:`.connect`.
     cs_id : int
         The ``cs_id`` for a cross section dataset in the NEPC database at ``cursor``.
+    as_list : bool, optional
+        If true, return a list of float instead of an array (default False).
+    window : :class:`.Window`, optional
+        Only get the points in an energy window, optionally decimated. On a
+        MySQL server, the window is evaluated by the query.
 
     Returns
     -------
-    : list of float
+    : numpy.ndarray of float64
         Cross sections for the cross section dataset corresponding to ``cs_id``.
 
     """
-    cursor.execute("SELECT sigma FROM csdata WHERE cs_id = " +
-                   str(cs_id))
-    sigma = cursor.fetchall()
-    # print(sigma)
-    return [i[0] for i in sigma]
+    sigma = as_backend(cursor).cs_sigma(cs_id, window)
+    if as_list:
+        return sigma.tolist()
+    return sigma
 
 
 def cs_metadata(cursor, cs_id):
@@ -239,7 +314,7 @@ def cs_metadata(cursor, cs_id):
 
     Parameters
     ----------
-    cursor : cursor.MySQLCursor
+    cursor : cursor.MySQLCursor or :class:`.Backend`
         A MySQLCursor object. See return value ``cursor`` of :func:`.connect`.
     cs_id : int
         The ``cs_id`` for a cross section dataset in the NEPC database at ``cursor``.
@@ -250,34 +325,558 @@ def cs_metadata(cursor, cs_id):
         See :attr:`CS.metadata`. List items are in same order as :attr:`.CS.metadata`.
 
     """
-    cursor.execute("SELECT A.`cs_id` , "
-                   "C.`name` , "
-                   "A.`units_e`, A.`units_sigma`, A.`ref`, "
-                   "D.`name`, E.`name`, "
-                   "F.`name`, G.`name`, "
-                   "A.`threshold`, A.`wavelength`, A.`lhs_v`, A.`rhs_v`, "
-                   "A.`lhs_j`, A.`rhs_j`, "
-                   "A.`background`, A.`lpu`, A.`upu`, "
-                   "D.`long_name`, E.`long_name`, "
-                   "F.`long_name`, G.`long_name`, "
-                   "C.`lhs_e`, C.`rhs_e`, "
-                   "C.`lhs_hv`, C.`rhs_hv`, "
-                   "C.`lhs_v`, C.`rhs_v`, "
-                   "C.`lhs_j`, C.`rhs_j` "
-                   "FROM `cs` AS A "
-                   "LEFT JOIN `processes` AS C "
-                   "ON C.`id` = A.`process_id` "
-                   "LEFT JOIN `states` AS D "
-                   "ON D.`id` = A.`lhsA_id` "
-                   "LEFT JOIN `states` AS E "
-                   "ON E.`id` = A.`lhsB_id` "
-                   "LEFT JOIN `states` AS F "
-                   "ON F.`id` = A.`rhsA_id` "
-                   "LEFT JOIN `states` AS G "
-                   "ON G.`id` = A.`rhsB_id` "
-                   "WHERE A.`cs_id` = " + str(cs_id))
-
-    return list(cursor.fetchall()[0])
+    return as_backend(cursor).cs_metadata(cs_id)
+
+
+def cs_metadata_list(cursor, cs_id_list, batch_size=CS_BATCH_SIZE):
+    """Get metadata for many ``cs_id``'s in a NEPC database with one query per
+    ``batch_size`` cross sections.
+
+    Parameters
+    ----------
+    cursor : cursor.MySQLCursor or :class:`.Backend`
+        A MySQLCursor object. See return value ``cursor`` of :func:`.connect`.
+    cs_id_list : list of int
+        The ``cs_id``'s for cross section datasets in the NEPC database at ``cursor``.
+    batch_size : int, optional
+        Maximum number of ``cs_id``'s per query (default :data:`.CS_BATCH_SIZE`).
+
+    Returns
+    -------
+    dict
+        Maps each ``cs_id`` to its metadata as returned by :func:`.cs_metadata`.
+
+    """
+    return as_backend(cursor).cs_metadata_list(cs_id_list, batch_size)
+
+
+def cs_e_sigma_list(cursor, cs_id_list, batch_size=CS_BATCH_SIZE, window=None):
+    """Get electron energy and cross section data for many ``cs_id``'s in a NEPC
+    database with one query per ``batch_size`` cross sections.
+
+    Parameters
+    ----------
+    cursor : cursor.MySQLCursor or :class:`.Backend`
+        A MySQLCursor object. See return value ``cursor`` of :func:`.connect`.
+    cs_id_list : list of int
+        The ``cs_id``'s for cross section datasets in the NEPC database at ``cursor``.
+    batch_size : int, optional
+        Maximum number of ``cs_id``'s per query (default :data:`.CS_BATCH_SIZE`).
+    window : :class:`.Window`, optional
+        Only get the points in an energy window, optionally decimated. On a
+        MySQL server, the window is evaluated by the query.
+
+    Returns
+    -------
+    dict
+        Maps each ``cs_id`` to a tuple ``(e_energy, sigma)`` of float64 arrays
+        as returned by :func:`.cs_e_sigma`.
+
+    """
+    return as_backend(cursor).cs_e_sigma_list(cs_id_list, batch_size, window)
+
+
+def load_cs(cursor, cs_id_list, batch_size=CS_BATCH_SIZE, cache=True, lazy=False,
+            window=None):
+    """Get the cross sections for many ``cs_id``'s in a NEPC database.
+
+    Metadata and cross section data are fetched in bulk with
+    :func:`.cs_metadata_list` and :func:`.cs_e_sigma_list`, so the number of
+    queries does not grow with the number of cross sections.
+
+    Cross sections from a MySQL database are looked up in
+    :data:`.CS_CACHE` first, and only those not found are fetched; the
+    returned :class:`.CS` instances are shared with the cache.
+
+    Parameters
+    ----------
+    cursor : cursor.MySQLCursor or :class:`.Backend`
+        A MySQLCursor object. See return value ``cursor`` of :func:`.connect`.
+    cs_id_list : list of int
+        The ``cs_id``'s for cross section datasets in the NEPC database at ``cursor``.
+    batch_size : int, optional
+        Maximum number of ``cs_id``'s per query (default :data:`.CS_BATCH_SIZE`).
+    cache : bool, optional
+        Use :data:`.CS_CACHE` (default True).
+    lazy : bool, optional
+        Fetch only the metadata now; the :attr:`.CS.data` of each cross section
+        is fetched on first access, together with that of up to
+        :data:`.LAZY_BATCH_SIZE` neighbouring cross sections that have not
+        been fetched yet (default False). ``cursor`` must stay open until
+        then.
+    window : :class:`.Window`, optional
+        Only load the points of each cross section in an energy window,
+        optionally decimated (see :func:`.cs_e_sigma_list`). Cross sections
+        found in :data:`.CS_CACHE` are windowed in memory; windowed cross
+        sections are not cached.
+
+    Returns
+    -------
+    list of :class:`.CS`
+        Cross sections in the same order as ``cs_id_list``.
+
+    """
+    backend = as_backend(cursor)
+    database = None
+    if cache and CS_CACHE.max_bytes > 0:
+        database = backend.database_key()
+
+    found = dict.fromkeys(cs_id_list)
+    if database is not None:
+        for cs_id in found:
+            found[cs_id] = CS_CACHE.get(database, cs_id)
+    missing = [cs_id for cs_id, cs in found.items() if cs is None]
+    if window is not None:
+        for cs_id, cs in found.items():
+            if cs is not None:
+                found[cs_id] = CS.from_query(list(cs.metadata.values()),
+                                             *window.apply(cs.data['e'], cs.data['sigma']))
+        # a windowed cross section is not the whole cross section
+        database = None
+    if missing:
+        metadata = backend.cs_metadata_list(missing, batch_size)
+        if lazy:
+            loader = LazyData(backend, database, window=window)
+            for cs_id in missing:
+                found[cs_id] = CS.from_metadata(metadata[cs_id], loader)
+            loader.cs_list = [found[cs_id] for cs_id in missing]
+        else:
+            e_sigma = backend.cs_e_sigma_list(missing, batch_size, window)
+            for cs_id in missing:
+                cs = CS.from_query(metadata[cs_id], *e_sigma[cs_id])
+                found[cs_id] = cs if database is None else CS_CACHE.put(database, cs)
+    return [found[cs_id] for cs_id in cs_id_list]
+
+
+def model_rate_id_list(cursor, model_name):
+    """Get a list of ``rate_id``'s for a model in a NEPC database.
+
+    Parameters
+    ----------
+    cursor : cursor.MySQLCursor or :class:`.Backend`
+        A MySQLCursor object. See return value ``cursor`` of :func:`.connect`.
+    model_name : str
+        Name of a model in the NEPC MySQL database
+
+    Returns
+    -------
+    rate_id_list : list of int
+        rate_id's corresponding to rates in the model, ordered by rate_id
+
+    """
+    return as_backend(cursor).model_rate_id_list(model_name)
+
+
+def rate_metadata_list(cursor, rate_id_list, batch_size=CS_BATCH_SIZE):
+    """Get metadata for many ``rate_id``'s in a NEPC database with one query per
+    ``batch_size`` rates.
+
+    Parameters
+    ----------
+    cursor : cursor.MySQLCursor or :class:`.Backend`
+        A MySQLCursor object. See return value ``cursor`` of :func:`.connect`.
+    rate_id_list : list of int
+        The ``rate_id``'s of rates in the NEPC database at ``cursor``.
+    batch_size : int, optional
+        Maximum number of ``rate_id``'s per query (default :data:`.CS_BATCH_SIZE`).
+
+    Returns
+    -------
+    dict
+        Maps each ``rate_id`` to a list of its metadata, in the order of the
+        keys of :attr:`.Rate.metadata`.
+
+    """
+    return as_backend(cursor).rate_metadata_list(rate_id_list, batch_size)
+
+
+def ratedata_list(cursor, rate_id_list, batch_size=CS_BATCH_SIZE):
+    """Get the ``ratedata`` rows for many ``rate_id``'s in a NEPC database with
+    one query per ``batch_size`` rates.
+
+    Parameters
+    ----------
+    cursor : cursor.MySQLCursor or :class:`.Backend`
+        A MySQLCursor object. See return value ``cursor`` of :func:`.connect`.
+    rate_id_list : list of int
+        The ``rate_id``'s of rates in the NEPC database at ``cursor``.
+    batch_size : int, optional
+        Maximum number of ``rate_id``'s per query (default :data:`.CS_BATCH_SIZE`).
+
+    Returns
+    -------
+    dict
+        Maps each ``rate_id`` to a tuple of arrays ``(num, constant, lau,
+        uau)``, ordered by ``num`` (see :attr:`.Rate.data`).
+
+    """
+    return as_backend(cursor).ratedata_list(rate_id_list, batch_size)
+
+
+def load_rates(cursor, rate_id_list, batch_size=CS_BATCH_SIZE):
+    """Get the rates for many ``rate_id``'s in a NEPC database with
+    :func:`.rate_metadata_list` and :func:`.ratedata_list`.
+
+    Parameters
+    ----------
+    cursor : cursor.MySQLCursor or :class:`.Backend`
+        A MySQLCursor object. See return value ``cursor`` of :func:`.connect`.
+    rate_id_list : list of int
+        The ``rate_id``'s of rates in the NEPC database at ``cursor``.
+    batch_size : int, optional
+        Maximum number of ``rate_id``'s per query (default :data:`.CS_BATCH_SIZE`).
+
+    Returns
+    -------
+    list of :class:`.Rate`
+        Rates in the same order as ``rate_id_list``.
+
+    """
+    backend = as_backend(cursor)
+    if not rate_id_list:
+        return []
+    metadata = backend.rate_metadata_list(rate_id_list, batch_size)
+    ratedata = backend.ratedata_list(rate_id_list, batch_size)
+    return [Rate.from_query(metadata[rate_id], *ratedata[rate_id])
+            for rate_id in rate_id_list]
+
+
+LAZY_BATCH_SIZE = 50
+"""Maximum number of cross sections whose data is fetched together on first
+access to :attr:`.CS.data` (see ``lazy`` in :func:`.load_cs`)."""
+
+
+class LazyData:
+    """Fetches :attr:`.CS.data` for cross sections loaded with ``lazy=True``.
+
+    On first access to the data of a cross section in ``cs_list``, the data
+    of that cross section and of the following ones in ``cs_list`` that have
+    not been fetched yet is fetched in one query, up to ``batch_size`` cross
+    sections.
+
+    Parameters
+    ----------
+    backend : :class:`.Backend`
+    database : str or None
+        Key of the database in :data:`.CS_CACHE`; cross sections are cached
+        once their data is fetched. None leaves them out of the cache.
+    cs_list : list of :class:`.CS`, optional
+    batch_size : int, optional
+        Default :data:`.LAZY_BATCH_SIZE`.
+    window : :class:`.Window`, optional
+        Only fetch the points in this window (see :func:`.cs_e_sigma_list`).
+
+    """
+    def __init__(self, backend, database, cs_list=None, batch_size=LAZY_BATCH_SIZE,
+                 window=None):
+        self.backend = backend
+        self.database = database
+        self.cs_list = [] if cs_list is None else cs_list
+        self.batch_size = batch_size
+        self.window = window
+
+    @staticmethod
+    def regroup(cs_list):
+        """Make the cross sections in ``cs_list`` whose data has not been
+        fetched neighbours of each other, so that a subset of a lazy model
+        fetches only its own data."""
+        pending = {}
+        for cs in cs_list:
+            if cs._loader is not None:
+                pending.setdefault(id(cs._loader), (cs._loader, []))[1].append(cs)
+        for loader, members in pending.values():
+            regrouped = LazyData(loader.backend, loader.database, members, loader.batch_size,
+                                 loader.window)
+            for cs in members:
+                cs._loader = regrouped
+
+    def load(self, cs):
+        """Fetch the data of ``cs`` and its neighbours."""
+        start = next(i for i, member in enumerate(self.cs_list) if member is cs)
+        batch = [member for member in self.cs_list[start:]
+                 if member._loader is self][:self.batch_size]
+        e_sigma = self.backend.cs_e_sigma_list([member.metadata['cs_id'] for member in batch],
+                                               self.batch_size, self.window)
+        for member in batch:
+            e_energy, sigma = e_sigma[member.metadata['cs_id']]
+            member.data = {"e": e_energy, "sigma": sigma}
+            if self.database is not None:
+                CS_CACHE.put(self.database, member)
+
+
+def pack(cs_list):
+    """Concatenate the data of the cross sections in ``cs_list``.
+
+    Parameters
+    ----------
+    cs_list : list of :class:`.CS`
+
+    Returns
+    -------
+    e_energy, sigma : numpy.ndarray of float64
+        ``e`` and ``sigma`` of every cross section, concatenated.
+    offsets : numpy.ndarray of int64
+        The data of ``cs_list[i]`` is ``e_energy[offsets[i]:offsets[i + 1]]``.
+
+    """
+    empty = np.empty(0, dtype=np.float64)
+    offsets = np.zeros(len(cs_list) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(cs.data['e']) for cs in cs_list])
+    e_energy = np.concatenate([np.asarray(cs.data['e'], dtype=np.float64)
+                               for cs in cs_list] + [empty])
+    sigma = np.concatenate([np.asarray(cs.data['sigma'], dtype=np.float64)
+                            for cs in cs_list] + [empty])
+    return e_energy, sigma, offsets
+
+
+def segment_reduce(ufunc, values, offsets, empty=np.nan):
+    """Reduce each segment ``values[offsets[i]:offsets[i + 1]]`` with ``ufunc``
+    (e.g. ``np.maximum``), giving ``empty`` for empty segments."""
+    starts = offsets[:-1]
+    nonempty = offsets[1:] > starts
+    result = np.full(len(starts), empty, dtype=values.dtype)
+    if nonempty.any():
+        result[nonempty] = ufunc.reduceat(values, starts[nonempty])
+    return result
+
+
+class CommonGrid:
+    """The union of the electron energies of several cross sections, in eV.
+
+    The grid is built with a single sort of the concatenated energies (see
+    :func:`pack`), which also gives the position of every energy on the grid;
+    interpolating the cross sections onto the grid reuses these positions
+    instead of searching for them again.
+
+    Parameters
+    ----------
+    cs_list : list of :class:`.CS`
+
+    Attributes
+    ----------
+    e : numpy.ndarray of float64
+        Sorted unique electron energies of all cross sections, in eV
+        (``units_e`` times :attr:`.CS.data` ``e``).
+    offsets : numpy.ndarray of int64
+        The points of ``cs_list[i]`` are ``offsets[i]:offsets[i + 1]`` of
+        :attr:`index` (see :func:`pack`).
+    index : numpy.ndarray of int64
+        Position in :attr:`e` of the energy of each point.
+
+    Examples
+    --------
+    >>> grid = fict.common_grid()
+    >>> e_cs = grid.e[grid.indices(0)]
+
+    """
+    def __init__(self, cs_list):
+        e_energy, _, self.offsets = pack(cs_list)
+        units_e = np.array([cs.metadata['units_e'] for cs in cs_list], dtype=np.float64)
+        e_energy *= np.repeat(units_e, np.diff(self.offsets))
+        self.e, self.index = np.unique(e_energy, return_inverse=True)
+
+    def __len__(self):
+        """number of energies in the grid"""
+        return len(self.e)
+
+    def indices(self, i):
+        """Return the positions in :attr:`e` of the energies of cross section ``i``."""
+        return self.index[self.offsets[i]:self.offsets[i + 1]]
+
+
+INTERP_CHUNK_SIZE = 2**18
+
+
+def interpolate(cs_list, grid, method='linear', fill=0.0, dtype=np.float64,
+                chunk_size=INTERP_CHUNK_SIZE):
+    """Interpolate the cross sections in ``cs_list`` onto an energy grid.
+
+    The cross sections are interpolated together, a chunk of rows at a
+    time: every point of a chunk is located on the grid with one search,
+    and the bracketing points of every grid energy follow from a cumulative
+    count of the points below it, so no Python loop runs over the cross
+    sections.
+
+    Parameters
+    ----------
+    cs_list : list of :class:`.CS`
+    grid : array_like or :class:`.CommonGrid`
+        Increasing electron energies in eV.
+    method : str, optional
+        ``'linear'`` or ``'loglog'`` (linear in log(e) and log(sigma);
+        intervals with a non-positive e or sigma are interpolated linearly).
+    fill : float, optional
+        Value at energies above the threshold but outside the tabulated
+        energies of a cross section; below the threshold the cross section
+        is 0.
+    dtype : numpy.dtype, optional
+        ``np.float64`` or ``np.float32``.
+    chunk_size : int, optional
+        Approximate number of matrix elements computed at a time, which
+        bounds the temporary memory.
+
+    Returns
+    -------
+    numpy.ndarray
+        Cross sections in :math:`m^2` (``units_sigma`` times
+        :attr:`.CS.data` ``sigma``), one row per cross section and one
+        column per energy in ``grid``.
+
+    """
+    if method not in ('linear', 'loglog'):
+        raise ValueError(f"method must be 'linear' or 'loglog', not {method!r}")
+    if isinstance(grid, CommonGrid):
+        grid = grid.e
+    grid = np.asarray(grid, dtype=np.float64)
+    if grid.ndim != 1 or np.any(np.diff(grid) < 0):
+        raise ValueError('grid must be a one dimensional array of increasing energies')
+    result = np.empty((len(cs_list), len(grid)), dtype=dtype)
+    rows = max(1, chunk_size // (len(grid) + 1))
+    for start in range(0, len(cs_list), rows):
+        stop = min(start + rows, len(cs_list))
+        result[start:stop] = _interpolate_chunk(cs_list[start:stop], grid, method, fill)
+    return result
+
+
+def _interpolate_chunk(cs_list, grid, method, fill):
+    e_energy, sigma, offsets = pack(cs_list)
+    lengths = np.diff(offsets)
+    n_cs, n_grid = len(cs_list), len(grid)
+    segment = np.repeat(np.arange(n_cs), lengths)
+    if np.any(np.diff(e_energy)[np.diff(segment) == 0] < 0):
+        order = np.lexsort((e_energy, segment))
+        e_energy, sigma = e_energy[order], sigma[order]
+    e_energy *= np.repeat([cs.metadata['units_e'] for cs in cs_list], lengths)
+    sigma *= np.repeat([cs.metadata['units_sigma'] for cs in cs_list], lengths)
+    threshold = np.array([cs.metadata['threshold'] for cs in cs_list], dtype=np.float64)
+    threshold *= [cs.metadata['units_e'] for cs in cs_list]
+
+    # below[i, j]: number of points of cross section i at or below grid[j]
+    position = np.searchsorted(grid, e_energy, side='left')
+    below = np.bincount(segment*(n_grid + 1) + position, minlength=n_cs*(n_grid + 1))
+    below = np.cumsum(below.reshape(n_cs, n_grid + 1)[:, :n_grid], axis=1)
+
+    # bracket grid[j] with the points left and left + 1 of cross section i
+    left = offsets[:-1, np.newaxis] + np.clip(below - 1, 0, np.maximum(lengths - 2, 0)[:, np.newaxis])
+    right = np.minimum(left + 1, np.maximum(offsets[1:, np.newaxis] - 1, 0))
+    e_left, e_right = np.append(e_energy, np.nan)[left], np.append(e_energy, np.nan)[right]
+    sigma_left, sigma_right = np.append(sigma, np.nan)[left], np.append(sigma, np.nan)[right]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        width = e_right - e_left
+        t = np.where(width > 0, (grid - e_left)/width, 0.0)
+        values = sigma_left + t*(sigma_right - sigma_left)
+        if method == 'loglog':
+            positive = (e_left > 0) & (sigma_left > 0) & (sigma_right > 0) & (width > 0)
+            log_t = np.log(grid/e_left)/np.log(e_right/e_left)
+            log_values = sigma_left*np.power(sigma_right/sigma_left, log_t)
+            values = np.where(positive, log_values, values)
+
+    inside = (below > 0) & (grid <= np.append(e_energy, np.nan)[offsets[1:] - 1][:, np.newaxis])
+    values = np.where(inside, values, fill)
+    return np.where(grid < threshold[:, np.newaxis], 0.0, values)
+
+
+ELECTRON_CHARGE = 1.602176634e-19
+ELECTRON_MASS = 9.1093837015e-31
+RATE_GRID_MIN = 1e-3
+RATE_GRID_SIZE = 2000
+
+
+def maxwellian(e_energy, Te):
+    """Return Maxwellian electron energy distribution functions.
+
+    Parameters
+    ----------
+    e_energy : array_like
+        Electron energies in eV.
+    Te : array_like
+        Electron temperatures in eV.
+
+    Returns
+    -------
+    numpy.ndarray
+        :math:`f(\\epsilon) = 2 \\sqrt{\\epsilon/\\pi} T_e^{-3/2} e^{-\\epsilon/T_e}`
+        in eV\\ :sup:`-1`, one row per energy and one column per temperature.
+
+    """
+    e_energy = np.asarray(e_energy, dtype=np.float64)[:, np.newaxis]
+    Te = np.atleast_1d(np.asarray(Te, dtype=np.float64))[np.newaxis, :]
+    return 2.0*np.sqrt(e_energy/np.pi)*np.power(Te, -1.5)*np.exp(-e_energy/Te)
+
+
+def trapezoid_weights(e_energy):
+    """Return the weights ``w`` for which ``w @ y`` is the trapezoidal
+    integral of ``y`` over ``e_energy``."""
+    width = np.diff(np.asarray(e_energy, dtype=np.float64))
+    weights = np.zeros(len(width) + 1)
+    weights[:-1] += width/2.0
+    weights[1:] += width/2.0
+    return weights
+
+
+def rate_grid(cs_list, size=RATE_GRID_SIZE):
+    """Return the default energy grid, in eV, of :class:`.RateKernel`: 0, the
+    energies of ``cs_list``, and ``size`` log-spaced energies from
+    ``RATE_GRID_MIN`` to the largest of them."""
+    e_cs = CommonGrid(cs_list).e
+    e_max = max(e_cs[-1] if len(e_cs) else 0.0, RATE_GRID_MIN)
+    return np.unique(np.concatenate([[0.0], np.geomspace(RATE_GRID_MIN, e_max, size),
+                                     e_cs[e_cs >= 0.0]]))
+
+
+class RateKernel:
+    """Rate coefficients of several cross sections as a matrix product.
+
+    The rate coefficient of a cross section in an electron energy
+    distribution function :math:`f(\\epsilon)` is
+
+    .. math:: k = \\int_0^\\infty \\sigma(\\epsilon) v(\\epsilon) f(\\epsilon) d\\epsilon,
+        \\quad v = \\sqrt{2 e \\epsilon / m_e}.
+
+    The kernel holds :math:`\\sigma v` of every cross section on a shared
+    energy grid, times the trapezoidal quadrature weights of the grid, so
+    that the rate coefficients of any number of distributions tabulated on
+    the grid are one matrix product.
+
+    Parameters
+    ----------
+    cs_list : list of :class:`.CS`
+    grid : array_like, optional
+        Increasing electron energies in eV; by default :func:`rate_grid`.
+        Cross sections are 0 outside their tabulated energies (see
+        :func:`interpolate`).
+
+    Attributes
+    ----------
+    e : numpy.ndarray of float64
+        The energy grid, in eV.
+    matrix : numpy.ndarray of float64
+        Shape ``(len(cs_list), len(e))``, in :math:`m^3/s` per eV.
+
+    """
+    def __init__(self, cs_list, grid=None):
+        self.e = rate_grid(cs_list) if grid is None else np.asarray(grid, dtype=np.float64)
+        speed = np.sqrt(2.0*ELECTRON_CHARGE*np.clip(self.e, 0.0, None)/ELECTRON_MASS)
+        self.matrix = interpolate(cs_list, self.e)
+        self.matrix *= trapezoid_weights(self.e)*speed
+
+    def rates(self, eedf):
+        """Return the rate coefficients, in :math:`m^3/s`, in the distributions
+        ``eedf`` (in eV\\ :sup:`-1`, normalized to 1, with one row per grid
+        energy), one row per cross section and one column per distribution."""
+        return self.matrix @ np.asarray(eedf, dtype=np.float64)
+
+    def maxwellian_rates(self, Te, chunk_size=INTERP_CHUNK_SIZE):
+        """Return the rate coefficients, in :math:`m^3/s`, in Maxwellian
+        distributions with temperatures ``Te`` (in eV), computing about
+        ``chunk_size`` distribution values at a time."""
+        Te = np.atleast_1d(np.asarray(Te, dtype=np.float64))
+        result = np.empty((len(self.matrix), len(Te)))
+        columns = max(1, chunk_size // max(len(self.e), 1))
+        for start in range(0, len(Te), columns):
+            result[:, start:start + columns] = self.rates(maxwellian(self.e, Te[start:start + columns]))
+        return result
 
 
 class CS:
@@ -285,7 +884,7 @@ class CS:
     from a NEPC MySQL database.
     Parameters
     ----------
-    cursor : cursor.MySQLCursor
+    cursor : cursor.MySQLCursor or :class:`.Backend`
         A MySQLCursor object. See return value ``cursor`` of :func:`.connect`.
     cs_id : int
         i.d. of the cross section in `cs` and `csdata` tables
@@ -352,13 +951,73 @@ class CS:
         j_on_rhs : int
             rotational energy level on rhs? (0 or 1)
     data : dict
-        e : list of float
+        e : numpy.ndarray of float64
             Electron energies in units of ``units_e`` eV (see :attr:`.CS.metadata`).
-        sigma : list of float
+        sigma : numpy.ndarray of float64
             Cross sections in units of ``units_sigma`` :math:`m^2` (see :attr:`.CS.metadata`).
     """
     def __init__(self, cursor, cs_id):
-        metadata = cs_metadata(cursor, cs_id)
+        cs = load_cs(cursor, [cs_id])[0]
+        self._initialize(list(cs.metadata.values()), cs.data['e'], cs.data['sigma'])
+
+    @classmethod
+    def from_query(cls, metadata, e_energy, sigma):
+        """Build a :class:`.CS` from data that has already been queried.
+
+        Parameters
+        ----------
+        metadata : list
+            See return value of :func:`.cs_metadata`.
+        e_energy : numpy.ndarray of float64
+            Electron energies (see :func:`.cs_e_sigma`).
+        sigma : numpy.ndarray of float64
+            Cross sections (see :func:`.cs_e_sigma`).
+
+        Returns
+        -------
+        :class:`.CS`
+
+        """
+        cs = cls.__new__(cls)
+        cs._initialize(metadata, e_energy, sigma)
+        return cs
+
+    @classmethod
+    def from_metadata(cls, metadata, loader):
+        """Build a :class:`.CS` whose :attr:`.CS.data` is fetched by ``loader``
+        on first access.
+
+        Parameters
+        ----------
+        metadata : list
+            See return value of :func:`.cs_metadata`.
+        loader : :class:`.LazyData`
+
+        Returns
+        -------
+        :class:`.CS`
+
+        """
+        cs = cls.__new__(cls)
+        cs._initialize(metadata, None, None)
+        cs._data = None
+        cs._loader = loader
+        return cs
+
+    @property
+    def data(self):
+        """See Attributes; fetched on first access if the cross section was
+        loaded with ``lazy=True``."""
+        if self._loader is not None:
+            self._loader.load(self)
+        return self._data
+
+    @data.setter
+    def data(self, data):
+        self._data = data
+        self._loader = None
+
+    def _initialize(self, metadata, e_energy, sigma):
         self.metadata = {"cs_id": metadata[0],
                          "process": metadata[1],
                          "units_e": metadata[2],
@@ -390,7 +1049,6 @@ class CS:
                          "j_on_lhs": metadata[28],
                          "j_on_rhs": metadata[29]}
 
-        e_energy, sigma = cs_e_sigma(cursor, cs_id)
         self.data = {"e": e_energy,
                      "sigma": sigma}
 
@@ -576,8 +1234,8 @@ class CS:
         reaction = self.reaction_latex
         label_items = [self.metadata['process'], ": ", reaction]
         label_text = " ".join(item for item in label_items if item)
-        e_np = np.array(self.data['e'])
-        sigma_np = np.array(self.data['sigma'])
+        e_np = np.asarray(self.data['e'])
+        sigma_np = np.asarray(self.data['sigma'])
 
         upu = self.metadata['upu']
         lpu = self.metadata['lpu']
@@ -624,7 +1282,7 @@ class CustomCS(CS):
 
     Parameters
     ----------
-    cursor : cursor.MySQLCursor
+    cursor : cursor.MySQLCursor or :class:`.Backend`
         A MySQLCursor object. See return value ``cursor`` of :func:`.connect`.
     cs_id : int
         i.d. of the cross section in `cs` and `csdata` tables
@@ -639,9 +1297,9 @@ class CustomCS(CS):
         see Attributes of :class:`.CS`
 
     data : dict
-        e : list[float]
+        e : array_like of float
             electron energy
-        sigma : list[float]
+        sigma : array_like of float
             cross section
 
     """
@@ -668,27 +1326,74 @@ class Model:
 
     Parameters
     ----------
-    cursor : cursor.MySQLCursor
+    cursor : cursor.MySQLCursor or :class:`.Backend`
         A MySQLCursor object. See return value ``cursor`` of :func:`.connect`.
     model_name :str
         Name of a NEPC model (pre-defined collection of cross sections)
+    disk_cache : :class:`.DiskCache`, optional
+        Load the model from this cache if the database has not changed since
+        it was stored, and store it otherwise.
+    lazy : bool, optional
+        Fetch only the metadata of the cross sections, and each
+        :attr:`.CS.data` on first access (see :func:`.load_cs`). Ignored
+        with ``disk_cache``.
+    window : :class:`.Window`, optional
+        Only load the points of each cross section in an energy window,
+        optionally decimated (see :func:`.load_cs`). With ``disk_cache``, the
+        whole model is cached and the window is applied in memory.
 
     Attributes
     ----------
     cs: list[:class:`.CS`]
         cross section data in the NEPC format (:class:`.CS`)
-    unique: list[float]
+    unique: numpy.ndarray of float64
         set with :attr:`.Model.set_unique`, all unique electron energies in all :attr:`.CS.data`
-        of the :class:`.Model`
+        of the :class:`.Model`, sorted
 
     """
-    def __init__(self, cursor, model_name):
-        _cs_list = []
-        _cs_id_list = model_cs_id_list(cursor, model_name)
-        for cs_id in _cs_id_list:
-            _cs_list.append(CS(cursor, cs_id))
+    def __init__(self, cursor, model_name, disk_cache=None, lazy=False, window=None):
+        backend = as_backend(cursor)
+        database = fingerprint = None
+        if disk_cache is not None:
+            database = backend.database_key()
+            fingerprint = backend.fingerprint()
+        if fingerprint is None:
+            self.cs = load_cs(backend, model_cs_id_list(backend, model_name), lazy=lazy,
+                              window=window)
+            return
+
+        cached = disk_cache.load(database, fingerprint, model_name)
+        if cached is None:
+            self.cs = load_cs(backend, model_cs_id_list(backend, model_name))
+            disk_cache.save(database, fingerprint, model_name, self.cs)
+        else:
+            self.cs = []
+            for metadata, e_energy, sigma in cached:
+                cs = CS_CACHE.get(database, metadata[0])
+                if cs is None:
+                    cs = CS_CACHE.put(database, CS.from_query(metadata, e_energy, sigma))
+                self.cs.append(cs)
+        if window is not None:
+            self.cs = [CS.from_query(list(cs.metadata.values()),
+                                     *window.apply(cs.data['e'], cs.data['sigma']))
+                       for cs in self.cs]
+
+    @classmethod
+    def from_cs(cls, cs_list):
+        """Build a :class:`.Model` from cross sections that have already been loaded.
 
-        self.cs = _cs_list
+        Parameters
+        ----------
+        cs_list : list of :class:`.CS`
+
+        Returns
+        -------
+        :class:`.Model`
+
+        """
+        model = cls.__new__(cls)
+        model.cs = list(cs_list)
+        return model
 
     def __len__(self):
         """number of cross sections in the model"""
@@ -700,7 +1405,9 @@ class Model:
         Parameters
         ----------
         metadata: dict
-            see :attr:`.CS.metadata`
+            Filter on :attr:`.CS.metadata`, including keys added to a
+            :class:`.CustomCS`; values may also be sets of allowed values or
+            :class:`.Between` ranges (see :mod:`.filters`).
 
         Returns
         -------
@@ -710,17 +1417,75 @@ class Model:
         """
         if metadata is None or not isinstance(metadata, dict):
             raise Exception("must provide metadata of type dict")
-        cs_subset = []
-        for cs in self.cs:
-            passed_filter = True
-            for key in metadata.keys():
-                if cs.metadata[key] != metadata[key]:
-                    passed_filter = False
-            if passed_filter:
-                cs_subset.append(cs)
+        cs_subset = [cs for cs in self.cs if metadata_matches(cs.metadata, metadata)]
+        LazyData.regroup(cs_subset)
         return cs_subset
 
 
+    def packed(self):
+        """Return the data of the cross sections in the model as one array each.
+
+        Returns
+        -------
+        e_energy, sigma : numpy.ndarray of float64
+            ``e`` and ``sigma`` of every cross section, concatenated.
+        offsets : numpy.ndarray of int64
+            The data of ``cs[i]`` is ``e_energy[offsets[i]:offsets[i + 1]]``.
+
+        """
+        return pack(self.cs)
+
+    def summary_df(self, metadata=None, sort=[]):
+        """Return the statistics shown by :meth:`summary` as a plain DataFrame.
+
+        The statistics of all cross sections are computed at once with
+        segment reductions over :meth:`packed`.
+
+        Parameters
+        ----------
+        metadata: dict
+            see :attr:`.CS.metadata`
+        sort : list[str]
+            headers by which the DataFrame is sorted
+
+        Returns
+        -------
+        cs_df : DataFrame
+            See :meth:`summary`.
+
+        """
+        cs_list = self.cs if metadata is None else self.subset(metadata=metadata)
+        e_energy, sigma, offsets = pack(cs_list)
+        lengths = np.diff(offsets)
+
+        sigma_max = segment_reduce(np.maximum, sigma, offsets)
+        # the first point of each cross section at its maximum sigma
+        is_peak = sigma == np.repeat(sigma_max, lengths)
+        peak = segment_reduce(np.minimum, np.where(is_peak, np.arange(len(sigma)), len(sigma)),
+                              offsets, empty=len(sigma))
+        e_peak = np.append(e_energy, np.nan)[peak]
+        # np.fmax skips the NaN's of points with zero sigma
+        e_upper = segment_reduce(np.fmax, np.where(sigma != 0.0, e_energy, np.nan), offsets)
+
+        units_e = np.array([cs.metadata["units_e"] for cs in cs_list], dtype=np.float64)
+        units_sigma = np.array([cs.metadata["units_sigma"] for cs in cs_list], dtype=np.float64)
+        threshold = np.array([cs.metadata["threshold"] for cs in cs_list], dtype=np.float64)
+        cs_df = DataFrame({"cs_id": [cs.metadata["cs_id"] for cs in cs_list],
+                           "lhsA": [cs.metadata["lhsA"] for cs in cs_list],
+                           "rhsA": [cs.metadata["rhsA"] for cs in cs_list],
+                           "process": [cs.metadata["process"] for cs in cs_list],
+                           "reaction": [cs.reaction_latex for cs in cs_list],
+                           "threshold": units_e*threshold,
+                           "E_peak": units_e*e_peak,
+                           "E_upper": units_e*e_upper,
+                           "sigma_max": units_sigma*sigma_max,
+                           "lpu": [cs.metadata["lpu"] for cs in cs_list],
+                           "upu": [cs.metadata["upu"] for cs in cs_list]})
+        if sort:
+            cs_df = (cs_df.sort_values(by=sort)
+                     .reset_index(drop=True))
+        return cs_df
+
     def summary(self, metadata=None, lower=None, upper=None, sort=[]):
         """Summarize the NEPC model.
 
@@ -752,67 +1517,16 @@ class Model:
             range of electron energies (E_lower, E_upper),
             maximum sigma (sigma_max), and
             lpu/upu's for each cross section in the model (or subset of the
-            model if :obj:`metadata` is provided)
+            model if :obj:`metadata` is provided); see :meth:`summary_df`
+            for the DataFrame without styling
 
         """
-        summary_list = []
-
-        headers = ["cs_id", "lhsA", "rhsA", "process",
-                   "reaction", "threshold", "E_peak", "E_upper",
-                   "sigma_max", "lpu", "upu"]
-
-        max_e_peak = 0
-        min_e_peak = 100000
-        max_e_upper = 0
-        max_peak_sigma = 0
-        min_peak_sigma = 1
-        max_lpu = 0.000000001
-        max_upu = 0.000000001
-
+        cs_df = self.summary_df(metadata=metadata, sort=sort)
         print('Number of cross sections in model: {:d}'.format(len(self.cs)))
         if metadata is not None:
-            cs_subset = self.subset(metadata=metadata)
             print('Number of cross sections with '
-                  'matching metadata: {:d}'.format(len(cs_subset)))
-        else:
-            cs_subset = self.cs
-
-
-        for cs in cs_subset:
-            csdata = np.array(list(zip(cs.data['e'], cs.data['sigma'])))
-            e_peak = csdata[np.argmax(csdata[:, 1]), 0]
-            cs_peak_sigma = np.max(csdata[:, 1])
-            e_upper = np.max(csdata[csdata[:, 1] != 0.0][:, 0])
-            if e_peak > max_e_peak:
-                max_e_peak = e_peak
-            if e_peak < min_e_peak:
-                min_e_peak = e_peak
-            if e_upper > max_e_upper:
-                max_e_upper = e_upper
-            if cs_peak_sigma > max_peak_sigma:
-                max_peak_sigma = cs_peak_sigma
-            if cs_peak_sigma < min_peak_sigma:
-                min_peak_sigma = cs_peak_sigma
-            reaction = cs.reaction_latex
-            cs_lpu = cs.metadata["lpu"]
-            cs_upu = cs.metadata["upu"]
-            if cs_lpu is not None and cs_lpu > max_lpu:
-                max_lpu = cs_lpu
-            if cs_upu is not None and cs_upu > max_upu:
-                max_upu = cs_upu
-            summary_list.append([cs.metadata["cs_id"],
-                                 cs.metadata["lhsA"], cs.metadata["rhsA"],
-                                 cs.metadata["process"], reaction,
-                                 cs.metadata["units_e"]*cs.metadata["threshold"],
-                                 cs.metadata["units_e"]*e_peak,
-                                 cs.metadata["units_e"]*e_upper,
-                                 cs.metadata["units_sigma"]*cs_peak_sigma,
-                                 cs_lpu, cs_upu])
-
-        cs_df = DataFrame(summary_list, columns=headers)
-        if sort:
-            cs_df = (cs_df.sort_values(by=sort)
-                     .reset_index(drop=True))
+                  'matching metadata: {:d}'.format(len(cs_df)))
+
         if upper is None:
             upper = len(cs_df)
         if lower is None:
@@ -829,12 +1543,102 @@ class Model:
         """sets :attr:`.Model.unique`
 
         """
-        for cs, i in zip(self.cs, range(len(self.cs))):
-            if i == 0:
-                _unique = np.asarray(cs.data['e'])
-            else:
-                _unique = np.unique(np.concatenate([_unique, np.asarray(cs.data['e'])]))
-        self.unique = list(_unique)
+        self.unique = np.unique(pack(self.cs)[0])
+
+    def common_grid(self):
+        """Return the :class:`.CommonGrid` of the cross sections in the model."""
+        return CommonGrid(self.cs)
+
+    def interpolate(self, grid, method='linear', fill=0.0, dtype=np.float64,
+                    chunk_size=INTERP_CHUNK_SIZE):
+        """Interpolate every cross section in the model onto ``grid``.
+
+        Parameters
+        ----------
+        grid : array_like or :class:`.CommonGrid`
+            Increasing electron energies in eV.
+        method, fill, dtype, chunk_size
+            See :func:`interpolate`.
+
+        Returns
+        -------
+        numpy.ndarray
+            Matrix of shape ``(len(cs), len(grid))`` of cross sections in
+            :math:`m^2`; row ``i`` is ``cs[i]``.
+
+        Examples
+        --------
+        >>> sigma = fict.interpolate(np.logspace(-1, 3, 400), method='loglog')
+
+        """
+        return interpolate(self.cs, grid, method, fill, dtype, chunk_size)
+
+    def rate_kernel(self, grid=None):
+        """Return the :class:`.RateKernel` of the cross sections in the model.
+
+        The kernel of the last grid is kept, so repeated calls with the same
+        grid and the same cross sections in :attr:`cs` reuse the interpolated
+        cross sections and quadrature weights.
+
+        Parameters
+        ----------
+        grid : array_like, optional
+            See :class:`.RateKernel`.
+
+        Returns
+        -------
+        :class:`.RateKernel`
+
+        """
+        cached = getattr(self, '_rate_kernel', None)
+        # compare the members, so that changing self.cs in place drops the kernel
+        if (cached is not None and len(cached[0]) == len(self.cs) and
+                all(cs is cached_cs for cs, cached_cs in zip(self.cs, cached[0]))):
+            if grid is None and cached[1] is None:
+                return cached[2]
+            if grid is not None and np.array_equal(cached[2].e, grid):
+                return cached[2]
+        kernel = RateKernel(self.cs, grid)
+        self._rate_kernel = (tuple(self.cs), None if grid is None else kernel.e, kernel)
+        return kernel
+
+    def rate_coefficients(self, Te=None, eedf=None, grid=None, chunk_size=INTERP_CHUNK_SIZE):
+        """Return the rate coefficients of the cross sections in the model.
+
+        Provide either electron temperatures ``Te`` for Maxwellian
+        distributions or tabulated distributions ``eedf``.
+
+        Parameters
+        ----------
+        Te : array_like, optional
+            Electron temperatures in eV.
+        eedf : tuple of array_like, optional
+            ``(e, f)``: increasing electron energies in eV, and distribution
+            functions in eV\\ :sup:`-1` normalized to 1, of shape
+            ``(len(e), n)``. The cross sections are interpolated onto ``e``.
+        grid : array_like, optional
+            Energy grid of the Maxwellian distributions (see :class:`.RateKernel`).
+        chunk_size : int, optional
+            See :meth:`.RateKernel.maxwellian_rates`.
+
+        Returns
+        -------
+        numpy.ndarray of float64
+            Rate coefficients in :math:`m^3/s`, of shape ``(len(cs), len(Te))``
+            or ``(len(cs), n)``; row ``i`` is ``cs[i]``.
+
+        Examples
+        --------
+        >>> k = fict.rate_coefficients(Te=np.linspace(0.5, 10.0, 1000))
+
+        """
+        if (Te is None) == (eedf is None):
+            raise ValueError('must provide exactly one of Te and eedf')
+        if eedf is not None:
+            e_energy, f = eedf
+            f = np.asarray(f, dtype=np.float64)
+            return self.rate_kernel(e_energy).rates(f.reshape(len(f), -1))
+        return self.rate_kernel(grid).maxwellian_rates(Te, chunk_size)
 
 
     def plot(self,
@@ -903,8 +1707,8 @@ class Model:
 
                 label_items = [self.cs[i].metadata['process'], ": ", self.cs[i].reaction_latex]
                 label_text = " ".join(item for item in label_items if item)
-                e_np = np.array(self.cs[i].data['e'])
-                sigma_np = np.array(self.cs[i].data['sigma'])
+                e_np = np.asarray(self.cs[i].data['e'])
+                sigma_np = np.asarray(self.cs[i].data['sigma'])
 
                 upu = self.cs[i].metadata['upu']
                 lpu = self.cs[i].metadata['lpu']
@@ -955,7 +1759,7 @@ class CustomModel(Model):
 
     Parameters
     ----------
-    cursor : cursor.MySQLCursor
+    cursor : cursor.MySQLCursor or :class:`.Backend`
         A MySQLCursor object. See return value ``cursor`` of :func:`.connect`.
     model_name :str
         The name of a NEPC model (see [nepc.wiki]/models
@@ -964,7 +1768,14 @@ class CustomModel(Model):
     cs_list : list of CustomCS
         List of user-defined cross sections of CustomCS type.
     metadata: dict
-        Dictionary of filter criteria to select specific CS's from a Model.
+        Dictionary of filter criteria to select specific CS's from a Model
+        (see :mod:`.filters`). Only the matching cross sections are fetched.
+    lazy : bool, optional
+        Fetch only the metadata of the cross sections from the NEPC database,
+        and each :attr:`.CS.data` on first access (see :func:`.load_cs`).
+    window : :class:`.Window`, optional
+        Only load the points of each cross section from the NEPC database in
+        an energy window, optionally decimated (see :func:`.load_cs`).
 
     Attributes
     ----------
@@ -972,7 +1783,8 @@ class CustomModel(Model):
         A list of cross section data and metadata of CS or CustomCS type.
 
     """
-    def __init__(self, cursor=None, model_name=None, cs_id_list=[], cs_list=[], metadata=None):
+    def __init__(self, cursor=None, model_name=None, cs_id_list=[], cs_list=[], metadata=None,
+                 lazy=False, window=None):
         if model_name is None and not cs_id_list and not cs_list:
             raise ValueError('Must provide at least one of model_name, cs_id_list, or cs_list')
 
@@ -991,57 +1803,303 @@ class CustomModel(Model):
             _cs_list = []
 
         if cs_id_list:
-            _cs_id_list = cs_id_list.copy()
-            for cs_id in _cs_id_list:
-                _cs_list.append(CS(cursor, cs_id))
+            _cs_list.extend(load_cs(cursor, cs_id_list, lazy=lazy, window=window))
 
         if model_name is not None:
-            _model_cs_id_list = model_cs_id_list(cursor, model_name)
-            for cs_id in _model_cs_id_list:
-                cs = CS(cursor, cs_id)
-                if metadata is not None:
-                    passed_filter = True
-                    for key in metadata.keys():
-                        if cs.metadata[key] != metadata[key]:
-                            passed_filter = False
-                if metadata is None or passed_filter:
-                    _cs_list.append(cs)
+            _cs_list.extend(load_cs(cursor, model_cs_id_list(cursor, model_name, metadata),
+                                    lazy=lazy, window=window))
 
         self.cs = _cs_list.copy()
+        LazyData.regroup(self.cs)
+
+
+def _constant_rate(constants, T):
+    return np.repeat(constants[:, 0:1], len(T), axis=1)
+
+
+def _arrhenius_rate(constants, T):
+    return constants[:, 0:1]*np.exp(-constants[:, 1:2]/T)
+
+
+def _modified_arrhenius_rate(constants, T):
+    return constants[:, 0:1]*np.power(T, constants[:, 1:2])*np.exp(-constants[:, 2:3]/T)
+
+
+RATE_FORMS = {"constant": (1, _constant_rate),
+              "arrhenius": (2, _arrhenius_rate),
+              "modified_arrhenius": (3, _modified_arrhenius_rate)}
+"""Number of constants and evaluator of each ``form`` of :class:`.Rate`. With
+the constants :math:`c_1, c_2, \\dots` in the order of ``num``:
+
+ - ``constant``: :math:`k = c_1`
+ - ``arrhenius``: :math:`k = c_1 e^{-c_2/T}`
+ - ``modified_arrhenius``: :math:`k = c_1 T^{c_2} e^{-c_3/T}`
+"""
+
+
+def rate_form(form):
+    """Return the key of :data:`RATE_FORMS` for a ``form`` as stored in the
+    ``rate`` table (case, spaces, and hyphens are ignored)."""
+    return re.sub(r"[\s-]+", "_", str(form).strip().lower())
+
+
+def evaluate_rates(forms, constants, T):
+    """Evaluate rates of several forms over an array of temperatures.
+
+    The rates of each form are evaluated together, so the number of array
+    operations does not grow with the number of rates.
+
+    Parameters
+    ----------
+    forms : list of str
+        ``form`` of each rate (see :data:`RATE_FORMS`).
+    constants : numpy.ndarray of float64
+        One row of constants per rate, in the order of ``num``, padded with
+        NaN.
+    T : array_like
+        Temperatures, in the units for which the constants were tabulated.
+
+    Returns
+    -------
+    numpy.ndarray of float64
+        Rates of shape ``(len(forms), len(T))``.
+
+    """
+    T = np.atleast_1d(np.asarray(T, dtype=np.float64))
+    forms = np.array([rate_form(form) for form in forms], dtype=object)
+    unknown = set(forms) - set(RATE_FORMS)
+    if unknown:
+        raise ValueError(f'unknown rate form(s) {sorted(unknown)}; '
+                         f'must be one of {list(RATE_FORMS)}')
+    constants = np.asarray(constants, dtype=np.float64)
+    if constants.ndim == 1:
+        constants = constants[np.newaxis, :]
+    result = np.empty((len(forms), len(T)))
+    for form, (n_constants, function) in RATE_FORMS.items():
+        rows = np.flatnonzero(forms == form)
+        if not len(rows):
+            continue
+        form_constants = constants[rows, :n_constants]
+        if form_constants.shape[1] < n_constants or np.isnan(form_constants).any():
+            raise ValueError(f'rates of form {form} need {n_constants} constants')
+        result[rows] = function(form_constants, T)
+    return result
+
+
+class Rate:
+    """A rate coefficient, including metadata and the constants of its
+    functional form, from a NEPC database.
+
+    Parameters
+    ----------
+    cursor : cursor.MySQLCursor or :class:`.Backend`
+        A MySQLCursor object. See return value ``cursor`` of :func:`.connect`.
+    rate_id : int
+        i.d. of the rate in `rate` and `ratedata` tables
+
+    Attributes
+    ----------
+    metadata : dict
+        rate_id : int
+            id of the rate in `rate` and `ratedata` tables
+        process : str
+            `name` of process from `processes` table
+        ref : str
+            `ref` from `rate` table
+        lhsA, lhsB, rhsA, rhsB : str
+            `name` of the states from `states` table
+        threshold : float
+            threshold energy
+        wavelength : float
+            wavelength of photon involved in process in nanometers (nm)
+        lhs_v, rhs_v, lhs_j, rhs_j : int
+            vibrational and rotational energy levels of lhsA and rhsA
+        background : str
+            background text describing origin of data and other important info
+        form : str
+            functional form of the rate (see :data:`RATE_FORMS`)
+    data : dict
+        num : numpy.ndarray of int64
+            number of each constant in the form
+        constant : numpy.ndarray of float64
+            constants, ordered by num
+        lau : numpy.ndarray of float64
+            lower absolute uncertainty of each constant
+        uau : numpy.ndarray of float64
+            upper absolute uncertainty of each constant
+
+    """
+    def __init__(self, cursor, rate_id):
+        rate = load_rates(cursor, [rate_id])[0]
+        self.metadata = rate.metadata
+        self.data = rate.data
+
+    @classmethod
+    def from_query(cls, metadata, num, constant, lau, uau):
+        """Build a :class:`.Rate` from data that has already been queried.
+
+        Parameters
+        ----------
+        metadata : list
+            See return value of :func:`.rate_metadata_list`.
+        num, constant, lau, uau : numpy.ndarray
+            See return value of :func:`.ratedata_list`.
+
+        Returns
+        -------
+        :class:`.Rate`
+
+        """
+        rate = cls.__new__(cls)
+        rate.metadata = dict(zip(RATE_METADATA_COLUMNS, metadata))
+        rate.data = {"num": num, "constant": constant, "lau": lau, "uau": uau}
+        return rate
+
+    def __len__(self):
+        """number of constants of the rate"""
+        return len(self.data['constant'])
+
+    def evaluate(self, T):
+        """Return the rate at the temperatures ``T`` (see :func:`evaluate_rates`)."""
+        return evaluate_rates([self.metadata['form']], self.data['constant'], T)[0]
+
+
+class RateModel:
+    """The rates of a NEPC model, loaded in bulk.
+
+    Parameters
+    ----------
+    cursor : cursor.MySQLCursor or :class:`.Backend`
+        A MySQLCursor object. See return value ``cursor`` of :func:`.connect`.
+    model_name : str
+        Name of a NEPC model
+
+    Attributes
+    ----------
+    rates : list of :class:`.Rate`
 
+    Examples
+    --------
+    >>> rates = nepc.RateModel(cursor, "fict")
+    >>> k = rates.evaluate(np.linspace(300.0, 3000.0, 1000))
+
+    """
+    def __init__(self, cursor, model_name):
+        self.rates = load_rates(cursor, model_rate_id_list(cursor, model_name))
+
+    @classmethod
+    def from_rates(cls, rate_list):
+        """Build a :class:`.RateModel` from rates that have already been loaded."""
+        model = cls.__new__(cls)
+        model.rates = list(rate_list)
+        return model
+
+    def __len__(self):
+        """number of rates in the model"""
+        return len(self.rates)
+
+    def constants(self):
+        """Return the constants of every rate as one array, a row per rate padded with NaN."""
+        cached = getattr(self, '_constants', None)
+        if cached is not None and cached[0] is self.rates:
+            return cached[1]
+        width = max([len(rate) for rate in self.rates] + [0])
+        constants = np.full((len(self.rates), width), np.nan)
+        for i, rate in enumerate(self.rates):
+            constants[i, :len(rate)] = rate.data['constant']
+        self._constants = (self.rates, constants)
+        return constants
+
+    def evaluate(self, T):
+        """Return the rates at the temperatures ``T``, of shape
+        ``(len(rates), len(T))`` (see :func:`evaluate_rates`)."""
+        return evaluate_rates([rate.metadata['form'] for rate in self.rates],
+                              self.constants(), T)
+
+
+def load_models(session, names, max_workers=None, batch_size=CS_BATCH_SIZE):
+    """Load several models concurrently.
+
+    The ``cs_id``'s of the models are queried first; the cross sections are
+    then loaded in chunks spread over ``max_workers`` threads, each cross
+    section once even if several models contain it. Models share the
+    :class:`.CS` instances of their common cross sections.
 
-def table_as_df(cursor, table, columns="*"):
+    Parameters
+    ----------
+    session : :class:`.PooledMySQLBackend`, :class:`.Backend`, or cursor.MySQLCursor
+        See :func:`.connect_pool`. Only a pooled session is queried from
+        several threads; other backends and cursors load the models one
+        query at a time.
+    names : list of str
+        Names of models in the NEPC database.
+    max_workers : int, optional
+        Number of threads; by default, the number of connections in the pool.
+    batch_size : int, optional
+        Maximum number of ``cs_id``'s per query (default :data:`.CS_BATCH_SIZE`).
+
+    Returns
+    -------
+    dict
+        Maps each name in ``names`` to its :class:`.Model`.
+
+    """
+    backend = as_backend(session)
+    if not isinstance(backend, PooledMySQLBackend):
+        max_workers = 1
+    elif max_workers is None:
+        max_workers = backend.pool_size
+    names = list(dict.fromkeys(names))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        cs_id_lists = dict(zip(names, executor.map(
+            lambda name: model_cs_id_list(backend, name), names)))
+        unique_cs_ids = list(dict.fromkeys(cs_id for cs_id_list in cs_id_lists.values()
+                                           for cs_id in cs_id_list))
+        # at least one chunk per thread, and no chunk larger than a batch
+        chunk_size = max(1, min(batch_size, -(-len(unique_cs_ids) // max_workers)))
+        chunks = [unique_cs_ids[i:i + chunk_size]
+                  for i in range(0, len(unique_cs_ids), chunk_size)]
+        loaded = {}
+        for chunk, cs_list in zip(chunks, executor.map(
+                lambda chunk: load_cs(backend, chunk, batch_size), chunks)):
+            loaded.update(zip(chunk, cs_list))
+    return {name: Model.from_cs([loaded[cs_id] for cs_id in cs_id_list])
+            for name, cs_id_list in cs_id_lists.items()}
+
+
+def table_as_df(cursor, table, columns="*", chunksize=None):
     """Return a ``table`` in a MySQL database as a pandas DataFrame.
 
+    Rows are streamed from the server and numeric columns are read straight
+    into NumPy arrays, so only a chunk of rows is held as Python objects at a
+    time.
+
     Parameters
     ----------
-    cursor : cursor.MySQLCursor
+    cursor : cursor.MySQLCursor or :class:`.Backend`
         A MySQLCursor object. See return value ``cursor`` of :func:`.connect`.
     table : str
         Name of a table in the NEPC database at ``cursor``.
     columns : list of str, optional
         Which columns to get. (Default is to get all columns.)
+    chunksize : int, optional
+        Return an iterator of DataFrames of at most ``chunksize`` rows instead,
+        so that memory use is bounded by the chunk size. The connection of
+        ``cursor`` cannot run other queries until the iterator is exhausted
+        or closed.
 
     Returns
     -------
-    DataFrame
+    DataFrame or iterator of DataFrame
         Table in the form of a pandas DataFrame
 
-    """
-    if columns == "*":
-        cursor.execute("SHOW COLUMNS FROM " + table)
-        mysql_column_info = cursor.fetchall()
-        column_names = []
-        for col in mysql_column_info:
-            column_names.append(col[0])
-    else:
-        column_names = columns
+    Examples
+    --------
+    >>> for chunk in nepc.table_as_df(cursor, "csdata", chunksize=100000):
+    ...     sigma_max = max(sigma_max, chunk["sigma"].max())
 
-    column_text = ", ".join(columns)
-    cursor.execute("SELECT " + column_text + " FROM " + table)
-    df = DataFrame(cursor.fetchall(), columns=column_names)
-    df.columns = column_names
-    return df
+    """
+    return as_backend(cursor).table_as_df(table, columns, chunksize)
 
 def process_attr(process: str, attr_list: List[str], test=False):
     if test:
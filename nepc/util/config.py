@@ -29,3 +29,14 @@ def nepc_cs_home():
 
     """
     return os.environ.get('NEPC_CS_HOME')
+
+
+def cache_home():
+    """Returns the directory of the nepc disk cache: NEPC_CACHE_HOME if set, otherwise
+    ``nepc`` in XDG_CACHE_HOME or ``~/.cache``.
+
+    """
+    if os.environ.get('NEPC_CACHE_HOME'):
+        return os.environ['NEPC_CACHE_HOME']
+    return os.path.join(os.environ.get('XDG_CACHE_HOME') or
+                        os.path.join(os.path.expanduser('~'), '.cache'), 'nepc')
@@ -1,3 +1,4 @@
 import pytest
 from fixtures.mysql import data_config
 from fixtures.mysql import nepc_connect
+from fixtures.mysql import nepc_pool
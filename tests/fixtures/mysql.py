@@ -44,3 +44,18 @@ def nepc_connect(local, dbug, github):
         print("closing database connection")
     cursor.close()
     cnx.close()
+
+
+@pytest.fixture
+def nepc_pool(local, dbug, github):
+    """Opens a pooled session on the nepc_test database
+
+    Returns
+    -------
+    session : PooledMySQLBackend
+        A pool of connections that can be used in place of a cursor
+    """
+    session = nepc.connect_pool(local, dbug, test=True, github=github,
+                                pool_size=2)
+    yield session
+    session.close()
@@ -0,0 +1,98 @@
+"""Tests for nepc/aio"""
+import asyncio
+import threading
+import time
+import numpy as np
+import pytest
+import nepc
+
+
+def test_aio_load(nepc_connect, nepc_pool, data_config):
+    """Verify that concurrent lookups on a pooled session return the same
+    cross sections and models as the blocking interface"""
+    fict = nepc.Model(nepc_connect[1], "fict")
+
+    async def lookups(session):
+        return await asyncio.gather(nepc.aio.Model.load(session, "fict"),
+                                    *[nepc.aio.CS.load(session, cs.metadata['cs_id'])
+                                      for cs in fict.cs])
+
+    session = nepc.aio.Session(nepc_pool)
+    fict_aio, *cs_list = asyncio.run(lookups(session))
+    session.close()
+    assert not nepc_pool.closed
+    assert isinstance(fict_aio, nepc.Model)
+    assert [cs.metadata for cs in fict_aio.cs] == [cs.metadata for cs in fict.cs]
+    for cs, cs_aio in zip(fict.cs, cs_list):
+        assert isinstance(cs_aio, nepc.CS)
+        assert cs_aio.metadata == cs.metadata
+        np.testing.assert_array_equal(cs_aio.data['sigma'], cs.data['sigma'])
+
+    file_backend = nepc.FileBackend(data_config[0])
+    session = nepc.aio.Session(file_backend)
+    metadata = asyncio.run(nepc.aio.cs_metadata(session, 1))
+    session.close()
+    assert metadata == nepc.cs_metadata(file_backend, 1)
+    with pytest.raises(TypeError):
+        asyncio.run(nepc.aio.cs_metadata(file_backend, 1))
+
+
+def test_aio_one_query_at_a_time(data_config):
+    """Verify that gathered lookups on a session over a backend that is not
+    pooled never run more than one query at a time"""
+    in_flight = [0]
+    peak = [0]
+    lock = threading.Lock()
+
+    def counted(query):
+        def run(*args, **kwargs):
+            with lock:
+                in_flight[0] += 1
+                peak[0] = max(peak[0], in_flight[0])
+            try:
+                time.sleep(0.001)
+                return query(*args, **kwargs)
+            finally:
+                with lock:
+                    in_flight[0] -= 1
+        return run
+
+    backend = nepc.FileBackend(data_config[0])
+    # the single cs_id queries of a Backend run the bulk ones
+    for name in ["cs_metadata_list", "cs_e_sigma_list"]:
+        setattr(backend, name, counted(getattr(backend, name)))
+    session = nepc.aio.Session(backend)
+    nepc.CS_CACHE.clear()
+
+    async def lookups():
+        return await asyncio.gather(*[nepc.aio.cs_metadata(session, cs_id)
+                                      for cs_id in range(1, 31)],
+                                    *[nepc.aio.CS.load(session, cs_id)
+                                      for cs_id in range(1, 31)])
+
+    results = asyncio.run(lookups())
+    session.close()
+    assert len(results) == 60
+    assert peak[0] == 1
+
+
+def test_aio_cancel(data_config):
+    """Verify that a cancelled lookup waiting for a worker never runs"""
+    session = nepc.aio.Session(nepc.FileBackend(data_config[0]))
+    release = threading.Event()
+    ran = []
+
+    async def cancel():
+        busy = asyncio.ensure_future(session.run(release.wait))
+        queued = asyncio.ensure_future(session.run(ran.append, True))
+        await asyncio.sleep(0.05)
+        queued.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await queued
+        release.set()
+        await busy
+
+    asyncio.run(cancel())
+    session.close()
+    session.executor.shutdown(wait=True)
+    assert ran == []
@@ -0,0 +1,328 @@
+"""Tests for nepc/backend"""
+import hashlib
+import json
+import os
+import mysql.connector
+import numpy as np
+import pandas as pd
+import pytest
+import nepc
+from nepc.backend import as_backend
+from nepc.backend.files import like
+from nepc.backend.mysql import statement_cache, where_clause
+from nepc.mysql import snapshot as snapshot_command
+from nepc.util import util
+from nepc.util.parser import format_model
+
+
+@pytest.fixture
+def file_backend(data_config):
+    yield nepc.FileBackend(data_config[0])
+
+
+def test_like():
+    """Verify that like matches SQL LIKE patterns case insensitively"""
+    assert like("fict", "fict")
+    assert like("FICT", "fict")
+    assert not like("fict", "fict_min")
+    assert like("fict%", "fict_min")
+    assert like("fict_min_", "fict_min2")
+
+
+def test_as_backend(file_backend):
+    """Verify that as_backend wraps cursors and passes backends through"""
+    cursor = object()
+    assert isinstance(as_backend(cursor), nepc.MySQLBackend)
+    assert as_backend(cursor).cursor is cursor
+    assert as_backend(file_backend) is file_backend
+
+
+def test_file_backend_model(file_backend):
+    """Verify that a Model can be built from the data files"""
+    fict = nepc.Model(file_backend, "fict")
+    assert len(fict) == 30
+    assert [cs.metadata['cs_id'] for cs in fict.cs] == sorted(cs.metadata['cs_id'] for cs in fict.cs)
+    assert len(nepc.Model(file_backend, "fict_min")) == 3
+    fict_subset = nepc.CustomModel(file_backend, model_name="fict",
+                                   metadata={'process': 'excitation'})
+    assert len(fict_subset.cs) == 15
+    fict_subset = nepc.CustomModel(file_backend, model_name="fict",
+                                   metadata={'process': ['excitation', 'ionization'],
+                                             'threshold': nepc.Between(5.0, 10.0)})
+    assert fict_subset.cs
+    assert all(cs.metadata['process'] in ['excitation', 'ionization'] and
+               5.0 <= cs.metadata['threshold'] <= 10.0 for cs in fict_subset.cs)
+
+
+def test_metadata_filter_case(file_backend):
+    """Verify that string conditions of a metadata filter match exactly, also
+    when compiled for MySQL"""
+    assert len(nepc.model_cs_id_list(file_backend, "fict", {'process': 'excitation'})) == 15
+    assert nepc.model_cs_id_list(file_backend, "fict", {'process': 'Excitation'}) == []
+    assert nepc.model_cs_id_list(file_backend, "fict",
+                                 {'process': ['Excitation', 'IONIZATION']}) == []
+    conditions, params = where_clause({'process': 'Excitation', 'threshold': nepc.Between(5.0)})
+    assert conditions == ["CAST(C.`name` AS BINARY) = CAST(%s AS BINARY)", "A.`threshold` >= %s"]
+    assert params == ['Excitation', 5.0]
+
+
+def test_mysql_metadata_filter_case(nepc_connect, file_backend):
+    """Verify that MySQL matches string conditions exactly, like the other backends"""
+    for metadata_filter in [{'process': 'excitation'}, {'process': 'Excitation'},
+                            {'process': {'EXCITATION', 'ionization'}},
+                            {'lhsA': 'n2(x1sigmag+)'}]:
+        assert (nepc.model_cs_id_list(nepc_connect[1], "fict", metadata_filter) ==
+                nepc.model_cs_id_list(file_backend, "fict", metadata_filter))
+    assert nepc.CustomModel(nepc_connect[1], model_name="fict",
+                            metadata={'process': 'Excitation'}).cs == []
+
+
+def test_file_backend_cs(file_backend):
+    """Verify that a CS from the data files has the expected metadata and data"""
+    cs = nepc.CS(file_backend, 1)
+    assert len(cs) == 21
+    assert cs.metadata['process'] == 'excitation'
+    assert cs.metadata['lhsB'] is None
+    assert cs.metadata['ref'] == '\\N'
+    assert isinstance(cs.metadata['cs_id'], int)
+    assert isinstance(cs.metadata['units_e'], float)
+    assert isinstance(cs.metadata['e_on_lhs'], int)
+    assert cs.data['e'].dtype == np.float64
+    assert cs.reaction_text[1] == "E + N2(X1Sigmag+) -> E + N2(X1Sigmag+)_jSCHULZ"
+    with pytest.raises(ValueError):
+        nepc.cs_metadata(file_backend, 1000000)
+
+
+def test_file_backend_format_model(file_backend, tmpdir):
+    """Verify that a Model from the data files formats to the same LXCat file
+    as the Model from the nepc_test database (see test_util_parser.py)"""
+    file = tmpdir.join('lxcat.txt')
+    format_model(nepc.Model(file_backend, "fict"), type='lxcat', filename=str(file))
+    with open(str(file), 'rb') as f:
+        readable_hash = hashlib.md5(f.read()).hexdigest()
+    assert readable_hash == 'b0c0d9564c3f9c722a27c6e5a4d27260'
+
+
+def test_file_backend_tables(data_config, file_backend):
+    """Verify that tables from the data files have the NEPC schema"""
+    NEPC_DATA = data_config[0]
+    states = nepc.table_as_df(file_backend, 'states')
+    assert len(states) == util.wc_fxn(NEPC_DATA + 'states.tsv') - 1
+    assert list(states.columns) == ['id', 'species_id', 'name', 'long_name']
+    processes = nepc.table_as_df(file_backend, 'processes', columns=['id', 'name'])
+    assert list(processes.columns) == ['id', 'name']
+    assert nepc.count_table_rows(file_backend, 'cs') == 30
+    assert nepc.count_table_rows(file_backend, 'rate') == 0
+    with pytest.raises(ValueError):
+        nepc.table_as_df(file_backend, 'not_a_table')
+
+
+@pytest.mark.usefixtures("nepc_connect")
+def test_file_backend_matches_mysql(nepc_connect, file_backend):
+    """Verify that the file backend returns the same metadata and data as
+    the nepc_test database"""
+    cs_id_list = nepc.model_cs_id_list(nepc_connect[1], "fict")
+    assert nepc.model_cs_id_list(file_backend, "fict") == cs_id_list
+    for cs_file, cs_db in zip(nepc.load_cs(file_backend, cs_id_list),
+                              nepc.load_cs(nepc_connect[1], cs_id_list)):
+        assert cs_file.metadata == cs_db.metadata
+        np.testing.assert_array_equal(cs_file.data['e'], cs_db.data['e'])
+        np.testing.assert_array_equal(cs_file.data['sigma'], cs_db.data['sigma'])
+    for table in ['cs', 'csdata', 'models2cs']:
+        assert (nepc.count_table_rows(file_backend, table) ==
+                nepc.count_table_rows(nepc_connect[1], table))
+
+
+def test_snapshot(file_backend, tmpdir):
+    """Verify that a snapshot round trips a NEPC database and that
+    CS.data are read-only views of the memory-mapped arrays"""
+    path = str(tmpdir.join('snapshot'))
+    manifest = nepc.export_snapshot(file_backend, path, batch_size=7)
+    assert manifest['rows']['cs'] == 30
+    assert manifest['rows']['csdata'] == nepc.count_table_rows(file_backend, 'csdata')
+    snapshot = nepc.SnapshotBackend(path)
+    assert snapshot.count_table_rows('csdata') == manifest['rows']['csdata']
+    assert nepc.model_cs_id_list(snapshot, 'fict%') == nepc.model_cs_id_list(file_backend, 'fict%')
+
+    fict_file = nepc.Model(file_backend, 'fict')
+    fict_snapshot = nepc.Model(snapshot, 'fict')
+    assert len(fict_snapshot) == len(fict_file)
+    for cs_snapshot, cs_file in zip(fict_snapshot.cs, fict_file.cs):
+        assert cs_snapshot.metadata == cs_file.metadata
+        np.testing.assert_array_equal(cs_snapshot.data['e'], cs_file.data['e'])
+        np.testing.assert_array_equal(cs_snapshot.data['sigma'], cs_file.data['sigma'])
+        assert np.shares_memory(cs_snapshot.data['e'], snapshot.e)
+        assert not cs_snapshot.data['e'].flags['WRITEABLE']
+
+    pd.testing.assert_frame_equal(nepc.table_as_df(snapshot, 'csdata'),
+                                  nepc.table_as_df(file_backend, 'csdata')
+                                  .sort_values(['cs_id', 'id']).reset_index(drop=True),
+                                  check_dtype=False)
+    assert (list(nepc.table_as_df(snapshot, 'states')['name']) ==
+            list(nepc.table_as_df(file_backend, 'states')['name']))
+    pd.testing.assert_frame_equal(
+        pd.concat(nepc.table_as_df(snapshot, 'csdata', chunksize=100), ignore_index=True),
+        nepc.table_as_df(snapshot, 'csdata'))
+
+
+def test_snapshot_command(data_config, tmpdir):
+    """Verify that the snapshot command exports the data files given with --data"""
+    path = str(tmpdir.join('snapshot'))
+    manifest = snapshot_command.main(['--data', data_config[0], path])
+    assert manifest['rows']['cs'] == 30
+    assert len(nepc.SnapshotBackend(path).model_cs_id_list('fict')) == \
+        len(nepc.FileBackend(data_config[0]).model_cs_id_list('fict'))
+
+
+def test_pooled_backend(nepc_connect, nepc_pool, local, dbug, github):
+    """Verify that a pooled session answers queries like a cursor and is
+    reused by connect_pool"""
+    fict = nepc.Model(nepc_connect[1], "fict")
+    fict_pooled = nepc.Model(nepc_pool, "fict")
+    assert ([cs.metadata for cs in fict_pooled.cs] ==
+            [cs.metadata for cs in fict.cs])
+    assert nepc.count_table_rows(nepc_pool, "cs") == nepc.count_table_rows(nepc_connect[1], "cs")
+    assert nepc_pool.is_healthy()
+    with nepc_pool.connection() as cnx_1, nepc_pool.connection() as cnx_2:
+        assert cnx_1 is not cnx_2
+    assert nepc.connect_pool(local, dbug, test=True, github=github,
+                             pool_size=2) is nepc_pool
+
+
+def test_prepared_statements(nepc_connect):
+    """Verify that queries on a cursor reuse their prepared statements and bind
+    the model name instead of pasting it into the query"""
+    cursor = nepc_connect[1]
+    statements = statement_cache(cursor)
+    statements.close()
+    for cs_id in [1, 2, 3]:
+        nepc.cs_e(cursor, cs_id)
+    assert len(statements) == 1
+    nepc.cs_metadata_list(cursor, [1, 2, 3])
+    nepc.cs_metadata_list(cursor, [4, 5, 6, 7])
+    assert len(statements) == 2
+    assert nepc.model_cs_id_list(cursor, "fict' OR '1'='1") == []
+    with pytest.raises(ValueError):
+        nepc.count_table_rows(cursor, "cs; DROP TABLE cs")
+
+
+def test_pooled_backend_close(local, github):
+    """Verify that closing a pooled session disconnects idle connections at
+    once and checked out connections when they are returned"""
+    session = nepc.PooledMySQLBackend(pool_size=2,
+                                      **nepc.nepc.connection_config(local, True, github))
+    with session.connection() as cnx:
+        session.close()
+        assert cnx.is_connected()
+    with pytest.raises(mysql.connector.errors.PoolError):
+        with session.connection():
+            pass
+    with pytest.raises(mysql.connector.errors.PoolError):
+        session.pool.get_connection()
+
+
+def test_pooled_prepared_statements(nepc_connect, nepc_pool):
+    """Verify that a pooled session prepares each statement once per
+    connection, not once per checkout"""
+    def prepares():
+        nepc_connect[1].execute("SHOW GLOBAL STATUS LIKE 'Com_stmt_prepare'")
+        return int(nepc_connect[1].fetchall()[0][1])
+
+    for cs_id in [1, 2, 3]:
+        nepc.cs_e(nepc_pool, cs_id)
+    start = prepares()
+    for _ in range(3):
+        for cs_id in [1, 2, 3]:
+            nepc.cs_e(nepc_pool, cs_id)
+    assert prepares() == start
+    np.testing.assert_array_equal(nepc.cs_e(nepc_pool, 1), nepc.cs_e(nepc_connect[1], 1))
+
+
+def test_table_name_injection():
+    """Verify that table_as_df and count_table_rows reject table and column
+    names that are not plain identifiers before querying"""
+    class Cursor:
+        def execute(self, operation, params=()):
+            raise AssertionError("queried " + operation)
+
+    cursor = Cursor()
+    with pytest.raises(ValueError):
+        nepc.table_as_df(cursor, "cs; DROP TABLE cs")
+    with pytest.raises(ValueError):
+        nepc.table_as_df(cursor, "cs`; DROP TABLE `cs", chunksize=10)
+    with pytest.raises(ValueError):
+        nepc.table_as_df(cursor, "cs", columns=["cs_id", "1; DROP TABLE cs"])
+    with pytest.raises(ValueError):
+        nepc.count_table_rows(cursor, "cs` WHERE 1; DROP TABLE `cs")
+
+
+def test_load_models(nepc_connect, nepc_pool, file_backend):
+    """Verify that load_models loads the same models as Model, concurrently
+    over a pool, sharing the cross sections that models have in common"""
+    names = ["fict", "fict_min", "fict_min2"]
+    nepc.CS_CACHE.clear()
+    models = nepc.load_models(nepc_pool, names, max_workers=2, batch_size=4)
+    assert list(models) == names
+    for name in names:
+        model = nepc.Model(nepc_connect[1], name)
+        assert ([cs.metadata for cs in models[name].cs] ==
+                [cs.metadata for cs in model.cs])
+    shared = set(map(id, models["fict_min"].cs)) & set(map(id, models["fict_min2"].cs))
+    assert shared
+    assert nepc.CS_CACHE.stats()['misses'] == len(
+        {cs.metadata['cs_id'] for name in names for cs in models[name].cs})
+
+    models = nepc.load_models(file_backend, names)
+    assert len(models["fict"]) == 30
+
+
+def test_rates(nepc_connect, file_backend, tmpdir):
+    """Verify that rates are loaded in bulk with their metadata and constants,
+    and that a RateModel evaluates every form over an array of temperatures"""
+    assert nepc.model_rate_id_list(nepc_connect[1], "fict") == []
+    assert len(nepc.RateModel(nepc_connect[1], "fict")) == 0
+    assert nepc.RateModel(file_backend, "fict").evaluate([300.0, 600.0]).shape == (0, 2)
+
+    path = str(tmpdir.join('snapshot'))
+    nepc.export_snapshot(file_backend, path)
+    tables = {"rate": [[1, 4, "\\N", 1, None, 2, None, 0.0, -1.0, -1, -1, -1, -1,
+                        "constant rate", "constant"],
+                       [2, 4, "\\N", 1, None, 2, None, 1.0, -1.0, -1, -1, -1, -1,
+                        "Arrhenius rate", "Arrhenius"],
+                       [3, 4, "\\N", 1, None, 3, None, 2.0, -1.0, -1, -1, -1, -1,
+                        "modified Arrhenius rate", "modified arrhenius"]],
+              "ratedata": [[1, 1, 1, 2e-16, 0.0, 0.0],
+                           [2, 2, 2, 300.0, 0.0, 0.0],
+                           [3, 2, 1, 1e-15, 0.0, 0.0],
+                           [4, 3, 1, 1e-16, 0.0, 0.0],
+                           [5, 3, 2, 0.5, 0.0, 0.0],
+                           [6, 3, 3, 600.0, 0.0, 0.0]],
+              "models2rate": [[1, 4], [2, 4], [3, 5]]}
+    for table, data in tables.items():
+        with open(os.path.join(path, "tables", table + ".json"), "w") as f:
+            json.dump({"columns": nepc.backend.files.TABLE_COLUMNS[table], "data": data}, f)
+    snapshot = nepc.SnapshotBackend(path)
+
+    assert nepc.model_rate_id_list(snapshot, "fict") == [1, 2]
+    assert nepc.model_rate_id_list(snapshot, "fict%") == [1, 2, 3]
+    rates = nepc.RateModel(snapshot, "fict%")
+    assert [rate.metadata['rate_id'] for rate in rates.rates] == [1, 2, 3]
+    assert rates.rates[1].metadata['process'] == 'excitation'
+    assert rates.rates[1].metadata['lhsA'] == 'N++'
+    assert rates.rates[1].metadata['lhsB'] is None
+    assert rates.rates[1].metadata['form'] == 'Arrhenius'
+    np.testing.assert_array_equal(rates.rates[1].data['num'], [1, 2])
+    np.testing.assert_array_equal(rates.rates[1].data['constant'], [1e-15, 300.0])
+
+    T = np.linspace(300.0, 3000.0, 10)
+    k = rates.evaluate(T)
+    assert k.shape == (3, len(T))
+    np.testing.assert_allclose(k[0], 2e-16)
+    np.testing.assert_allclose(k[1], 1e-15*np.exp(-300.0/T))
+    np.testing.assert_allclose(k[2], 1e-16*np.sqrt(T)*np.exp(-600.0/T))
+    np.testing.assert_allclose(nepc.Rate(snapshot, 3).evaluate(T), k[2])
+    with pytest.raises(ValueError):
+        nepc.Rate(snapshot, 4)
+    rates.rates[0].metadata['form'] = 'Null'
+    with pytest.raises(ValueError):
+        nepc.RateModel.from_rates(rates.rates).evaluate(T)
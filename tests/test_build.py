@@ -0,0 +1,113 @@
+"""Tests for nepc/build"""
+import pytest
+from nepc.build import Builder, NameResolver, ReferenceTables, read_cross_sections
+from nepc.build import loaders, schema
+
+DIR_NAMES = ["/cs/lxcat/n2/fict/",
+             "/cs/lumped/n2/fict_total/"]
+
+
+def test_reference_tables(data_config):
+    """Verify that the reference tables are read with species names resolved"""
+    reference = ReferenceTables(data_config[0])
+    reference.resolver.check()
+    assert len(reference.states) == len(reference.resolver.ids["state"])
+    assert all(isinstance(species_id, int) for *_, species_id in reference.states)
+    assert sorted(reference.sha256) == sorted(loaders.REFERENCE_FILES)
+
+
+def test_name_resolver():
+    """Verify that unknown names are reported per file"""
+    resolver = NameResolver([(1, "excitation")], [(1, "fict")],
+                            [(1, "N2")], [(1, "N2(X1Sigmag+)")])
+    assert resolver.resolve("state", "N2(X1Sigmag+)", "a.met") == 1
+    assert resolver.resolve("state", "\\N", "a.met") is None
+    resolver.check()
+    assert resolver.resolve("process", "\\N", "a.met", required=True) is None
+    assert resolver.resolve("model", "fict_max", "b.mod") is None
+    with pytest.raises(ValueError, match="2 files"):
+        resolver.check()
+
+
+def test_read_cross_sections(data_config):
+    """Verify that the cross section files are read into cs and models2cs rows"""
+    reference = ReferenceTables(data_config[0])
+    cs_files = read_cross_sections(data_config[0], DIR_NAMES, reference.resolver)
+    reference.resolver.check()
+    assert len(cs_files.rows) == 30
+    assert len(cs_files.model_rows) == 38
+    assert len(set(row[0] for row in cs_files.rows)) == 30
+    manifest = loaders.manifest_rows(reference, cs_files)
+    assert len(manifest) == len(loaders.REFERENCE_FILES) + 30
+    assert all(filename.startswith(tuple(DIR_NAMES))
+               for filename, _, cs_id in manifest if cs_id is not None)
+
+
+def test_update_truncated(data_config):
+    """Verify that an incremental build that did not read every cross section
+    file falls back to a full build instead of deleting the unread ones"""
+    class Connection:
+        def cursor(self):
+            return None
+
+    reference = ReferenceTables(data_config[0])
+    assert not read_cross_sections(data_config[0], DIR_NAMES, reference.resolver).truncated
+    builder = Builder(Connection(), "nepc_test", data_config[0], DIR_NAMES,
+                      incremental=True, max_cs=5)
+    builder.read()
+    assert builder.cs_files.truncated
+    assert len(builder.cs_files.rows) < 30
+    # returns before querying the stored manifest
+    assert builder.update() is False
+
+
+def test_fast_build_restores_checks(data_config):
+    """Verify that a fast build that fails turns the foreign key and unique
+    checks back on"""
+    class Cursor:
+        def __init__(self):
+            self.statements = []
+
+        def execute(self, statement, params=()):
+            self.statements.append(statement)
+
+        def close(self):
+            pass
+
+    class Connection:
+        def __init__(self):
+            self.cursor_ = Cursor()
+
+        def cursor(self):
+            return self.cursor_
+
+        def commit(self):
+            pass
+
+    class Failed(Exception):
+        pass
+
+    cnx = Connection()
+    builder = Builder(cnx, "nepc_test", data_config[0], DIR_NAMES, fast=True)
+
+    def reference_tables():
+        raise Failed()
+
+    builder.reference_tables = reference_tables
+    with pytest.raises(Failed):
+        builder.run()
+    checks = [statement for statement in cnx.cursor_.statements if "_checks" in statement]
+    assert checks[:2] == ["SET foreign_key_checks = 0;", "SET unique_checks = 0;"]
+    assert checks[2:] == ["SET foreign_key_checks = 1;", "SET unique_checks = 1;"]
+
+
+def test_schema():
+    """Verify that fast builds add every index and foreign key left out of CREATE TABLE"""
+    assert "FOREIGN KEY" in schema.create_table("nepc_test", "cs")
+    assert "FOREIGN KEY" not in schema.create_table("nepc_test", "cs", indexes=False)
+    alters = schema.add_indexes("nepc_test")
+    assert len(alters) == len(schema.SECONDARY_INDEXES)
+    assert sum(alter.count("FOREIGN KEY") for alter in alters) == \
+        sum(len(keys) for keys in schema.FOREIGN_KEYS.values())
+    assert len(schema.orphan_queries()) == \
+        sum(len(keys) for keys in schema.FOREIGN_KEYS.values())
@@ -1,4 +1,5 @@
 """Tests for nepc/nepc.py"""
+import numpy as np
 import pandas as pd
 from nepc.nepc import cs_e
 import pytest
@@ -29,10 +30,19 @@ def test_cs_e_sigma(nepc_connect):
     proper formats for the e_energy and sigma values"""
     # TODO: check some actual e, sigma values from the files
     e_energy, sigma = nepc.cs_e_sigma(nepc_connect[1], 1)
-    assert isinstance(e_energy, list)
-    assert isinstance(sigma, list)
-    assert isinstance(e_energy[0], float)
-    assert isinstance(sigma[0], float)
+    assert isinstance(e_energy, np.ndarray)
+    assert isinstance(sigma, np.ndarray)
+    assert e_energy.dtype == np.float64
+    assert sigma.dtype == np.float64
+    assert e_energy.flags['C_CONTIGUOUS']
+    assert sigma.flags['C_CONTIGUOUS']
+    e_list, sigma_list = nepc.cs_e_sigma(nepc_connect[1], 1, as_list=True)
+    assert isinstance(e_list, list)
+    assert isinstance(sigma_list, list)
+    assert isinstance(e_list[0], float)
+    assert isinstance(sigma_list[0], float)
+    assert e_list == e_energy.tolist()
+    assert sigma_list == sigma.tolist()
 
 
 @pytest.mark.usefixtures("nepc_connect")
@@ -41,8 +51,9 @@ def test_cs_e(nepc_connect):
     proper formats for the e_energy values for a single cs_id"""
     # TODO: check some actual e_energy values from the files
     e_energy = nepc.cs_e(nepc_connect[1], 1)
-    assert isinstance(e_energy, list)
-    assert isinstance(e_energy[0], float)
+    assert isinstance(e_energy, np.ndarray)
+    assert e_energy.dtype == np.float64
+    assert nepc.cs_e(nepc_connect[1], 1, as_list=True) == e_energy.tolist()
 
 
 @pytest.mark.usefixtures("nepc_connect")
@@ -51,8 +62,9 @@ def test_cs_sigma(nepc_connect):
     proper formats for the sigma values for a single cs_id"""
     # TODO: check some actual sigma values from the files
     sigma = nepc.cs_sigma(nepc_connect[1], 1)
-    assert isinstance(sigma, list)
-    assert isinstance(sigma[0], float)
+    assert isinstance(sigma, np.ndarray)
+    assert sigma.dtype == np.float64
+    assert nepc.cs_sigma(nepc_connect[1], 1, as_list=True) == sigma.tolist()
 
 
 @pytest.mark.usefixtures("nepc_connect")
@@ -79,10 +91,10 @@ def test_CS_class(nepc_connect):
     assert isinstance(cs.data, dict)
     assert isinstance(cs.metadata["cs_id"], int)
     assert isinstance(cs.metadata["units_e"], float)
-    assert isinstance(cs.data["e"], list)
-    assert isinstance(cs.data["e"][0], float)
-    assert isinstance(cs.data["sigma"], list)
-    assert isinstance(cs.data["sigma"][0], float)
+    assert isinstance(cs.data["e"], np.ndarray)
+    assert cs.data["e"].dtype == np.float64
+    assert isinstance(cs.data["sigma"], np.ndarray)
+    assert cs.data["sigma"].dtype == np.float64
     # test len()
     assert len(cs) == 21
     # test str()
@@ -114,10 +126,8 @@ def test_CustomCS_class(nepc_connect):
     assert isinstance(cs.data, dict)
     assert cs.metadata["cs_id"] is None
     assert isinstance(cs.metadata["units_e"], float)
-    assert isinstance(cs.data["e"], list)
-    assert isinstance(cs.data["e"][0], float)
-    assert isinstance(cs.data["sigma"], list)
-    assert isinstance(cs.data["sigma"][0], float)
+    assert isinstance(cs.data["e"], np.ndarray)
+    assert isinstance(cs.data["sigma"], np.ndarray)
     cs = nepc.CustomCS(nepc_connect[1], cs_id=1,
                        metadata={'cs_id': -1},
                        data={'e': [0.0, 1.0, 2.0],
@@ -225,6 +235,23 @@ def test_table_as_df(nepc_connect):
     assert isinstance(processf, pd.DataFrame)
 
 
+@pytest.mark.usefixtures("nepc_connect")
+def test_table_as_df_chunks(nepc_connect):
+    """Verify that table_as_df with a chunksize streams the same rows as one
+    DataFrame, and that the cursor can be used after stopping early"""
+    csdata = nepc.table_as_df(nepc_connect[1], "csdata")
+    assert len(csdata) == nepc.count_table_rows(nepc_connect[1], "csdata")
+    assert csdata["sigma"].dtype == np.float64
+    chunks = list(nepc.table_as_df(nepc_connect[1], "csdata", chunksize=500))
+    assert max(len(chunk) for chunk in chunks) == 500
+    pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), csdata)
+
+    chunks = nepc.table_as_df(nepc_connect[1], "csdata", columns=["cs_id", "e"], chunksize=10)
+    assert list(next(chunks).columns) == ["cs_id", "e"]
+    chunks.close()
+    assert nepc.count_table_rows(nepc_connect[1], "cs") == 30
+
+
 @pytest.mark.usefixtures("nepc_connect")
 def test_reaction_latex(nepc_connect):
     """Verify when nepc.reaction_latex is called it
@@ -284,6 +311,112 @@ def test_model_summary_df(nepc_connect):
     assert isinstance(df, pd.io.formats.style.Styler)
 
 
+@pytest.mark.usefixtures("nepc_connect")
+def test_model_summary_statistics(nepc_connect):
+    """Verify that the vectorized statistics of Model.summary_df match those
+    of each cross section"""
+    fict = nepc.Model(nepc_connect[1], "fict")
+    e_energy, sigma, offsets = fict.packed()
+    assert len(offsets) == len(fict) + 1
+    assert len(e_energy) == len(sigma) == offsets[-1]
+    df = fict.summary_df()
+    assert isinstance(df, pd.DataFrame)
+    assert list(df["cs_id"]) == [cs.metadata["cs_id"] for cs in fict.cs]
+    for row, cs in zip(df.itertuples(), fict.cs):
+        e_cs, sigma_cs = cs.data['e'], cs.data['sigma']
+        assert row.E_peak == cs.metadata["units_e"]*e_cs[np.argmax(sigma_cs)]
+        assert row.E_upper == cs.metadata["units_e"]*np.max(e_cs[sigma_cs != 0.0])
+        assert row.sigma_max == cs.metadata["units_sigma"]*np.max(sigma_cs)
+    excitation = fict.summary_df(metadata={'process': 'excitation'}, sort=['sigma_max'])
+    assert len(excitation) == 15
+    assert excitation["sigma_max"].is_monotonic_increasing
+
+
+@pytest.mark.usefixtures("nepc_connect")
+def test_common_grid(nepc_connect):
+    """Verify that Model.set_unique and the CommonGrid hold the union of the
+    electron energies, and that the grid maps back to each cross section"""
+    fict = nepc.Model(nepc_connect[1], "fict")
+    fict.set_unique()
+    all_e = np.concatenate([cs.data['e'] for cs in fict.cs])
+    np.testing.assert_array_equal(fict.unique, np.unique(all_e))
+
+    grid = fict.common_grid()
+    assert len(grid) == len(np.unique(all_e*fict.cs[0].metadata['units_e']))
+    assert np.all(np.diff(grid.e) > 0)
+    for i, cs in enumerate(fict.cs):
+        np.testing.assert_array_equal(grid.e[grid.indices(i)],
+                                      cs.metadata['units_e']*cs.data['e'])
+
+
+@pytest.mark.usefixtures("nepc_connect")
+def test_model_interpolate(nepc_connect):
+    """Verify that Model.interpolate matches interpolating each cross section
+    on its own, in chunks and in both precisions"""
+    fict = nepc.Model(nepc_connect[1], "fict")
+    grid = np.concatenate([[0.0], np.logspace(-2, 3, 257)])
+    expected = np.zeros((len(fict.cs), len(grid)))
+    for i, cs in enumerate(fict.cs):
+        # the fictitious data are not all sorted by energy
+        order = np.argsort(cs.data['e'], kind='stable')
+        e_cs = cs.metadata['units_e']*np.asarray(cs.data['e'])[order]
+        sigma_cs = cs.metadata['units_sigma']*np.asarray(cs.data['sigma'])[order]
+        expected[i] = np.interp(grid, e_cs, sigma_cs, left=-1.0, right=-1.0)
+        expected[i, grid < cs.metadata['units_e']*cs.metadata['threshold']] = 0.0
+
+    sigma = fict.interpolate(grid, fill=-1.0)
+    assert sigma.shape == (len(fict.cs), len(grid))
+    assert sigma.dtype == np.float64
+    np.testing.assert_allclose(sigma, expected, rtol=1e-12, atol=0.0)
+    np.testing.assert_array_equal(fict.interpolate(grid, fill=-1.0, chunk_size=1), sigma)
+    np.testing.assert_allclose(fict.interpolate(grid, fill=-1.0, dtype=np.float32),
+                               expected, rtol=1e-6)
+
+    common = fict.interpolate(fict.common_grid(), method='loglog')
+    for i, cs in enumerate(fict.cs):
+        if np.any(np.diff(cs.data['e']) <= 0):
+            continue
+        np.testing.assert_allclose(common[i, fict.common_grid().indices(i)],
+                                   cs.metadata['units_sigma']*cs.data['sigma'], rtol=1e-12)
+    with pytest.raises(ValueError):
+        fict.interpolate(grid, method='cubic')
+
+
+@pytest.mark.usefixtures("nepc_connect")
+def test_model_rate_coefficients(nepc_connect):
+    """Verify Model.rate_coefficients against the Maxwellian rate coefficient
+    of a constant cross section and against integrating each cross section
+    on its own"""
+    Te = np.linspace(0.5, 10.0, 40)
+    constant = nepc.Model.from_cs([nepc.CustomCS(
+        metadata={'cs_id': -1, 'units_e': 1.0, 'units_sigma': 1e-20, 'threshold': 0.0},
+        data={'e': np.array([0.0, 1000.0]), 'sigma': np.array([1.0, 1.0])})])
+    k = constant.rate_coefficients(Te=Te)
+    assert k.shape == (1, len(Te))
+    mean_speed = np.sqrt(8.0*nepc.nepc.ELECTRON_CHARGE*Te/(np.pi*nepc.nepc.ELECTRON_MASS))
+    np.testing.assert_allclose(k[0], 1e-20*mean_speed, rtol=1e-4)
+    kernel = constant.rate_kernel()
+    constant.cs.append(constant.cs[0])
+    assert constant.rate_kernel() is not kernel
+    assert constant.rate_coefficients(Te=Te).shape == (2, len(Te))
+
+    fict = nepc.Model(nepc_connect[1], "fict")
+    k = fict.rate_coefficients(Te=Te, chunk_size=1)
+    assert fict.rate_kernel() is fict.rate_kernel()
+    e_energy = fict.rate_kernel().e
+    f = nepc.maxwellian(e_energy, Te)
+    speed = np.sqrt(2.0*nepc.nepc.ELECTRON_CHARGE*e_energy/nepc.nepc.ELECTRON_MASS)
+    sigma = fict.interpolate(e_energy)
+    for i in range(len(fict.cs)):
+        integrand = sigma[i, :, np.newaxis]*speed[:, np.newaxis]*f
+        expected = np.sum((integrand[1:] + integrand[:-1])/2.0*np.diff(e_energy)[:, np.newaxis],
+                          axis=0)
+        np.testing.assert_allclose(k[i], expected, rtol=1e-10, atol=1e-30)
+    np.testing.assert_allclose(fict.rate_coefficients(eedf=(e_energy, f)), k, rtol=1e-12)
+    with pytest.raises(ValueError):
+        fict.rate_coefficients()
+
+
 @pytest.mark.usefixtures("nepc_connect")
 def test_model_subset(nepc_connect):
     """Verify that Model.subset returns a proper
@@ -299,3 +432,207 @@ def test_model_subset(nepc_connect):
     with pytest.raises(Exception):
         assert fict.subset()
 
+
+def test_model_subset_custom_metadata():
+    """Verify that Model.subset filters CustomCS's on metadata keys that are
+    not in the NEPC database"""
+    cs_list = [nepc.CustomCS(metadata={'cs_id': cs_id, 'process': 'excitation',
+                                       'source': source},
+                             data={'e': [0.0, 1.0], 'sigma': [0.0, 0.1]})
+               for cs_id, source in [(-1, 'measured'), (-2, 'computed'), (-3, 'measured')]]
+    model = nepc.Model.from_cs(cs_list)
+    assert model.subset({'source': 'measured'}) == [cs_list[0], cs_list[2]]
+    assert model.subset({'source': {'computed'}, 'process': 'excitation'}) == [cs_list[1]]
+
+
+@pytest.mark.usefixtures("nepc_connect")
+def test_cs_metadata_list(nepc_connect):
+    """Verify that nepc.cs_metadata_list returns the same metadata
+    as nepc.cs_metadata for each cs_id"""
+    metadata = nepc.cs_metadata_list(nepc_connect[1], [3, 1, 2], batch_size=2)
+    assert set(metadata.keys()) == {1, 2, 3}
+    for cs_id in [1, 2, 3]:
+        assert metadata[cs_id] == nepc.cs_metadata(nepc_connect[1], cs_id)
+    with pytest.raises(ValueError):
+        nepc.cs_metadata_list(nepc_connect[1], [1, 1000000])
+
+
+@pytest.mark.usefixtures("nepc_connect")
+def test_load_cs(nepc_connect):
+    """Verify that nepc.load_cs returns the same cross sections as nepc.CS
+    in the order of the provided cs_id's"""
+    cs_id_list = nepc.model_cs_id_list(nepc_connect[1], "fict")
+    cs_bulk = nepc.load_cs(nepc_connect[1], cs_id_list, batch_size=7)
+    assert [cs.metadata['cs_id'] for cs in cs_bulk] == cs_id_list
+    for cs in cs_bulk:
+        cs_single = nepc.CS(nepc_connect[1], cs.metadata['cs_id'])
+        assert cs.metadata == cs_single.metadata
+        np.testing.assert_array_equal(cs.data['e'], cs_single.data['e'])
+        np.testing.assert_array_equal(cs.data['sigma'], cs_single.data['sigma'])
+
+
+@pytest.mark.usefixtures("nepc_connect")
+def test_cs_cache(nepc_connect):
+    """Verify that cross sections are shared through nepc.CS_CACHE and
+    fetched again after invalidation"""
+    nepc.CS_CACHE.clear()
+    fict = nepc.Model(nepc_connect[1], "fict")
+    assert nepc.CS_CACHE.stats()['misses'] == len(fict)
+    fict_again = nepc.Model(nepc_connect[1], "fict")
+    assert nepc.CS_CACHE.stats()['hits'] == len(fict)
+    assert all(cs is cs_again for cs, cs_again in zip(fict.cs, fict_again.cs))
+    assert not fict.cs[0].data['e'].flags['WRITEABLE']
+    with pytest.raises(TypeError):
+        fict.cs[0].metadata['process'] = 'ionization'
+    assert fict.cs[0].metadata.copy() == fict.cs[0].metadata
+    cs = nepc.CustomCS(nepc_connect[1], cs_id=fict.cs[0].metadata['cs_id'])
+    assert cs.metadata is not fict.cs[0].metadata
+    assert fict.cs[0].metadata['cs_id'] is not None
+
+    nepc.CS_CACHE.invalidate(cs_id_list=[fict.cs[0].metadata['cs_id']])
+    assert len(nepc.CS_CACHE) == len(fict) - 1
+    assert nepc.Model(nepc_connect[1], "fict").cs[0] is not fict.cs[0]
+    nepc.CS_CACHE.invalidate()
+    assert len(nepc.CS_CACHE) == 0 and nepc.CS_CACHE.nbytes == 0
+
+
+def test_cs_cache_hit_queries():
+    """Verify that a cursor looks its database up once, so later cache hits
+    run no query, and that the shared cross section is read-only"""
+    class Cursor:
+        def __init__(self):
+            self.queries = []
+
+        def execute(self, operation, params=()):
+            self.queries.append(operation)
+
+        def fetchall(self):
+            return [("localhost", 3306, "nepc_cache_test")]
+
+    cursor = Cursor()
+    cs = nepc.CS.from_query([-1, "excitation"] + [None]*28,
+                            np.array([0.0, 1.0]), np.array([0.0, 1.0e-20]))
+    nepc.CS_CACHE.put("localhost:3306/nepc_cache_test", cs)
+    assert nepc.load_cs(cursor, [-1])[0] is cs
+    assert nepc.load_cs(cursor, [-1])[0] is cs
+    assert nepc.CS(cursor, -1).metadata == cs.metadata
+    assert len(cursor.queries) == 1
+    with pytest.raises(TypeError):
+        cs.metadata['process'] = 'ionization'
+    with pytest.raises(TypeError):
+        cs.data['e'] = np.zeros(2)
+    nepc.CS_CACHE.invalidate("localhost:3306/nepc_cache_test")
+
+
+@pytest.mark.usefixtures("nepc_connect")
+def test_cs_cache_eviction(nepc_connect):
+    """Verify that a CSCache evicts least recently used cross sections to stay
+    within max_bytes"""
+    cs_list = nepc.load_cs(nepc_connect[1], [1, 2, 3], cache=False)
+    cache = nepc.CSCache(max_bytes=10**9)
+    for cs in cs_list:
+        cache.put("db", cs)
+    cache.max_bytes = cache.nbytes - 1
+    assert cache.get("db", 1) is cs_list[0]
+    cache.put("db", cs_list[2])
+    assert cache.evictions == 1
+    assert cache.get("db", 2) is None
+    assert cache.get("db", 1) is cs_list[0]
+    assert cache.nbytes <= cache.max_bytes
+
+
+@pytest.mark.usefixtures("nepc_connect")
+def test_disk_cache(nepc_connect, tmp_path):
+    """Verify that a model is stored in and loaded from a DiskCache, that a
+    change in fingerprint invalidates it, and that only a save removes the
+    directories of other fingerprints"""
+    disk_cache = nepc.DiskCache(str(tmp_path))
+    fict = nepc.Model(nepc_connect[1], "fict", disk_cache=disk_cache)
+    nepc.CS_CACHE.clear()
+    fict_disk = nepc.Model(nepc_connect[1], "fict", disk_cache=disk_cache)
+    assert len(fict_disk) == len(fict)
+    for cs, cs_disk in zip(fict.cs, fict_disk.cs):
+        assert cs_disk.metadata == cs.metadata
+        np.testing.assert_array_equal(cs_disk.data['e'], cs.data['e'])
+        np.testing.assert_array_equal(cs_disk.data['sigma'], cs.data['sigma'])
+
+    database = nepc.MySQLBackend(nepc_connect[1]).database_key()
+    fingerprint = nepc.MySQLBackend(nepc_connect[1]).fingerprint()
+    assert disk_cache.load(database, fingerprint, "fict") is not None
+    assert disk_cache.load(database, fingerprint + "-rebuilt", "fict") is None
+    assert disk_cache.load(database, fingerprint, "fict") is not None
+    disk_cache.save(database, fingerprint + "-rebuilt", "fict", fict.cs)
+    assert disk_cache.load(database, fingerprint + "-rebuilt", "fict") is not None
+    assert disk_cache.load(database, fingerprint, "fict") is None
+
+
+@pytest.mark.usefixtures("nepc_connect")
+def test_lazy_model(nepc_connect):
+    """Verify that a lazy Model fetches CS.data on first access, in batches
+    of the cross sections that are still needed"""
+    nepc.CS_CACHE.clear()
+    fict_lazy = nepc.Model(nepc_connect[1], "fict", lazy=True)
+    assert all(cs._data is None for cs in fict_lazy.cs)
+    excitation = fict_lazy.subset(metadata={'process': 'excitation'})
+    assert len(excitation) == 15
+    excitation[0].data
+    assert all(cs._data is not None for cs in excitation)
+    assert all(cs._data is None for cs in fict_lazy.cs if cs not in excitation)
+
+    nepc.CS_CACHE.clear()
+    fict = nepc.Model(nepc_connect[1], "fict")
+    for cs, cs_lazy in zip(fict.cs, fict_lazy.cs):
+        assert cs_lazy.metadata == cs.metadata
+        np.testing.assert_array_equal(cs_lazy.data['e'], cs.data['e'])
+        np.testing.assert_array_equal(cs_lazy.data['sigma'], cs.data['sigma'])
+
+
+@pytest.mark.usefixtures("nepc_connect")
+def test_model_metadata_filter(nepc_connect):
+    """Verify that a CustomModel filtered by the server has the cross sections
+    that Model.subset selects from the whole model"""
+    fict = nepc.Model(nepc_connect[1], "fict")
+    metadata_filter = {'process': {'excitation', 'ionization'},
+                       'threshold': nepc.Between(upper=10.0),
+                       'lhsB': None}
+    fict_subset = nepc.CustomModel(nepc_connect[1], model_name="fict",
+                                   metadata=metadata_filter)
+    expected = [cs.metadata['cs_id'] for cs in fict.subset(metadata_filter)]
+    assert expected
+    assert [cs.metadata['cs_id'] for cs in fict_subset.cs] == expected
+    assert nepc.model_cs_id_list(nepc_connect[1], "fict", metadata_filter) == expected
+    assert nepc.model_cs_id_list(nepc_connect[1], "fict",
+                                 {'threshold': nepc.Between(1e6)}) == []
+    with pytest.raises(ValueError):
+        nepc.model_cs_id_list(nepc_connect[1], "fict", {'not_a_key': 1})
+
+
+@pytest.mark.usefixtures("nepc_connect")
+def test_window(nepc_connect):
+    """Verify that energy windows and decimation evaluated by the query
+    match Window.apply on the whole cross section"""
+    cursor = nepc_connect[1]
+    e_energy, sigma = nepc.cs_e_sigma(cursor, 1)
+    for window in [nepc.Window(lower=e_energy[3], upper=e_energy[-3]),
+                   nepc.Window(max_points=6),
+                   nepc.Window(upper=e_energy[-2], max_points=7, method='minmax')]:
+        e_window, sigma_window = window.apply(e_energy, sigma)
+        assert len(e_window) < len(e_energy)
+        if window.max_points is not None:
+            assert len(e_window) <= window.max_points
+        np.testing.assert_array_equal(nepc.cs_e(cursor, 1, window=window), e_window)
+        np.testing.assert_array_equal(nepc.cs_sigma(cursor, 1, window=window), sigma_window)
+        e_sigma = nepc.cs_e_sigma_list(cursor, [1, 2], window=window)
+        np.testing.assert_array_equal(e_sigma[1][0], e_window)
+        np.testing.assert_array_equal(e_sigma[1][1], sigma_window)
+
+    window = nepc.Window(max_points=4, method='minmax')
+    e_window, sigma_window = window.apply(e_energy, sigma)
+    assert sigma.max() in sigma_window
+    nepc.CS_CACHE.clear()
+    fict = nepc.Model(cursor, "fict", window=window)
+    assert len(nepc.CS_CACHE) == 0
+    assert all(len(cs.data['e']) <= 4 for cs in fict.cs)
+    np.testing.assert_array_equal(fict.cs[0].data['sigma'], sigma_window)
+    with pytest.raises(ValueError):
+        nepc.Window(max_points=1, method='minmax')